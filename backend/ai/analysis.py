@@ -1,7 +1,8 @@
 """AI Analysis Functions - 20 Algorithms for Portfolio Analysis"""
 import math
-from typing import Dict, List, Any
-from datetime import datetime, timedelta
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
 def safe_num(v):
     """Safely convert to number"""
@@ -12,7 +13,101 @@ def safe_num(v):
     except:
         return 0.0
 
-def portfolio_performance_summary(investor: Dict) -> Dict:
+def to_datetime(v):
+    """Aware UTC datetime from a stored date (BSON datetime or legacy ISO string)"""
+    if isinstance(v, datetime):
+        dt = v
+    else:
+        dt = datetime.fromisoformat(v.replace('Z', '+00:00'))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def _sip_bucket(sip: Dict, now: datetime):
+    """Classify one SIP as 'high', 'medium' or 'low' discontinuation risk (None if unclassifiable)"""
+    last_payment = sip.get('last_sip_payment_date')
+    next_due = sip.get('next_due_date')
+    
+    if not last_payment:
+        return 'low'
+    
+    try:
+        days_since_last = (now - to_datetime(last_payment)).days
+        
+        # Categorize based on days since last payment
+        if days_since_last > 60:  # Missed 2+ payments
+            return 'high'
+        elif days_since_last > 35:  # Missed 1 payment
+            return 'medium'
+        return 'low'
+    except:
+        # If can't parse, check next due date
+        if next_due:
+            try:
+                days_overdue = (now - to_datetime(next_due)).days
+                if days_overdue > 30:
+                    return 'high'
+                elif days_overdue > 0:
+                    return 'medium'
+                return 'low'
+            except:
+                return 'low'
+        return None
+
+class AnalysisContext:
+    """Per-investor figures shared by the algorithms, gathered in one walk over the folios"""
+    
+    def __init__(self, investor: Dict, now: datetime = None):
+        self.investor = investor
+        self.portfolios = investor.get('portfolios', [])
+        # Use total_aum for consistency
+        self.total = safe_num(investor.get('total_aum')) or 1
+        
+        self.values = values = []
+        self.by_category = by_category = {}
+        self.by_amc = by_amc = {}
+        self.equity = 0
+        self.losses = []
+        self.gainers = 0
+        self.illiquid = []
+        self.sips = []
+        self.sip_buckets = {'high': 0, 'medium': 0, 'low': 0}
+        
+        now = now or datetime.now(timezone.utc)
+        for p in self.portfolios:
+            value = safe_num(p.get('current_value', 0))
+            gain = safe_num(p.get('gain_loss_pct', 0))
+            category = p.get('category', 'Unknown')
+            amc = p.get('amc_name', 'Unknown')
+            
+            values.append(value)
+            by_category[category] = by_category.get(category, 0) + value
+            by_amc[amc] = by_amc.get(amc, 0) + value
+            if category == 'Equity':
+                self.equity += value
+            elif category in ('ELSS', 'Close Ended'):
+                self.illiquid.append(p.get('scheme_name', 'Unknown'))
+            if gain < 0:
+                self.losses.append((p.get('scheme_name', 'Unknown'), gain))
+            elif gain > 15:
+                self.gainers += 1
+            if p.get('sip_flag', False):
+                self.sips.append(p)
+                bucket = _sip_bucket(p, now)
+                if bucket:
+                    self.sip_buckets[bucket] += 1
+        
+        self.allocation = {k: round((v / self.total) * 100, 2) for k, v in by_category.items()}
+        self._sip_prediction = None
+    
+    def sip_prediction(self) -> Dict:
+        """sip_discontinuation_prediction result, computed once (churn risk reads it too)"""
+        if self._sip_prediction is None:
+            self._sip_prediction = _predict_sip_discontinuation(self)
+        return self._sip_prediction
+
+def _context(investor: Dict, ctx: AnalysisContext = None) -> AnalysisContext:
+    return ctx if ctx is not None else AnalysisContext(investor)
+
+def portfolio_performance_summary(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 1: Calculate overall portfolio performance"""
     # Use pre-calculated totals from investor document for consistency
     invested = safe_num(investor.get('total_invested'))
@@ -25,27 +120,14 @@ def portfolio_performance_summary(investor: Dict) -> Dict:
         'gainLoss': round(gain_loss, 2)
     }
 
-def asset_allocation_analysis(investor: Dict) -> Dict:
+def asset_allocation_analysis(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 2: Analyze asset allocation by category"""
-    portfolios = investor.get('portfolios', [])
-    # Use total_aum for consistency
-    total = safe_num(investor.get('total_aum')) or 1
-    
-    by_cat = {}
-    for p in portfolios:
-        cat = p.get('category', 'Unknown')
-        by_cat[cat] = by_cat.get(cat, 0) + safe_num(p.get('current_value', 0))
-    
-    allocation = {k: round((v / total) * 100, 2) for k, v in by_cat.items()}
-    return {'total': total, 'allocation': allocation}
+    ctx = _context(investor, ctx)
+    return {'total': ctx.total, 'allocation': dict(ctx.allocation)}
 
-def fund_concentration_check(investor: Dict) -> Dict:
+def fund_concentration_check(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 3: Check for fund house concentration risk"""
-    portfolios = investor.get('portfolios', [])
-    totals = {}
-    for p in portfolios:
-        amc = p.get('amc_name', 'Unknown')
-        totals[amc] = totals.get(amc, 0) + safe_num(p.get('current_value', 0))
+    totals = dict(_context(investor, ctx).by_amc)
     
     total = sum(totals.values()) or 1
     alerts = []
@@ -59,22 +141,16 @@ def fund_concentration_check(investor: Dict) -> Dict:
     
     return {'totals': totals, 'alerts': alerts}
 
-def underperforming_scheme_detection(investor: Dict) -> List:
+def underperforming_scheme_detection(investor: Dict, ctx: AnalysisContext = None) -> List:
     """Algorithm 4: Detect underperforming schemes"""
-    portfolios = investor.get('portfolios', [])
-    under = []
-    for p in portfolios:
-        if safe_num(p.get('gain_loss_pct', 0)) < 0:
-            under.append({
-                'scheme': p.get('scheme_name', 'Unknown'),
-                'loss': round(safe_num(p.get('gain_loss_pct', 0)), 2)
-            })
-    return under
+    return [
+        {'scheme': scheme, 'loss': round(gain, 2)}
+        for scheme, gain in _context(investor, ctx).losses
+    ]
 
-def sip_health_tracking(investor: Dict) -> Dict:
+def sip_health_tracking(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 5: Track SIP health and activity"""
-    portfolios = investor.get('portfolios', [])
-    sips = [p for p in portfolios if p.get('sip_flag', False)]
+    sips = _context(investor, ctx).sips
     
     details = [{
         'scheme': s.get('scheme_name', 'Unknown'),
@@ -84,11 +160,11 @@ def sip_health_tracking(investor: Dict) -> Dict:
     
     return {'active': len(sips), 'details': details}
 
-def diversification_quality_score(investor: Dict) -> Dict:
+def diversification_quality_score(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 6: Calculate portfolio diversification score"""
-    portfolios = investor.get('portfolios', [])
-    amc_count = len(set(p.get('amc_name', 'Unknown') for p in portfolios))
-    cat_count = len(set(p.get('category', 'Unknown') for p in portfolios))
+    ctx = _context(investor, ctx)
+    amc_count = len(ctx.by_amc)
+    cat_count = len(ctx.by_category)
     
     score = min(100, (amc_count * 12) + (cat_count * 8))
     return {
@@ -97,15 +173,10 @@ def diversification_quality_score(investor: Dict) -> Dict:
         'diversificationScore': score
     }
 
-def risk_mismatch_detection(investor: Dict) -> Dict:
+def risk_mismatch_detection(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 7: Detect risk profile mismatches"""
-    portfolios = investor.get('portfolios', [])
-    # Use total_aum for consistency
-    total = safe_num(investor.get('total_aum')) or 1
-    
-    equity = sum(safe_num(p.get('current_value', 0)) 
-                 for p in portfolios if p.get('category') == 'Equity')
-    equity_share = round((equity / total) * 100, 2)
+    ctx = _context(investor, ctx)
+    equity_share = round((ctx.equity / ctx.total) * 100, 2)
     
     alert = None
     risk_profile = investor.get('risk_profile', 'Moderate')
@@ -117,9 +188,9 @@ def risk_mismatch_detection(investor: Dict) -> Dict:
     
     return {'equityShare': equity_share, 'alert': alert}
 
-def category_imbalance_alert(investor: Dict) -> Dict:
+def category_imbalance_alert(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 8: Alert on category imbalances"""
-    allocation = asset_allocation_analysis(investor)['allocation']
+    allocation = _context(investor, ctx).allocation
     alerts = []
     
     for k, v in allocation.items():
@@ -132,53 +203,39 @@ def category_imbalance_alert(investor: Dict) -> Dict:
     
     return {'alerts': alerts}
 
-def aum_concentration_risk(investor: Dict) -> Dict:
+def aum_concentration_risk(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 9: Check AUM concentration in top schemes"""
-    portfolios = investor.get('portfolios', [])
-    sorted_portfolios = sorted(portfolios, 
-                               key=lambda p: safe_num(p.get('current_value', 0)), 
-                               reverse=True)
+    ctx = _context(investor, ctx)
+    order = sorted(range(len(ctx.values)), key=ctx.values.__getitem__, reverse=True)
     
-    top3 = sorted_portfolios[:3]
-    top_sum = sum(safe_num(p.get('current_value', 0)) for p in top3)
-    # Use total_aum for consistency
-    total = safe_num(investor.get('total_aum')) or 1
-    
-    concentration = round((top_sum / total) * 100, 2)
+    top3 = order[:3]
+    top_sum = sum(ctx.values[i] for i in top3)
+    concentration = round((top_sum / ctx.total) * 100, 2)
     
     return {
-        'top3': [{'scheme': p.get('scheme_name', 'Unknown'), 
-                  'value': safe_num(p.get('current_value', 0))} for p in top3],
+        'top3': [{'scheme': ctx.portfolios[i].get('scheme_name', 'Unknown'), 
+                  'value': ctx.values[i]} for i in top3],
         'concentration': concentration
     }
 
-def underperformance_alerts(investor: Dict) -> List:
+def underperformance_alerts(investor: Dict, ctx: AnalysisContext = None) -> List:
     """Algorithm 10: Generate underperformance alerts"""
-    portfolios = investor.get('portfolios', [])
-    alerts = []
-    
-    for p in portfolios:
-        if safe_num(p.get('gain_loss_pct', 0)) < -3:
-            alerts.append({
-                'scheme': p.get('scheme_name', 'Unknown'),
-                'loss': round(safe_num(p.get('gain_loss_pct', 0)), 2)
-            })
-    
-    return alerts
+    return [
+        {'scheme': scheme, 'loss': round(gain, 2)}
+        for scheme, gain in _context(investor, ctx).losses if gain < -3
+    ]
 
-def liquidity_flagging(investor: Dict) -> Dict:
+def liquidity_flagging(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 11: Flag illiquid investments"""
-    portfolios = investor.get('portfolios', [])
-    illiquid = [p.get('scheme_name', 'Unknown') 
-                for p in portfolios 
-                if p.get('category') in ['ELSS', 'Close Ended']]
-    
-    return {'illiquidSchemes': illiquid}
+    return {'illiquidSchemes': list(_context(investor, ctx).illiquid)}
 
-def sip_discontinuation_prediction(investor: Dict) -> Dict:
+def sip_discontinuation_prediction(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 12: Predict SIP discontinuation risk"""
-    portfolios = investor.get('portfolios', [])
-    sips = [p for p in portfolios if p.get('sip_flag', False)]
+    return dict(_context(investor, ctx).sip_prediction())
+
+def _predict_sip_discontinuation(ctx: AnalysisContext) -> Dict:
+    """Risk buckets come from the context walk; no dates are parsed here"""
+    sips = ctx.sips
     
     if not sips:
         return {
@@ -188,47 +245,10 @@ def sip_discontinuation_prediction(investor: Dict) -> Dict:
             'details': 'No active SIPs'
         }
     
-    high_risk = []
-    medium_risk = []
-    low_risk = []
-    
-    for s in sips:
-        last_payment = s.get('last_sip_payment_date')
-        next_due = s.get('next_due_date')
-        
-        if last_payment:
-            try:
-                last_date = datetime.fromisoformat(last_payment.replace('Z', '+00:00'))
-                days_since_last = (datetime.now() - last_date).days
-                
-                # Categorize based on days since last payment
-                if days_since_last > 60:  # Missed 2+ payments
-                    high_risk.append(s)
-                elif days_since_last > 35:  # Missed 1 payment
-                    medium_risk.append(s)
-                else:
-                    low_risk.append(s)
-            except:
-                # If can't parse, check next due date
-                if next_due:
-                    try:
-                        due_date = datetime.fromisoformat(next_due.replace('Z', '+00:00'))
-                        days_overdue = (datetime.now() - due_date).days
-                        if days_overdue > 30:
-                            high_risk.append(s)
-                        elif days_overdue > 0:
-                            medium_risk.append(s)
-                        else:
-                            low_risk.append(s)
-                    except:
-                        low_risk.append(s)
-        else:
-            low_risk.append(s)
-    
     # Determine overall risk
     total_sips = len(sips)
-    high_count = len(high_risk)
-    medium_count = len(medium_risk)
+    high_count = ctx.sip_buckets['high']
+    medium_count = ctx.sip_buckets['medium']
     missed_count = high_count + medium_count
     
     if high_count > 0:
@@ -246,15 +266,14 @@ def sip_discontinuation_prediction(investor: Dict) -> Dict:
         'missedCount': missed_count,
         'highRiskCount': high_count,
         'mediumRiskCount': medium_count,
-        'lowRiskCount': len(low_risk),
+        'lowRiskCount': ctx.sip_buckets['low'],
         'risk': risk,
         'details': f'{high_count} SIPs with 2+ missed payments, {medium_count} with 1 missed payment'
     }
 
-def redemption_likelihood(investor: Dict) -> Dict:
+def redemption_likelihood(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 13: Calculate redemption likelihood"""
-    portfolios = investor.get('portfolios', [])
-    gainers = len([p for p in portfolios if safe_num(p.get('gain_loss_pct', 0)) > 15])
+    gainers = _context(investor, ctx).gainers
     
     inactivity = investor.get('last_activity_days', 0)
     score = min(1, (gainers * 0.2) + (inactivity / 365 * 0.3))
@@ -264,17 +283,17 @@ def redemption_likelihood(investor: Dict) -> Dict:
         'flag': 'High' if score > 0.7 else 'Normal'
     }
 
-def aum_growth_forecast(investor: Dict) -> Dict:
+def aum_growth_forecast(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 14: Forecast AUM growth"""
     import random
     factor = round(random.uniform(-2, 10), 2)
     return {'projectedGrowthPct': factor}
 
-def churn_risk_detection(investor: Dict) -> Dict:
+def churn_risk_detection(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 15: Detect client churn risk"""
     gain_loss_pct = investor.get('gain_loss_pct', 0)
     negative = gain_loss_pct < 0
-    sip_risk = sip_discontinuation_prediction(investor)['risk'] == 'High'
+    sip_risk = _context(investor, ctx).sip_prediction()['risk'] == 'High'
     
     score = (0.6 if negative else 0) + (0.4 if sip_risk else 0)
     
@@ -283,7 +302,7 @@ def churn_risk_detection(investor: Dict) -> Dict:
         'score': round(score, 2)
     }
 
-def goal_achievement_forecast(investor: Dict) -> Dict:
+def goal_achievement_forecast(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 16: Forecast goal achievement"""
     target = investor.get('goal_target_corpus')
     if not target:
@@ -294,8 +313,8 @@ def goal_achievement_forecast(investor: Dict) -> Dict:
         return {'status': 'NoTimelineDeclared'}
     
     try:
-        goal_date = datetime.fromisoformat(timeline.replace('Z', '+00:00'))
-        months_left = max(1, (goal_date - datetime.now()).days / 30)
+        goal_date = to_datetime(timeline)
+        months_left = max(1, (goal_date - datetime.now(timezone.utc)).days / 30)
         current_aum = safe_num(investor.get('total_aum', 0))
         needed = (target - current_aum) / months_left
         
@@ -307,9 +326,9 @@ def goal_achievement_forecast(investor: Dict) -> Dict:
     except:
         return {'status': 'InvalidTimeline'}
 
-def portfolio_rebalancing_recommendations(investor: Dict) -> Dict:
+def portfolio_rebalancing_recommendations(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 17: Generate rebalancing recommendations"""
-    allocation = asset_allocation_analysis(investor)['allocation']
+    allocation = _context(investor, ctx).allocation
     suggestions = []
     
     if allocation.get('Equity', 0) > 70:
@@ -321,9 +340,9 @@ def portfolio_rebalancing_recommendations(investor: Dict) -> Dict:
     
     return {'suggestions': suggestions}
 
-def performance_improvement_suggestions(investor: Dict) -> Dict:
+def performance_improvement_suggestions(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 18: Suggest performance improvements"""
-    under = underperforming_scheme_detection(investor)
+    under = underperforming_scheme_detection(investor, ctx)
     suggestions = []
     
     for scheme in under:
@@ -335,15 +354,15 @@ def performance_improvement_suggestions(investor: Dict) -> Dict:
     
     return {'suggestions': suggestions}
 
-def goal_based_rebalancing_advice(investor: Dict) -> Dict:
+def goal_based_rebalancing_advice(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 19: Provide goal-based rebalancing advice"""
     return {
         'advice': 'Map long-term goals to equity heavy funds and short-term to debt; rebalance annually.'
     }
 
-def ai_generated_summary(investor: Dict) -> Dict:
+def ai_generated_summary(investor: Dict, ctx: AnalysisContext = None) -> Dict:
     """Algorithm 20: Generate AI summary score"""
-    perf = portfolio_performance_summary(investor)
+    perf = portfolio_performance_summary(investor, ctx)
     portfolios = investor.get('portfolios', [])
     score = max(0, 100 - abs(perf['gainLoss']))
     
@@ -355,29 +374,95 @@ def ai_generated_summary(investor: Dict) -> Dict:
         'recommendation': 'Continue SIP discipline and review top losing funds.'
     }
 
-def run_all_analysis(investor: Dict) -> Dict:
-    """Run all 20 AI algorithms"""
-    return {
+# ==================== Algorithm Registry ====================
+
+class Algorithm(NamedTuple):
+    """A registered algorithm: output key, display name, function and the keys it builds on"""
+    key: str
+    name: str
+    fn: Callable[..., Any]
+    depends: Tuple[str, ...] = ()
+
+# Registry order is the order of keys in the analysis result
+ALGORITHMS: List[Algorithm] = [
+    Algorithm('performance', 'Portfolio performance summary', portfolio_performance_summary),
+    Algorithm('allocation', 'Asset allocation analysis', asset_allocation_analysis),
+    Algorithm('concentration', 'Fund house concentration check', fund_concentration_check),
+    Algorithm('underperforming', 'Underperforming scheme detection', underperforming_scheme_detection),
+    Algorithm('sip_health', 'SIP health tracking', sip_health_tracking),
+    Algorithm('diversification', 'Diversification quality score', diversification_quality_score),
+    Algorithm('risk_mismatch', 'Risk mismatch detection', risk_mismatch_detection),
+    Algorithm('category_imbalance', 'Category imbalance alert', category_imbalance_alert, ('allocation',)),
+    Algorithm('aum_concentration', 'AUM concentration risk', aum_concentration_risk),
+    Algorithm('underperf_alert', 'Underperformance alerts', underperformance_alerts),
+    Algorithm('liquidity', 'Liquidity flagging', liquidity_flagging),
+    Algorithm('sip_discontinuation', 'SIP discontinuation prediction', sip_discontinuation_prediction),
+    Algorithm('redemption_likelihood', 'Redemption likelihood', redemption_likelihood),
+    Algorithm('aum_forecast', 'AUM growth forecast', aum_growth_forecast),
+    Algorithm('churn_risk', 'Churn risk detection', churn_risk_detection, ('sip_discontinuation',)),
+    Algorithm('goal_forecast', 'Goal achievement forecast', goal_achievement_forecast),
+    Algorithm('rebalancing_recommendations', 'Portfolio rebalancing recommendations',
+              portfolio_rebalancing_recommendations, ('allocation',)),
+    Algorithm('performance_suggestions', 'Performance improvement suggestions',
+              performance_improvement_suggestions, ('underperforming',)),
+    Algorithm('goal_rebalancing_advice', 'Goal-based rebalancing advice', goal_based_rebalancing_advice),
+    Algorithm('ai_summary', 'AI generated summary', ai_generated_summary, ('performance',)),
+]
+
+REGISTRY: Dict[str, Algorithm] = {algorithm.key: algorithm for algorithm in ALGORITHMS}
+
+def resolve_algorithms(keys: Optional[List[str]] = None) -> List[str]:
+    """Requested keys plus everything they depend on, in registry order; all keys if none given"""
+    if not keys:
+        return list(REGISTRY)
+    
+    unknown = [key for key in keys if key not in REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown algorithms: {', '.join(unknown)}")
+    
+    needed = set()
+    pending = list(keys)
+    while pending:
+        key = pending.pop()
+        if key not in needed:
+            needed.add(key)
+            pending.extend(REGISTRY[key].depends)
+    return [key for key in REGISTRY if key in needed]
+
+def run_analysis(investor: Dict, algorithms: Optional[List[str]] = None,
+                 ctx: AnalysisContext = None, timings: Optional[Dict[str, float]] = None) -> Dict:
+    """Run the selected algorithms (and their dependencies) over one shared pass of the folios
+
+    If `timings` is given, wall time in milliseconds is added to it per
+    algorithm key, plus 'context' for the shared folio walk.
+    """
+    keys = resolve_algorithms(algorithms)
+    
+    started = time.perf_counter()
+    ctx = _context(investor, ctx)
+    if timings is not None:
+        timings['context'] = timings.get('context', 0) + (time.perf_counter() - started) * 1000
+    
+    result = {
         'investor_id': investor.get('investor_id'),
         'name': investor.get('name'),
-        'performance': portfolio_performance_summary(investor),
-        'allocation': asset_allocation_analysis(investor),
-        'concentration': fund_concentration_check(investor),
-        'underperforming': underperforming_scheme_detection(investor),
-        'sip_health': sip_health_tracking(investor),
-        'diversification': diversification_quality_score(investor),
-        'risk_mismatch': risk_mismatch_detection(investor),
-        'category_imbalance': category_imbalance_alert(investor),
-        'aum_concentration': aum_concentration_risk(investor),
-        'underperf_alert': underperformance_alerts(investor),
-        'liquidity': liquidity_flagging(investor),
-        'sip_discontinuation': sip_discontinuation_prediction(investor),
-        'redemption_likelihood': redemption_likelihood(investor),
-        'aum_forecast': aum_growth_forecast(investor),
-        'churn_risk': churn_risk_detection(investor),
-        'goal_forecast': goal_achievement_forecast(investor),
-        'rebalancing_recommendations': portfolio_rebalancing_recommendations(investor),
-        'performance_suggestions': performance_improvement_suggestions(investor),
-        'goal_rebalancing_advice': goal_based_rebalancing_advice(investor),
-        'ai_summary': ai_generated_summary(investor)
-    }
\ No newline at end of file
+    }
+    for key in keys:
+        started = time.perf_counter()
+        result[key] = REGISTRY[key].fn(investor, ctx)
+        if timings is not None:
+            timings[key] = timings.get(key, 0) + (time.perf_counter() - started) * 1000
+    return result
+
+def run_all_analysis(investor: Dict, ctx: AnalysisContext = None) -> Dict:
+    """Run all 20 AI algorithms over one shared pass of the folios"""
+    return run_analysis(investor, ctx=ctx)
+
+def run_all_analysis_batch(investors: List[Dict], algorithms: Optional[List[str]] = None,
+                           timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """run_analysis for many investors in one call, results in input order
+
+    Each investor gets its own AnalysisContext, so every result is identical
+    to a per-investor run; timings, if given, accumulate over the batch.
+    """
+    return [run_analysis(investor, algorithms, timings=timings) for investor in investors]
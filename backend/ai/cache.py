@@ -0,0 +1,158 @@
+"""Tiered cache for LLM responses
+
+An in-process LRU tier answers hot keys without I/O; behind it a MongoDB
+tier shares entries between uvicorn workers and survives restarts. Both tiers
+expire entries after the same TTL: the LRU drops them on access or purge, the
+MongoDB tier through a TTL index on `expires_at` (and purge_expired()).
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+class CacheStats:
+    """Hit/miss/eviction counters for one tier"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'expired': self.expired}
+
+class LRUCache:
+    """Size-bounded in-process tier; never awaits, so lookups cannot block the loop"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expired += 1
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self.stats.expired += len(expired)
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class MongoCache:
+    """Shared tier in a MongoDB collection with a TTL index on expires_at"""
+
+    def __init__(self, collection, ttl_seconds: int = 86400):
+        self.collection = collection
+        self.ttl = ttl_seconds
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[Any]:
+        # The TTL monitor runs once a minute, so filter out entries it has not reached yet
+        doc = await self.collection.find_one(
+            {'_id': key, 'expires_at': {'$gt': datetime.now(timezone.utc)}},
+            {'value': 1}
+        )
+        if doc is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return doc['value']
+
+    async def set(self, key: str, value: Any):
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {'_id': key},
+            {'$set': {'value': value, 'created_at': now, 'expires_at': now + timedelta(seconds=self.ttl)}},
+            upsert=True
+        )
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({'_id': key})
+
+    async def purge_expired(self) -> int:
+        result = await self.collection.delete_many({'expires_at': {'$lte': datetime.now(timezone.utc)}})
+        self.stats.expired += result.deleted_count
+        return result.deleted_count
+
+class TieredCache:
+    """LRU in front of an optional shared tier; shared hits are promoted into the LRU"""
+
+    def __init__(self, local: LRUCache, shared: Optional[MongoCache] = None):
+        self.local = local
+        self.shared = shared
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+        value = await self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any):
+        self.local.set(key, value)
+        if self.shared is not None:
+            await self.shared.set(key, value)
+
+    async def delete(self, key: str):
+        self.local.delete(key)
+        if self.shared is not None:
+            await self.shared.delete(key)
+
+    async def purge_expired(self) -> Dict[str, int]:
+        purged = {'local': self.local.purge_expired()}
+        if self.shared is not None:
+            purged['shared'] = await self.shared.purge_expired()
+        return purged
+
+    def configure(self, collection=None):
+        """Rebuild both tiers from CACHE_TTL_SECONDS and CACHE_MAX_ENTRIES as they are set now"""
+        fresh = build_cache(collection)
+        self.local, self.shared = fresh.local, fresh.shared
+
+    def stats(self) -> Dict:
+        report = {'local': {**self.local.stats.as_dict(), 'entries': len(self.local),
+                            'max_entries': self.local.max_entries}}
+        if self.shared is not None:
+            report['shared'] = self.shared.stats.as_dict()
+        return report
+
+def ttl_from_env() -> int:
+    return int(os.getenv('CACHE_TTL_SECONDS', 86400))
+
+def build_cache(collection=None) -> TieredCache:
+    """TieredCache configured from CACHE_TTL_SECONDS and CACHE_MAX_ENTRIES"""
+    ttl = ttl_from_env()
+    local = LRUCache(int(os.getenv('CACHE_MAX_ENTRIES', 1000)), ttl)
+    return TieredCache(local, MongoCache(collection, ttl) if collection is not None else None)
@@ -1,61 +1,53 @@
 """ChatGPT Integration with Caching"""
 import os
 import json
+import hashlib
 import asyncio
-from pathlib import Path
-from datetime import datetime, timedelta
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+from ai.cache import build_cache
+from ai.llm_client import LLMError, get_llm_client
+from ai.singleflight import SingleFlight
 
-CACHE_DIR = Path(__file__).parent / 'cache'
-CACHE_DIR.mkdir(exist_ok=True)
+# In-process tier with default settings until the server configures both tiers from env
+summary_cache = build_cache()
+# Concurrent requests for one cache key share a single LLM call; the server adds a cross-worker lock
+summary_flight = SingleFlight()
 
-def cache_get(key: str) -> dict:
-    """Get cached response"""
-    cache_file = CACHE_DIR / f"{key}.json"
-    if not cache_file.exists():
-        return None
-    
-    try:
-        with open(cache_file, 'r') as f:
-            obj = json.load(f)
-        
-        ttl_seconds = int(os.getenv('CACHE_TTL_SECONDS', 86400))
-        cache_age = datetime.now().timestamp() - obj.get('_ts', 0)
-        
-        if cache_age > ttl_seconds:
-            return None
-        
-        return obj.get('data')
-    except:
-        return None
-
-def cache_set(key: str, data: dict):
-    """Set cached response"""
-    cache_file = CACHE_DIR / f"{key}.json"
-    obj = {
-        '_ts': datetime.now().timestamp(),
-        'data': data
-    }
-    with open(cache_file, 'w') as f:
-        json.dump(obj, f, indent=2)
+# Bump whenever PROMPT_TEMPLATE or the payload fields change so old summaries stop matching
+PROMPT_VERSION = 1
+# Same for BATCH_PROMPT_TEMPLATE; both are in every key since single and batch answers share cache entries
+BATCH_PROMPT_VERSION = 1
 
-async def get_ai_summary(analysis_result: dict) -> dict:
-    """Get AI summary using Emergent LLM integration"""
-    key = f"ai_{analysis_result.get('investor_id', 'unknown')}"
-    
-    # Check cache first
-    cached = cache_get(key)
-    if cached:
-        return cached
-    
-    # Get API key
-    api_key = os.getenv('EMERGENT_LLM_KEY')
-    if not api_key:
-        return {'summary': 'EMERGENT_LLM_KEY not configured'}
-    
-    # Prepare compact payload for token optimization
-    payload = {
-        'investor_id': analysis_result.get('investor_id'),
+SYSTEM_MESSAGE = "You are a financial advisor for mutual fund distributors."
+
+PROMPT_TEMPLATE = """You are an AI financial assistant for mutual fund distributors in India. Given this compact JSON, produce:
+1) A 2-3 line plain English summary of portfolio health
+2) 2 actionable recommendations for the distributor to suggest to the client
+
+IMPORTANT: Use Indian Rupees (₹) for all monetary values, NOT dollars ($).
+
+JSON:
+{payload}
+
+Provide concise, professional advice focused on risk management and growth. Remember to use ₹ (Rupees) for currency."""
+
+BATCH_PROMPT_TEMPLATE = """You are an AI financial assistant for mutual fund distributors in India. Below is a JSON array of compact portfolio records, one per investor. For EACH record produce:
+1) "summary": a 2-3 line plain English summary of portfolio health
+2) "recommendations": 2 actionable recommendations for the distributor to suggest to the client
+
+IMPORTANT: Use Indian Rupees (₹) for all monetary values, NOT dollars ($).
+Reply with ONLY a JSON array, one object per record, each of the form
+{{"investor_id": "<investor_id of the record>", "summary": "...", "recommendations": ["...", "..."]}}
+
+{payloads}"""
+
+# Output tokens budgeted per investor in a batch reply
+BATCH_OUTPUT_TOKENS = 150
+
+def summary_payload(analysis_result: dict) -> dict:
+    """Compact payload sent to the model; carries no investor identity so equal portfolios share a summary"""
+    return {
         'aum': analysis_result.get('performance', {}).get('value'),
         'gain_loss': analysis_result.get('performance', {}).get('gainLoss'),
         'alerts': [
@@ -67,34 +59,260 @@ async def get_ai_summary(analysis_result: dict) -> dict:
         'risk_mismatch': analysis_result.get('risk_mismatch', {}).get('alert'),
         'churn_risk': analysis_result.get('churn_risk', {}).get('churnRisk')
     }
+
+def template_summary(analysis_result: dict) -> dict:
+    """Deterministic stand-in built from the algorithm results, for when the LLM is late or failing"""
+    generated = analysis_result.get('ai_summary', {})
+    risk_mismatch = analysis_result.get('risk_mismatch', {}).get('alert')
+    churn = analysis_result.get('churn_risk', {})
+    alerts = analysis_result.get('concentration', {}).get('alerts', [])
     
-    prompt = f"""You are an AI financial assistant for mutual fund distributors in India. Given this compact JSON, produce:
-1) A 2-3 line plain English summary of portfolio health
-2) 2 actionable recommendations for the distributor to suggest to the client
+    lines = [generated.get('summary', 'Portfolio analysis is ready.')]
+    if risk_mismatch:
+        lines.append(f"{risk_mismatch}.")
+    if churn.get('churnRisk') == 'High':
+        lines.append(f"Churn risk is high (score {churn.get('score')}).")
+    
+    recommendations = []
+    for alert in alerts[:1]:
+        recommendations.append(f"Reduce exposure to {alert.get('amc')}, which holds {alert.get('pct')}% of the portfolio.")
+    if risk_mismatch:
+        recommendations.append("Rebalance equity exposure to match the client's risk profile.")
+    if churn.get('churnRisk') == 'High':
+        recommendations.append('Schedule a review call to address recent losses and paused SIPs.')
+    recommendations.append(generated.get('recommendation', 'Continue SIP discipline and review top losing funds.'))
+    
+    text = '\n'.join(lines + [f"{i}) {r}" for i, r in enumerate(recommendations[:2], 1)])
+    return {'summary': text, 'provisional': True, 'source': 'template'}
 
-IMPORTANT: Use Indian Rupees (₹) for all monetary values, NOT dollars ($).
+def summary_cache_key(payload: dict, model: str) -> str:
+    """Hash of the canonical payload, model and both prompt versions"""
+    raw = json.dumps(
+        {'payload': payload, 'model': model, 'prompt_version': [PROMPT_VERSION, BATCH_PROMPT_VERSION]},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return f"ai_{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
 
-JSON:
-{json.dumps(payload, indent=2)}
+async def get_ai_summary(analysis_result: dict) -> dict:
+    """Get AI summary using Emergent LLM integration
+    
+    Failures come back as {'summary': <message>, 'error': True}; they are not
+    cached and callers should not store them.
+    """
+    client = get_llm_client()
+    # Prepare compact payload for token optimization
+    payload = summary_payload(analysis_result)
+    key = summary_cache_key(payload, client.model)
+    
+    # Check cache first
+    cached = await summary_cache.get(key)
+    if cached:
+        return cached
+    
+    if not client.configured:
+        return {'summary': 'EMERGENT_LLM_KEY not configured', 'error': True}
+    
+    return await summary_flight.do(
+        key,
+        lambda: _request_summary(client, key, payload, analysis_result.get('investor_id')),
+        recheck=lambda: summary_cache.get(key)
+    )
 
-Provide concise, professional advice focused on risk management and growth. Remember to use ₹ (Rupees) for currency."""
+async def _request_summary(client, key: str, payload: dict, investor_id) -> dict:
+    """Call the model and cache its answer"""
+    prompt = PROMPT_TEMPLATE.format(payload=json.dumps(payload, indent=2))
     
     try:
-        # Initialize LLM Chat
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"mf360_{analysis_result.get('investor_id')}",
-            system_message="You are a financial advisor for mutual fund distributors."
-        ).with_model("openai", os.getenv('AI_MODEL', 'gpt-4o-mini'))
-        
-        # Send message
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
-        
-        result = {'summary': response}
-        cache_set(key, result)
-        return result
+        response = await client.complete(prompt, SYSTEM_MESSAGE, session_id=f"mf360_{investor_id}")
+    except LLMError as e:
+        logging.error(f"LLM summary failed for {investor_id}: {str(e)}")
+        return {'summary': f'AI temporarily unavailable: {str(e)}', 'error': True}
+    
+    result = {'summary': response}
+    await summary_cache.set(key, result)
+    return result
+
+class _ChunkFeed:
+    """Chunks of one streamed summary so far; every subscriber replays them from the start"""
+    
+    def __init__(self):
+        self.chunks: List[str] = []
+        self._next = asyncio.get_running_loop().create_future()
+    
+    def push(self, chunk: str):
+        self.chunks.append(chunk)
+        self._next.set_result(None)
+        self._next = asyncio.get_running_loop().create_future()
+    
+    async def follow(self, task: asyncio.Future) -> AsyncIterator[str]:
+        """Every chunk pushed until task finishes"""
+        sent = 0
+        while True:
+            while sent < len(self.chunks):
+                sent += 1
+                yield self.chunks[sent - 1]
+            if task.done():
+                return
+            await asyncio.wait({task, self._next}, return_when=asyncio.FIRST_COMPLETED)
+
+# Feeds of the summaries being streamed in this worker, by cache key
+_feeds: Dict[str, _ChunkFeed] = {}
+
+async def _stream_summary(client, key: str, payload: dict, investor_id, feed: _ChunkFeed) -> dict:
+    """Stream the model's answer into feed and cache it"""
+    prompt = PROMPT_TEMPLATE.format(payload=json.dumps(payload, indent=2))
+    
+    try:
+        async for chunk in client.stream(prompt, SYSTEM_MESSAGE, session_id=f"mf360_{investor_id}"):
+            feed.push(chunk)
+    except LLMError as e:
+        logging.error(f"LLM summary stream failed for {investor_id}: {str(e)}")
+        return {'summary': f'AI temporarily unavailable: {str(e)}', 'error': True}
+    
+    result = {'summary': ''.join(feed.chunks)}
+    await summary_cache.set(key, result)
+    return result
+
+async def stream_ai_summary(analysis_result: dict) -> AsyncIterator[dict]:
+    """Summary as it is generated: {'token': text} chunks, then {'summary': <summary dict>}
+    
+    A cached summary is yielded at once with no tokens. Concurrent streams of
+    the same summary share one LLM call through summary_flight; a stream that
+    joins a non-streaming get_ai_summary call gets no tokens, only the final
+    summary. The final summary is cached before it is yielded, unless it is
+    an error.
+    """
+    client = get_llm_client()
+    payload = summary_payload(analysis_result)
+    key = summary_cache_key(payload, client.model)
+    
+    cached = await summary_cache.get(key)
+    if cached:
+        yield {'summary': cached}
+        return
+    
+    if not client.configured:
+        yield {'summary': {'summary': 'EMERGENT_LLM_KEY not configured', 'error': True}}
+        return
+    
+    feed = _feeds.get(key)
+    if feed is None:
+        feed = _feeds[key] = _ChunkFeed()
+    summary_task = asyncio.ensure_future(summary_flight.do(
+        key,
+        lambda: _stream_summary(client, key, payload, analysis_result.get('investor_id'), feed),
+        recheck=lambda: summary_cache.get(key)
+    ))
+    summary_task.add_done_callback(lambda _: _feeds.pop(key) if _feeds.get(key) is feed else None)
+    
+    try:
+        async for chunk in feed.follow(summary_task):
+            yield {'token': chunk}
+        yield {'summary': await summary_task}
+    finally:
+        # Only this subscriber's wait; the shared call carries on for the others
+        summary_task.cancel()
+
+def _pack_batches(entries: List[Dict], token_budget: int, max_size: int) -> List[List[Dict]]:
+    """Greedy split of payload entries into prompts that stay under token_budget"""
+    overhead = len(BATCH_PROMPT_TEMPLATE) // 4
+    batches, current, used = [], [], overhead
+    for entry in entries:
+        cost = len(json.dumps(entry)) // 4 + BATCH_OUTPUT_TOKENS
+        if current and (used + cost > token_budget or len(current) >= max_size):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(entry)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def _parse_batch_reply(text: str, expected: set) -> Dict[str, Dict]:
+    """Valid summaries from a batch reply keyed by investor_id; malformed entries are dropped"""
+    # Models sometimes wrap the array in prose or a fenced block despite the instructions
+    try:
+        entries = json.loads(text[text.find('['):text.rfind(']') + 1])
+    except ValueError:
+        return {}
+    if not isinstance(entries, list):
+        return {}
+    
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or entry.get('investor_id') not in expected:
+            continue
+        summary = entry.get('summary')
+        recommendations = entry.get('recommendations') or []
+        if not isinstance(summary, str) or not summary.strip():
+            continue
+        if not isinstance(recommendations, list) or not all(isinstance(r, str) for r in recommendations):
+            continue
+        lines = [summary.strip()] + [f"{i}) {r.strip()}" for i, r in enumerate(recommendations, 1)]
+        parsed[entry['investor_id']] = {'summary': '\n'.join(lines), 'recommendations': recommendations}
+    return parsed
+
+async def _request_batch(client, batch: List[Dict]) -> Dict[str, Dict]:
+    """One LLM call for a packed batch; returns whatever entries came back valid"""
+    prompt = BATCH_PROMPT_TEMPLATE.format(payloads=json.dumps(batch, indent=1))
+    try:
+        text = await client.complete(
+            prompt, SYSTEM_MESSAGE,
+            session_id=f"mf360_batch_{batch[0]['investor_id']}",
+            max_output_tokens=BATCH_OUTPUT_TOKENS * len(batch)
+        )
+    except LLMError as e:
+        logging.error(f"Batch LLM summary of {len(batch)} investors failed: {str(e)}")
+        return {}
+    return _parse_batch_reply(text, {entry['investor_id'] for entry in batch})
+
+async def get_ai_summaries(analysis_results: List[dict], token_budget: Optional[int] = None,
+                           max_batch_size: Optional[int] = None) -> List[dict]:
+    """Summaries for many investors, in input order, packing cache misses into batch prompts
+    
+    Investors with equal payloads share one entry. Entries missing or invalid
+    in a batch reply are retried through get_ai_summary one by one.
+    """
+    client = get_llm_client()
+    token_budget = token_budget or int(os.getenv('LLM_BATCH_TOKEN_BUDGET', 6000))
+    max_batch_size = max_batch_size or int(os.getenv('LLM_BATCH_SIZE', 20))
+    
+    keys = []
+    pending: Dict[str, Dict] = {}
+    results: Dict[str, Dict] = {}
+    for analysis_result in analysis_results:
+        payload = summary_payload(analysis_result)
+        key = summary_cache_key(payload, client.model)
+        keys.append(key)
+        if key in results or key in pending:
+            continue
+        cached = await summary_cache.get(key)
+        if cached:
+            results[key] = cached
+        else:
+            pending[key] = {'investor_id': analysis_result.get('investor_id'), **payload}
+    
+    if pending and not client.configured:
+        for key in pending:
+            results[key] = {'summary': 'EMERGENT_LLM_KEY not configured', 'error': True}
+        pending = {}
+    
+    if pending:
+        key_of = {entry['investor_id']: key for key, entry in pending.items()}
+        batches = _pack_batches(list(pending.values()), token_budget, max_batch_size)
+        replies = await asyncio.gather(*[_request_batch(client, batch) for batch in batches])
+        for reply in replies:
+            for investor_id, summary in reply.items():
+                key = key_of[investor_id]
+                results[key] = summary
+                await summary_cache.set(key, summary)
         
-    except Exception as e:
-        print(f"ChatGPT error: {str(e)}")
-        return {'summary': f'AI temporarily unavailable: {str(e)}'}
+        # Fall back to single-investor prompts for whatever the batches did not cover
+        by_key = dict(zip(keys, analysis_results))
+        missing = [key for key in pending if key not in results]
+        if missing:
+            logging.warning(f"Batch summaries missing for {len(missing)} investors; retrying individually")
+            singles = await asyncio.gather(*[get_ai_summary(by_key[key]) for key in missing])
+            results.update(zip(missing, singles))
+    
+    return [results[key] for key in keys]
@@ -0,0 +1,75 @@
+"""Fingerprints that tell whether a stored analysis still matches its investor
+
+A fingerprint hashes only the fields the algorithms read, so edits elsewhere
+(contact details, search tokens) do not force a recompute. Bump
+ANALYSIS_VERSION whenever an algorithm's output changes; stored analyses with
+another version are treated as stale.
+"""
+import json
+import hashlib
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+
+ANALYSIS_VERSION = 1
+
+# Investor fields read by ai.analysis
+ANALYSIS_FIELDS = (
+    'investor_id', 'name', 'portfolios', 'total_aum', 'total_invested', 'gain_loss_pct',
+    'risk_profile', 'goal_target_corpus', 'goal_timeline', 'last_activity_days'
+)
+
+def _canonical(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    return str(value)
+
+def analysis_fingerprint(investor: Dict) -> str:
+    """Stable hash of the analysis inputs; key order and date representation do not matter"""
+    relevant = {field: investor.get(field) for field in ANALYSIS_FIELDS}
+    raw = json.dumps(relevant, sort_keys=True, separators=(',', ':'), default=_canonical)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def analysis_record(investor: Dict, analysis_result: Dict, ai_summary: Dict, now: datetime) -> Dict:
+    """ai_analyses document for a fresh run"""
+    return {
+        'investor_id': investor['investor_id'],
+        'analysis_result': analysis_result,
+        'ai_summary': ai_summary,
+        'fingerprint': analysis_fingerprint(investor),
+        'analysis_version': ANALYSIS_VERSION,
+        'created_at': now
+    }
+
+def is_current(stored: Optional[Dict], fingerprint: str, max_age: timedelta) -> bool:
+    """True if a stored analysis can be served instead of recomputing
+
+    Inputs unchanged is not enough on its own: SIP recency and goal horizons
+    depend on today's date, so results also expire after max_age.
+    """
+    if not stored or stored.get('fingerprint') != fingerprint:
+        return False
+    if stored.get('analysis_version') != ANALYSIS_VERSION:
+        return False
+    # A template stand-in is only served until the LLM summary replaces it
+    if (stored.get('ai_summary') or {}).get('provisional'):
+        return False
+    created_at = stored.get('created_at')
+    if not isinstance(created_at, datetime):
+        return False
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - created_at <= max_age
+
+async def current_analyses(db, investors, max_age: timedelta) -> Dict[str, Dict]:
+    """Stored analyses, keyed by investor_id, that are still current for these investors"""
+    fingerprints = {investor['investor_id']: analysis_fingerprint(investor) for investor in investors}
+    stored = await db.ai_analyses.find(
+        {'investor_id': {'$in': list(fingerprints)}},
+        {'_id': 0}
+    ).to_list(None)
+    return {
+        doc['investor_id']: doc for doc in stored
+        if is_current(doc, fingerprints[doc['investor_id']], max_age)
+    }
@@ -0,0 +1,336 @@
+"""Shared LLM client with rate limiting, retries and a circuit breaker
+
+Every summary request goes through one LLMClient per worker: token buckets
+hold requests and estimated tokens under the provider's per-minute limits, a
+semaphore bounds concurrent calls, failed calls are retried with jittered
+exponential backoff, and after repeated failures the circuit opens so callers
+fail fast instead of queueing behind a provider that is down.
+
+LLM_PROVIDER=stub swaps the Emergent provider for a deterministic local one so
+throughput and backpressure can be load-tested offline.
+"""
+import os
+import time
+import json
+import random
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class LLMError(Exception):
+    """The provider could not produce a completion"""
+
+class CircuitOpenError(LLMError):
+    """Calls are being rejected until the provider has had time to recover"""
+
+class TokenBucket:
+    """Refills at per_minute/60 units per second up to capacity"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take amount units, sleeping until they are available; returns seconds waited"""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # Waiters are served in arrival order so large requests are not starved
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; lets calls probe again after reset_seconds"""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def check(self):
+        if self.state == 'open':
+            raise CircuitOpenError('LLM circuit open after repeated failures')
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # A failed probe re-opens at once; otherwise wait for the threshold
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class EmergentProvider:
+    """Completions through the Emergent LLM integration"""
+
+    name = 'emergent'
+
+    def __init__(self, api_key: Optional[str], vendor: str = 'openai'):
+        self.api_key = api_key
+        self.vendor = vendor
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def complete(self, prompt: str, system_message: str, model: str, session_id: str) -> str:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+        # LlmChat carries per-session history, so one is built per request
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(self.vendor, model)
+        return await chat.send_message(UserMessage(text=prompt))
+
+    async def stream(self, prompt: str, system_message: str, model: str, session_id: str) -> AsyncIterator[str]:
+        # The integration returns whole completions, so the reply arrives as one chunk
+        yield await self.complete(prompt, system_message, model, session_id)
+
+class StubProvider:
+    """Deterministic offline provider: the reply depends only on the prompt"""
+
+    name = 'stub'
+    configured = True
+
+    def __init__(self, latency_ms: float = 200, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    async def complete(self, prompt: str, system_message: str, model: str, session_id: str) -> str:
+        await asyncio.sleep(self.latency)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise LLMError('stub provider failure')
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        batch = self._batch_ids(prompt)
+        if batch is not None:
+            # Batch prompts get the JSON array they ask for
+            return json.dumps([{
+                'investor_id': investor_id,
+                'summary': f"Stub summary {digest}/{investor_id}: portfolio health reviewed offline.",
+                'recommendations': [
+                    'Review concentration and underperforming schemes.',
+                    "Align the allocation with the client's risk profile."
+                ]
+            } for investor_id in batch])
+        return (
+            f"Stub summary {digest}: portfolio health reviewed offline.\n"
+            f"1) Review concentration and underperforming schemes.\n"
+            f"2) Align the allocation with the client's risk profile."
+        )
+
+    async def stream(self, prompt: str, system_message: str, model: str, session_id: str) -> AsyncIterator[str]:
+        text = await self.complete(prompt, system_message, model, session_id)
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            # Spread another full latency over the words, like a model emitting tokens
+            await asyncio.sleep(self.latency / len(words))
+            yield word if i == 0 else ' ' + word
+
+    @staticmethod
+    def _batch_ids(prompt: str) -> Optional[List[str]]:
+        start, end = prompt.find('\n['), prompt.rfind(']')
+        if start < 0 or end < start:
+            return None
+        try:
+            entries = json.loads(prompt[start:end + 1])
+        except ValueError:
+            return None
+        if not all(isinstance(e, dict) and 'investor_id' in e for e in entries):
+            return None
+        return [e['investor_id'] for e in entries]
+
+class LLMClient:
+    """Rate-limited, concurrency-bounded, retrying front for one provider"""
+
+    def __init__(self, provider, model: str, requests_per_minute: int = 500, tokens_per_minute: int = 200000,
+                 max_concurrency: int = 16, timeout_seconds: float = 30, max_retries: int = 3,
+                 backoff_seconds: float = 0.5, max_backoff_seconds: float = 8,
+                 max_output_tokens: int = 300, breaker: Optional[CircuitBreaker] = None):
+        self.provider = provider
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff = backoff_seconds
+        self.max_backoff = max_backoff_seconds
+        self.max_output_tokens = max_output_tokens
+        self.breaker = breaker or CircuitBreaker()
+        self.counters = {
+            'calls': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'rejected': 0, 'in_flight': 0,
+            'estimated_tokens': 0
+        }
+        self.throttled_seconds = 0.0
+
+    @property
+    def configured(self) -> bool:
+        return self.provider.configured
+
+    def estimate_tokens(self, prompt: str, max_output_tokens: Optional[int] = None) -> int:
+        # Roughly four characters per token, plus the reply
+        return len(prompt) // 4 + (max_output_tokens or self.max_output_tokens)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _admit(self, prompt: str, max_output_tokens: Optional[int], attempt: int):
+        """Fail fast on an open circuit, then wait for request and token budget"""
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            self.counters['rejected'] += 1
+            self.counters['failed'] += 1
+            raise
+
+        if attempt:
+            self.counters['retries'] += 1
+        self.throttled_seconds += await self.requests.acquire()
+        estimated = self.estimate_tokens(prompt, max_output_tokens)
+        self.counters['estimated_tokens'] += estimated
+        self.throttled_seconds += await self.tokens.acquire(estimated)
+
+    async def complete(self, prompt: str, system_message: str, session_id: str,
+                       max_output_tokens: Optional[int] = None) -> str:
+        """Completion text; raises LLMError once retries are exhausted or the circuit is open"""
+        self.counters['calls'] += 1
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            await self._admit(prompt, max_output_tokens, attempt)
+            async with self._semaphore:
+                self.counters['in_flight'] += 1
+                try:
+                    text = await asyncio.wait_for(
+                        self.provider.complete(prompt, system_message, self.model, session_id),
+                        self.timeout
+                    )
+                except Exception as e:
+                    last_error = e
+                    self.breaker.record_failure()
+                    logger.warning(f"LLM call failed (attempt {attempt + 1}): {type(e).__name__}: {str(e)}")
+                else:
+                    self.breaker.record_success()
+                    self.counters['succeeded'] += 1
+                    return text
+                finally:
+                    self.counters['in_flight'] -= 1
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+        self.counters['failed'] += 1
+        raise LLMError(f"{type(last_error).__name__}: {str(last_error) or 'timed out'}")
+
+    async def stream(self, prompt: str, system_message: str, session_id: str,
+                     max_output_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Completion chunks as they arrive
+
+        Failures before the first chunk are retried like complete(); once text
+        has been yielded a failure raises LLMError, since a retry would repeat it.
+        """
+        self.counters['calls'] += 1
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            await self._admit(prompt, max_output_tokens, attempt)
+            started = False
+            async with self._semaphore:
+                self.counters['in_flight'] += 1
+                try:
+                    chunks = self.provider.stream(prompt, system_message, self.model, session_id).__aiter__()
+                    while True:
+                        # The timeout applies to each gap between chunks, not the whole reply
+                        chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        started = True
+                        yield chunk
+                except StopAsyncIteration:
+                    self.breaker.record_success()
+                    self.counters['succeeded'] += 1
+                    return
+                except Exception as e:
+                    last_error = e
+                    self.breaker.record_failure()
+                    logger.warning(f"LLM stream failed (attempt {attempt + 1}): {type(e).__name__}: {str(e)}")
+                    if started:
+                        break
+                finally:
+                    self.counters['in_flight'] -= 1
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+        self.counters['failed'] += 1
+        raise LLMError(f"{type(last_error).__name__}: {str(last_error) or 'timed out'}")
+
+    def stats(self) -> Dict:
+        return {
+            'provider': self.provider.name,
+            'model': self.model,
+            **self.counters,
+            'max_concurrency': self.max_concurrency,
+            'throttled_seconds': round(self.throttled_seconds, 3),
+            'circuit': self.breaker.state
+        }
+
+def llm_client_from_env() -> LLMClient:
+    """LLMClient configured from LLM_* variables, AI_MODEL and EMERGENT_LLM_KEY"""
+    if os.getenv('LLM_PROVIDER', 'emergent') == 'stub':
+        provider = StubProvider(
+            latency_ms=float(os.getenv('LLM_STUB_LATENCY_MS', 200)),
+            failure_rate=float(os.getenv('LLM_STUB_FAILURE_RATE', 0)),
+            seed=int(os.getenv('LLM_STUB_SEED', 0))
+        )
+    else:
+        provider = EmergentProvider(os.getenv('EMERGENT_LLM_KEY'))
+    return LLMClient(
+        provider,
+        os.getenv('AI_MODEL', 'gpt-4o-mini'),
+        requests_per_minute=int(os.getenv('LLM_REQUESTS_PER_MINUTE', 500)),
+        tokens_per_minute=int(os.getenv('LLM_TOKENS_PER_MINUTE', 200000)),
+        max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', 16)),
+        timeout_seconds=float(os.getenv('LLM_TIMEOUT_SECONDS', 30)),
+        max_retries=int(os.getenv('LLM_MAX_RETRIES', 3)),
+        breaker=CircuitBreaker(
+            int(os.getenv('LLM_BREAKER_THRESHOLD', 5)),
+            float(os.getenv('LLM_BREAKER_RESET_SECONDS', 30))
+        )
+    )
+
+_client: Optional[LLMClient] = None
+
+def get_llm_client() -> LLMClient:
+    """The worker's shared client, built on first use so .env has been loaded"""
+    global _client
+    if _client is None:
+        _client = llm_client_from_env()
+    return _client
@@ -0,0 +1,156 @@
+"""Process pool that keeps CPU-bound analysis off the event loop
+
+Workers are spawned (not forked) so they never inherit the Motor client or
+the event loop, and are warmed up at startup so the first request does not
+pay for process creation and module imports.
+"""
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Union
+
+from ai.analysis import REGISTRY, run_analysis, run_all_analysis_batch
+
+logger = logging.getLogger(__name__)
+
+def _worker_ready() -> int:
+    """Warm-up task; unpickling it in a worker imports ai.pool and with it ai.analysis"""
+    return os.getpid()
+
+def _timed_analysis(investor: Dict, algorithms: Optional[List[str]]) -> Tuple[Dict, Dict[str, float]]:
+    timings = {}
+    return run_analysis(investor, algorithms, timings=timings), timings
+
+def _timed_batch(investors: List[Dict], algorithms: Optional[List[str]]) -> Tuple[List[Dict], Dict[str, float]]:
+    timings = {}
+    return run_all_analysis_batch(investors, algorithms, timings), timings
+
+class AlgorithmStats:
+    """Wall time per algorithm, summed over every run this process has dispatched"""
+
+    def __init__(self):
+        self.runs = 0
+        self.total_ms: Dict[str, float] = {}
+        self.max_ms: Dict[str, float] = {}
+
+    def record(self, timings: Dict[str, float], runs: int = 1):
+        self.runs += runs
+        for key, ms in timings.items():
+            self.total_ms[key] = self.total_ms.get(key, 0) + ms
+            # Batches report a sum, so the per-run maximum is only tracked for single runs
+            if runs == 1:
+                self.max_ms[key] = max(self.max_ms.get(key, 0), ms)
+
+    def report(self) -> List[Dict]:
+        """Per-key totals and averages, most expensive first"""
+        rows = [{
+            'key': key,
+            'name': REGISTRY[key].name if key in REGISTRY else 'Shared folio pass',
+            'total_ms': round(total, 3),
+            'avg_ms': round(total / self.runs, 4) if self.runs else 0,
+            'max_ms': round(self.max_ms[key], 3) if key in self.max_ms else None
+        } for key, total in self.total_ms.items()]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+class AnalysisPool:
+    """Managed ProcessPoolExecutor for the analysis algorithms; size 0 runs work on a thread"""
+
+    def __init__(self, size: int, chunk_size: int = 100):
+        self.size = size
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._replace_lock = asyncio.Lock()
+        self.replaced = 0
+        self.stats = AlgorithmStats()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.size, mp_context=multiprocessing.get_context('spawn'))
+
+    async def start(self):
+        """Create the workers and wait until every one has imported the analysis code"""
+        if self.size <= 0 or self._executor is not None:
+            return
+        self._executor = self._new_executor()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, _worker_ready) for _ in range(self.size)
+        ])
+        logger.info(f"Analysis pool ready with {len(set(pids))} of {self.size} workers warm")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _replace(self, broken: ProcessPoolExecutor):
+        """Swap a pool broken by a dead worker for a fresh one, once however many callers saw it break"""
+        async with self._replace_lock:
+            if self._executor is not broken:
+                return
+            logger.warning("Analysis pool broken by a dead worker; starting new workers")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            self.replaced += 1
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        if executor is None:
+            # No pool configured: still keep the loop responsive via a thread
+            return await loop.run_in_executor(None, fn, *args)
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM kill, crash); once the pool breaks every later call would fail
+            await self._replace(executor)
+            if self._executor is None:
+                raise
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def analyze(self, investor: Dict, algorithms: Optional[List[str]] = None) -> Tuple[Dict, Dict[str, float]]:
+        """run_analysis for one investor in a worker; returns the result and its timings in ms"""
+        result, timings = await self._run(_timed_analysis, investor, algorithms)
+        self.stats.record(timings)
+        return result, timings
+
+    async def _analyze_chunk(self, investors: List[Dict], algorithms: Optional[List[str]]) -> List[Union[Dict, Exception]]:
+        """One chunk as a batch; if the batch raises, each investor alone so one bad record fails only itself"""
+        try:
+            results, timings = await self._run(_timed_batch, investors, algorithms)
+        except Exception as e:
+            logger.warning(f"Analysis of a {len(investors)}-investor chunk failed ({str(e)}); retrying one at a time")
+            outcomes = await asyncio.gather(*[
+                self._run(_timed_analysis, investor, algorithms) for investor in investors
+            ], return_exceptions=True)
+            results = []
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    results.append(outcome)
+                    continue
+                result, timings = outcome
+                self.stats.record(timings)
+                results.append(result)
+            return results
+        self.stats.record(timings, runs=len(investors))
+        return results
+
+    async def analyze_many(self, investors: List[Dict], algorithms: Optional[List[str]] = None) -> List[Union[Dict, Exception]]:
+        """run_all_analysis_batch split into chunks spread across the workers
+
+        Results are in input order; an investor whose analysis raised has the
+        exception in its place.
+        """
+        if not investors:
+            return []
+        workers = max(self.size, 1)
+        chunk = min(self.chunk_size, -(-len(investors) // workers))
+        chunks = [investors[i:i + chunk] for i in range(0, len(investors), chunk)]
+        batches = await asyncio.gather(*[self._analyze_chunk(c, algorithms) for c in chunks])
+        return [analysis for results in batches for analysis in results]
+
+def pool_size_from_env() -> int:
+    """ANALYSIS_POOL_SIZE, defaulting to one worker per core"""
+    return int(os.environ.get('ANALYSIS_POOL_SIZE', os.cpu_count() or 1))
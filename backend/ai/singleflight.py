@@ -0,0 +1,132 @@
+"""Coalescing of concurrent calls for the same key
+
+Within a worker, callers that ask for a key already being computed await the
+same task instead of starting another. Across workers, an optional MongoDB
+lock lets one worker compute while the others wait for it to finish and then
+re-read the shared result.
+"""
+import uuid
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from pymongo.errors import DuplicateKeyError
+
+class MongoLock:
+    """Expiring per-key lock in a MongoDB collection; a crashed holder's lock lapses after ttl_seconds"""
+
+    def __init__(self, collection, ttl_seconds: int = 60, poll_interval: float = 0.2):
+        self.collection = collection
+        self.ttl = ttl_seconds
+        self.poll_interval = poll_interval
+
+    async def acquire(self, key: str) -> Optional[str]:
+        """Token for releasing the lock, or None if another holder has it"""
+        now = datetime.now(timezone.utc)
+        token = uuid.uuid4().hex
+        expires_at = now + timedelta(seconds=self.ttl)
+        try:
+            await self.collection.insert_one({'_id': key, 'token': token, 'expires_at': expires_at})
+            return token
+        except DuplicateKeyError:
+            # Take over a lock whose holder died without releasing it
+            taken = await self.collection.find_one_and_update(
+                {'_id': key, 'expires_at': {'$lte': now}},
+                {'$set': {'token': token, 'expires_at': expires_at}}
+            )
+            return token if taken else None
+
+    async def renew(self, key: str, token: str) -> bool:
+        """Push a held lock's expiry ttl_seconds ahead; False if the lock was lost"""
+        result = await self.collection.update_one(
+            {'_id': key, 'token': token},
+            {'$set': {'expires_at': datetime.now(timezone.utc) + timedelta(seconds=self.ttl)}}
+        )
+        return result.matched_count == 1
+
+    async def release(self, key: str, token: str):
+        await self.collection.delete_one({'_id': key, 'token': token})
+
+    async def keep_alive(self, key: str, token: str):
+        """Renew a held lock every third of ttl_seconds until cancelled or the lock is lost"""
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            if not await self.renew(key, token):
+                return
+
+    async def wait(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Wait until the lock is released or lapses; False if it was still held after timeout seconds
+
+        A live holder keeps renewing, so without a timeout this waits as long as it works.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else float('inf')
+        while loop.time() < deadline:
+            held = await self.collection.find_one(
+                {'_id': key, 'expires_at': {'$gt': datetime.now(timezone.utc)}},
+                {'_id': 1}
+            )
+            if held is None:
+                return True
+            await asyncio.sleep(self.poll_interval)
+        return False
+
+class SingleFlight:
+    """One in-flight computation per key; lock, if set, extends this across workers"""
+
+    def __init__(self, lock: Optional[MongoLock] = None):
+        self.lock = lock
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.waited_on_peer = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 recheck: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """Result of fn(), shared with every concurrent caller for key
+
+        When another worker holds the lock, this waits for it and returns
+        recheck() if that finds a result, so fn only runs once per burst.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(self._locked(key, fn, recheck))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the work the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _locked(self, key: str, fn, recheck):
+        if self.lock is None:
+            return await fn()
+
+        token = await self.lock.acquire(key)
+        if token is None:
+            self.waited_on_peer += 1
+            await self.lock.wait(key)
+            if recheck is not None:
+                result = await recheck()
+                if result is not None:
+                    return result
+            # The peer failed or timed out; compute here, taking the lock if it is free
+            token = await self.lock.acquire(key)
+
+        if token is None:
+            return await fn()
+        # LLM calls with retries can outlast the lock's ttl; renew it so peers keep waiting
+        keep_alive = asyncio.ensure_future(self.lock.keep_alive(key, token))
+        try:
+            return await fn()
+        finally:
+            keep_alive.cancel()
+            await self.lock.release(key, token)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': len(self._inflight),
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'waited_on_peer': self.waited_on_peer
+        }
@@ -0,0 +1,97 @@
+"""Password hashing and signed access tokens
+
+bcrypt is deliberately slow (~100-300 ms per call), so hashing runs on a
+small dedicated thread pool instead of the event loop; the pool size caps how
+many CPU cores a login burst can take. Access tokens are HS256 JWTs verified
+from the signature and expiry alone, with no database round trip.
+"""
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+
+import bcrypt
+import jwt
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+JWT_ALGORITHM = 'HS256'
+
+_hash_pool: Optional[ThreadPoolExecutor] = None
+_bearer = HTTPBearer(auto_error=False)
+
+def _pool() -> ThreadPoolExecutor:
+    """The bcrypt pool, created on first use so AUTH_HASH_WORKERS from .env applies"""
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('AUTH_HASH_WORKERS', 4)),
+            thread_name_prefix='bcrypt'
+        )
+    return _hash_pool
+
+def jwt_secret() -> str:
+    """JWT_SECRET; every worker must share it or tokens stop verifying across workers and restarts"""
+    secret = os.environ.get('JWT_SECRET')
+    if not secret:
+        raise RuntimeError("JWT_SECRET is not set")
+    return secret
+
+def _token_ttl() -> timedelta:
+    return timedelta(minutes=int(os.environ.get('JWT_EXPIRES_MINUTES', 720)))
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    hashed = await loop.run_in_executor(_pool(), bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+    return hashed.decode('utf-8')
+
+async def verify_password(password: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+def issue_token(user: Dict) -> str:
+    """Signed, expiring access token carrying the user's id, email and name"""
+    now = datetime.now(timezone.utc)
+    claims = {
+        'sub': user['id'],
+        'email': user['email'],
+        'name': user['name'],
+        'iat': now,
+        'exp': now + _token_ttl()
+    }
+    return jwt.encode(claims, jwt_secret(), algorithm=JWT_ALGORITHM)
+
+def decode_token(token: str) -> Dict:
+    try:
+        return jwt.decode(token, jwt_secret(), algorithms=[JWT_ALGORITHM], options={'require': ['sub', 'exp']})
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired", headers={'WWW-Authenticate': 'Bearer'})
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token", headers={'WWW-Authenticate': 'Bearer'})
+
+def _claims(token: Optional[str]) -> Dict:
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={'WWW-Authenticate': 'Bearer'})
+    return decode_token(token)
+
+async def require_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Dict:
+    """Claims of the token in the caller's Authorization header"""
+    return _claims(credentials.credentials if credentials else None)
+
+async def require_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+    access_token: Optional[str] = Query(None, include_in_schema=False)
+) -> Dict:
+    """require_user that also accepts ?access_token=, for EventSource, which cannot send headers
+
+    Query strings end up in access logs and browser history, so only
+    Server-Sent Events routes use this.
+    """
+    return _claims(credentials.credentials if credentials else access_token)
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
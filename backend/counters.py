@@ -0,0 +1,49 @@
+"""Atomic sequence allocation backed by the counters collection"""
+from typing import List
+from pymongo import ReturnDocument
+
+INVESTOR_SEQUENCE = 'investor_id'
+
+def format_investor_id(n: int) -> str:
+    """Render a sequence number as an investor ID (INV0001)"""
+    return f"INV{str(n).zfill(4)}"
+
+async def reserve_sequence(db, name: str, count: int = 1) -> range:
+    """Reserve `count` consecutive numbers of a sequence in one round trip"""
+    counter = await db.counters.find_one_and_update(
+        {'_id': name},
+        {'$inc': {'seq': count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    end = counter['seq']
+    return range(end - count + 1, end + 1)
+
+async def allocate_investor_ids(db, count: int = 1) -> List[str]:
+    """Allocate never-reused investor IDs, a whole block at once for bulk creation"""
+    return [format_investor_id(n) for n in await reserve_sequence(db, INVESTOR_SEQUENCE, count)]
+
+async def reset_sequence(db, name: str, value: int):
+    """Set a sequence to an exact value (used after reseeding)"""
+    await db.counters.update_one({'_id': name}, {'$set': {'seq': value}}, upsert=True)
+
+async def sync_investor_sequence(db):
+    """Start the investor sequence above the highest existing ID on first boot"""
+    if await db.counters.find_one({'_id': INVESTOR_SEQUENCE}):
+        return
+
+    suffix = {'$substrCP': ['$investor_id', 3, {'$subtract': [{'$strLenCP': '$investor_id'}, 3]}]}
+    rows = await db.investors.aggregate([
+        {'$group': {
+            '_id': None,
+            'highest': {'$max': {'$convert': {'input': suffix, 'to': 'int', 'onError': 0, 'onNull': 0}}}
+        }}
+    ]).to_list(1)
+    highest = rows[0]['highest'] if rows else 0
+
+    # $max keeps a value written concurrently by another worker if it is larger
+    await db.counters.update_one(
+        {'_id': INVESTOR_SEQUENCE},
+        {'$max': {'seq': highest or 0}},
+        upsert=True
+    )
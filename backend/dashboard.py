@@ -0,0 +1,351 @@
+"""Dashboard aggregations computed inside MongoDB"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+PERFORMANCE_BUCKETS = ['Negative', '0-5%', '5-10%', '10-15%', '15%+']
+AUM_BUCKETS = ['<5L', '5-10L', '10-15L', '15-20L', '20L+']
+
+def _bucket_switch(expr, bounds: List[float], labels: List[str]) -> Dict:
+    """$switch expression assigning expr to the first label whose upper bound it is below"""
+    return {'$switch': {
+        'branches': [
+            {'case': {'$lt': [expr, bound]}, 'then': label}
+            for bound, label in zip(bounds, labels)
+        ],
+        'default': labels[-1]
+    }}
+
+def summary_pipeline(now: datetime, top_n: int = 5) -> List[Dict]:
+    """Single-pass $facet pipeline producing every dashboard summary figure"""
+    gain = {'$ifNull': ['$gain_loss_pct', 0]}
+    aum = {'$ifNull': ['$total_aum', 0]}
+    new_since = now - timedelta(days=30)
+
+    folios = [
+        {'$unwind': '$portfolios'},
+        {'$project': {
+            'category': {'$ifNull': ['$portfolios.category', 'Other']},
+            'amc': {'$ifNull': ['$portfolios.amc_name', 'Other']},
+            'value': {'$ifNull': ['$portfolios.current_value', 0]},
+            'sip': {'$ifNull': ['$portfolios.sip_flag', False]}
+        }}
+    ]
+
+    return [
+        # Only the fields the summary reads ever leave the storage engine
+        {'$project': {
+            '_id': 0,
+            'name': 1,
+            'total_aum': 1,
+            'total_invested': 1,
+            'gain_loss_pct': 1,
+            'risk_profile': 1,
+            'onboarding_date': 1,
+            'portfolios.category': 1,
+            'portfolios.amc_name': 1,
+            'portfolios.current_value': 1,
+            'portfolios.sip_flag': 1
+        }},
+        {'$facet': {
+            'totals': [
+                {'$group': {
+                    '_id': None,
+                    'totalInvestors': {'$sum': 1},
+                    'totalAUM': {'$sum': '$total_aum'},
+                    'totalInvested': {'$sum': '$total_invested'},
+                    'avgGain': {'$avg': gain},
+                    'newInvestors': {'$sum': {'$cond': [{'$gte': ['$onboarding_date', new_since]}, 1, 0]}},
+                    'activeInvestors': {'$sum': {'$cond': [{'$gte': [gain, 0]}, 1, 0]}},
+                    'inactiveInvestors': {'$sum': {'$cond': [{'$lt': [gain, -5]}, 1, 0]}}
+                }}
+            ],
+            'byCategory': folios + [
+                {'$group': {'_id': '$category', 'value': {'$sum': '$value'}}}
+            ],
+            'byAmc': folios + [
+                {'$group': {'_id': '$amc', 'value': {'$sum': '$value'}}},
+                {'$sort': {'value': -1}},
+                {'$limit': 10}
+            ],
+            'sips': folios + [
+                {'$match': {'sip': True}},
+                {'$group': {'_id': None, 'count': {'$sum': 1}, 'value': {'$sum': '$value'}}}
+            ],
+            'performance': [
+                {'$group': {
+                    '_id': _bucket_switch(gain, [0, 5, 10, 15], PERFORMANCE_BUCKETS),
+                    'count': {'$sum': 1}
+                }}
+            ],
+            'aumSize': [
+                {'$group': {
+                    '_id': _bucket_switch({'$divide': [aum, 100000]}, [5, 10, 15, 20], AUM_BUCKETS),
+                    'count': {'$sum': 1}
+                }}
+            ],
+            'risk': [
+                {'$group': {'_id': '$risk_profile', 'count': {'$sum': 1}}},
+                {'$sort': {'count': -1}}
+            ],
+            'topInvestors': [
+                {'$sort': {'total_aum': -1}},
+                {'$limit': top_n},
+                {'$project': {'name': 1, 'aum': '$total_aum', 'gain': '$gain_loss_pct'}}
+            ]
+        }}
+    ]
+
+def format_summary(facets: Dict) -> Dict:
+    """Shape the $facet output into the payload the dashboard renders"""
+    totals = facets['totals'][0] if facets['totals'] else {}
+    total_aum = totals.get('totalAUM', 0)
+    sips = facets['sips'][0] if facets['sips'] else {}
+    performance = {row['_id']: row['count'] for row in facets['performance']}
+    aum_size = {row['_id']: row['count'] for row in facets['aumSize']}
+
+    aum_by_asset_class = sorted(
+        [{'name': row['_id'], 'value': round(row['value'], 2)}
+         for row in facets['byCategory'] if row['value'] > 0],
+        key=lambda x: x['value'],
+        reverse=True
+    )
+
+    amc_weightage = [
+        {
+            'name': row['_id'],
+            'value': round(row['value'], 2),
+            'percentage': round((row['value'] / total_aum) * 100, 2) if total_aum else 0
+        }
+        for row in facets['byAmc'] if row['value'] > 0
+    ]
+
+    return {
+        'totalInvestors': totals.get('totalInvestors', 0),
+        'totalAUM': total_aum,
+        'totalInvested': totals.get('totalInvested', 0),
+        'avgGain': totals.get('avgGain') or 0,
+        'newInvestors': totals.get('newInvestors', 0),
+        'activeInvestors': totals.get('activeInvestors', 0),
+        'inactiveInvestors': totals.get('inactiveInvestors', 0),
+        'aumByAssetClass': aum_by_asset_class,
+        'amcWeightage': amc_weightage,
+        'totalSIPs': sips.get('count', 0),
+        'sipValue': sips.get('value', 0),
+        'performanceDistribution': [
+            {'name': name, 'value': performance.get(name, 0)} for name in PERFORMANCE_BUCKETS
+        ],
+        'aumDistribution': [
+            {'name': name, 'value': aum_size.get(name, 0)} for name in AUM_BUCKETS
+        ],
+        'topInvestors': facets['topInvestors'],
+        'riskDistribution': [
+            {'name': row['_id'], 'value': row['count']} for row in facets['risk']
+        ]
+    }
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+def _date_or_null(expr) -> Dict:
+    """The stored date, or null when the field is missing or not a date"""
+    return {'$cond': [{'$eq': [{'$type': expr}, 'date']}, expr, None]}
+
+def _days_between(later, earlier) -> Dict:
+    """Whole days from earlier to later, floored like Python's timedelta.days"""
+    return {'$floor': {'$divide': [{'$subtract': [later, earlier]}, DAY_MS]}}
+
+def _sip_folios(source='$portfolios') -> Dict:
+    """Expression selecting the SIP folios of an investor"""
+    return {'$filter': {'input': {'$ifNull': [source, []]}, 'as': 'p', 'cond': '$$p.sip_flag'}}
+
+def sip_analytics_pipeline(now: datetime) -> List[Dict]:
+    """SIP status, ticket size, expiries and top SIP investors in one investors pass"""
+    last_paid = _date_or_null('$sips.last_sip_payment_date')
+    days_since_last = _days_between(now, last_paid)
+    monthly = {'$eq': [{'$ifNull': ['$sips.sip_freq', 'Monthly']}, 'Monthly']}
+
+    return [
+        {'$project': {
+            '_id': 0,
+            'investor_id': 1,
+            'name': 1,
+            'gain': {'$ifNull': ['$gain_loss_pct', 0]},
+            'sips': _sip_folios()
+        }},
+        {'$facet': {
+            'profit_loss': [
+                {'$group': {
+                    '_id': None,
+                    'profit': {'$sum': {'$cond': [{'$gte': ['$gain', 0]}, 1, 0]}},
+                    'loss': {'$sum': {'$cond': [{'$lt': ['$gain', 0]}, 1, 0]}}
+                }}
+            ],
+            'sip_folios': [
+                {'$unwind': '$sips'},
+                {'$project': {
+                    'value': {'$ifNull': ['$sips.current_value', 0]},
+                    'status': {'$switch': {
+                        'branches': [
+                            # Missing payment dates count as stopped
+                            {'case': {'$eq': [last_paid, None]}, 'then': 'stopped'},
+                            {'case': {'$lte': [days_since_last, {'$cond': [monthly, 35, 100]}]}, 'then': 'active'},
+                            {'case': {'$lte': [days_since_last, 180]}, 'then': 'paused'}
+                        ],
+                        'default': 'stopped'
+                    }}
+                }},
+                {'$group': {
+                    '_id': None,
+                    'count': {'$sum': 1},
+                    'value': {'$sum': '$value'},
+                    'active': {'$sum': {'$cond': [{'$eq': ['$status', 'active']}, 1, 0]}},
+                    'paused': {'$sum': {'$cond': [{'$eq': ['$status', 'paused']}, 1, 0]}},
+                    'stopped': {'$sum': {'$cond': [{'$eq': ['$status', 'stopped']}, 1, 0]}}
+                }}
+            ],
+            'upcoming_sip_expiry': [
+                {'$unwind': '$sips'},
+                {'$project': {
+                    'investor_id': 1,
+                    'investor_name': '$name',
+                    'scheme_name': '$sips.scheme_name',
+                    'next_due_date': '$sips.next_due_date',
+                    'days_until_due': _days_between(_date_or_null('$sips.next_due_date'), now),
+                    'sip_amount': {'$ifNull': ['$sips.invested_amount', 0]}
+                }},
+                {'$match': {'days_until_due': {'$gte': 0, '$lte': 90}}},
+                {'$sort': {'days_until_due': 1, 'investor_id': 1}},
+                {'$limit': 10}
+            ],
+            'top_sip_investors': [
+                {'$project': {
+                    'investor_id': 1,
+                    'name': 1,
+                    'total_sip_value': {'$sum': '$sips.current_value'}
+                }},
+                {'$match': {'total_sip_value': {'$gt': 0}}},
+                {'$sort': {'total_sip_value': -1, 'investor_id': 1}},
+                {'$limit': 10}
+            ]
+        }}
+    ]
+
+def high_potential_pipeline(now: datetime) -> List[Dict]:
+    """Long-standing SIP investors in profit with at most two redemptions"""
+    return [
+        {'$match': {'gain_loss_pct': {'$gt': 0}}},
+        {'$project': {
+            '_id': 0,
+            'investor_id': 1,
+            'name': 1,
+            'gain_loss_pct': 1,
+            'onboarding_date': 1,
+            'total_sip_value': {'$sum': {'$map': {
+                'input': _sip_folios(), 'as': 's', 'in': '$$s.current_value'
+            }}}
+        }},
+        {'$match': {
+            'total_sip_value': {'$gt': 0},
+            'onboarding_date': {'$type': 'date', '$lt': now - timedelta(days=180)}
+        }},
+        {'$sort': {'gain_loss_pct': -1, 'investor_id': 1}},
+        # Candidates stream in return order, so only as many lookups run as needed to fill the top 10
+        {'$lookup': {
+            'from': 'transactions',
+            'localField': 'investor_id',
+            'foreignField': 'investor_id',
+            'pipeline': [{'$match': {'txn_type': 'Sell'}}, {'$limit': 3}, {'$count': 'n'}],
+            'as': 'sells'
+        }},
+        {'$set': {'redemptions': {'$ifNull': [{'$first': '$sells.n'}, 0]}}},
+        {'$match': {'redemptions': {'$lte': 2}}},
+        {'$limit': 10},
+        {'$project': {'onboarding_date': 0, 'sells': 0}}
+    ]
+
+def sips_due_pipeline(start: datetime, end: datetime, limit: int) -> List[Dict]:
+    """SIP folios falling due between start and end, soonest first"""
+    due = {'sip_flag': True, 'next_due_date': {'$gte': start, '$lte': end}}
+    return [
+        # $elemMatch keeps both bounds on the same folio so the sip_next_due index is used
+        {'$match': {'portfolios': {'$elemMatch': due}}},
+        {'$unwind': '$portfolios'},
+        {'$match': {f'portfolios.{k}': v for k, v in due.items()}},
+        {'$project': {
+            '_id': 0,
+            'investor_id': 1,
+            'investor_name': '$name',
+            'folio_id': '$portfolios.folio_id',
+            'scheme_name': '$portfolios.scheme_name',
+            'sip_freq': '$portfolios.sip_freq',
+            'sip_amount': {'$ifNull': ['$portfolios.invested_amount', 0]},
+            'next_due_date': '$portfolios.next_due_date'
+        }},
+        {'$sort': {'next_due_date': 1, 'investor_id': 1, 'folio_id': 1}},
+        {'$limit': limit}
+    ]
+
+def monthly_window(now: datetime) -> List[datetime]:
+    """Month anchors of the 12-month SIP inflow chart, oldest first"""
+    return [now - timedelta(days=i * 30) for i in range(11, -1, -1)]
+
+def sip_inflow_pipeline(now: datetime) -> List[Dict]:
+    """SIP transaction amounts per calendar month within the chart window"""
+    first = monthly_window(now)[0]
+    window_start = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return [
+        # Served by the (txn_type, txn_date) index
+        {'$match': {'txn_type': 'SIP', 'txn_date': {'$gte': window_start}}},
+        {'$group': {
+            '_id': {'$dateToString': {'format': '%Y-%m', 'date': '$txn_date'}},
+            'inflow': {'$sum': '$txn_amount'}
+        }}
+    ]
+
+def format_analytics(now: datetime, sip_facets: Dict, high_potential: List[Dict],
+                     inflow_rows: List[Dict]) -> Dict:
+    """Shape pipeline output into the /dashboard/analytics payload"""
+    sip = sip_facets['sip_folios'][0] if sip_facets['sip_folios'] else {}
+    profit_loss = sip_facets['profit_loss'][0] if sip_facets['profit_loss'] else {}
+    inflow_by_month = {row['_id']: row['inflow'] for row in inflow_rows}
+
+    return {
+        'sip_status': {
+            'active': sip.get('active', 0),
+            'paused': sip.get('paused', 0),
+            'stopped': sip.get('stopped', 0)
+        },
+        'monthly_sip_inflow': [
+            {
+                'month': month.strftime('%b %Y'),
+                'inflow': round(inflow_by_month.get(month.strftime('%Y-%m'), 0), 2)
+            }
+            for month in monthly_window(now)
+        ],
+        'average_sip_ticket_size': round(sip['value'] / sip['count'], 2) if sip.get('count') else 0,
+        'top_sip_investors': [
+            {
+                'investor_id': inv['investor_id'],
+                'name': inv['name'],
+                'total_sip_value': round(inv['total_sip_value'], 2)
+            }
+            for inv in sip_facets['top_sip_investors']
+        ],
+        'upcoming_sip_expiry': [
+            {**row, 'days_until_due': int(row['days_until_due'])}
+            for row in sip_facets['upcoming_sip_expiry']
+        ],
+        'profit_loss_split': {
+            'profit': profit_loss.get('profit', 0),
+            'loss': profit_loss.get('loss', 0)
+        },
+        'high_potential_investors': [
+            {
+                'investor_id': inv['investor_id'],
+                'name': inv['name'],
+                'total_sip_value': round(inv['total_sip_value'], 2),
+                'gain_loss_pct': inv['gain_loss_pct'],
+                'redemptions': inv['redemptions']
+            }
+            for inv in high_potential
+        ]
+    }
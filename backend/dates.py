@@ -0,0 +1,25 @@
+"""Coercion of request dates to the aware UTC datetimes stored in MongoDB"""
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Date fields inside each investor's portfolios[] folio
+FOLIO_DATE_FIELDS = ['last_sip_payment_date', 'next_due_date']
+
+def parse_date(value) -> Optional[datetime]:
+    """Coerce request input (datetime or ISO string) to an aware UTC datetime"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+def coerce_folio_dates(folio: Dict) -> Dict:
+    """Parse the date fields of a folio in place"""
+    for field in FOLIO_DATE_FIELDS:
+        if field in folio:
+            folio[field] = parse_date(folio[field])
+    return folio
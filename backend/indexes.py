@@ -0,0 +1,134 @@
+"""MongoDB index bootstrap shared by app startup and pre-deploy runs
+
+Usage:
+    python3 indexes.py
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Declared indexes per collection. Names are fixed so reruns can tell an
+# existing index from one whose definition changed and must be rebuilt.
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    'investors': [
+        IndexModel([('investor_id', ASCENDING)], name='investor_id_unique', unique=True),
+        # Keyset pagination orders of GET /investors
+        IndexModel([('total_aum', DESCENDING), ('investor_id', ASCENDING)], name='aum_desc_investor_id'),
+        IndexModel([('total_aum', ASCENDING), ('investor_id', ASCENDING)], name='aum_asc_investor_id'),
+        # risk filter combined with each sort order / AUM range
+        IndexModel([('risk_profile', ASCENDING), ('investor_id', ASCENDING)], name='risk_investor_id'),
+        IndexModel([('risk_profile', ASCENDING), ('total_aum', DESCENDING), ('investor_id', ASCENDING)],
+                   name='risk_aum_desc_investor_id'),
+        # Prefix search over lowercase name/email/PAN tokens (see search.py)
+        IndexModel([('search_tokens', ASCENDING)], name='search_tokens'),
+        # Upcoming SIP instalments by due date (GET /sips/due, dashboard expiries)
+        IndexModel([('portfolios.sip_flag', ASCENDING), ('portfolios.next_due_date', ASCENDING)],
+                   name='sip_next_due'),
+    ],
+    'users': [
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+    'ai_analyses': [
+        IndexModel([('investor_id', ASCENDING)], name='investor_id_unique', unique=True),
+    ],
+    'transactions': [
+        IndexModel([('txn_id', ASCENDING)], name='txn_id_unique', unique=True),
+        # Per-folio and per-investor history, newest first
+        IndexModel([('investor_id', ASCENDING), ('folio_id', ASCENDING), ('txn_date', ASCENDING)],
+                   name='investor_folio_date'),
+        IndexModel([('investor_id', ASCENDING), ('txn_date', ASCENDING)], name='investor_date'),
+        # Book-wide SIP inflow and redemption scans on the dashboard
+        IndexModel([('txn_type', ASCENDING), ('txn_date', ASCENDING)], name='type_date'),
+    ],
+    'llm_cache': [
+        # MongoDB deletes entries once expires_at has passed
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+    ],
+    'llm_locks': [
+        # Locks of crashed workers are cleaned up; acquire() also takes over lapsed ones
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+    ],
+    'jobs': [
+        # Startup scan for interrupted jobs
+        IndexModel([('status', ASCENDING)], name='status'),
+        # Latest seed run on /seed/status
+        IndexModel([('type', ASCENDING), ('created_at', DESCENDING)], name='type_created'),
+    ],
+}
+
+def _same_definition(existing: Dict, model: IndexModel) -> bool:
+    """Compare an index_information() entry with a declared IndexModel"""
+    wanted = model.document
+    return (
+        list(existing['key']) == list(wanted['key'].items())
+        and bool(existing.get('unique', False)) == bool(wanted.get('unique', False))
+        and existing.get('expireAfterSeconds') == wanted.get('expireAfterSeconds')
+    )
+
+async def ensure_indexes(db) -> List[Dict]:
+    """Create missing indexes and rebuild changed ones; safe to run repeatedly"""
+    report = []
+
+    for collection_name, models in INDEX_SPECS.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+
+        for model in models:
+            name = model.document['name']
+            entry = {'collection': collection_name, 'index': name}
+
+            if name in existing and _same_definition(existing[name], model):
+                entry['status'] = 'exists'
+                report.append(entry)
+                continue
+
+            started = time.perf_counter()
+            try:
+                if name in existing:
+                    # Definition changed since the last deploy: drop and rebuild
+                    await collection.drop_index(name)
+                    entry['status'] = 'rebuilt'
+                else:
+                    entry['status'] = 'created'
+                await collection.create_indexes([model])
+            except OperationFailure as e:
+                entry['status'] = 'failed'
+                entry['error'] = str(e)
+                logger.error(f"Index {collection_name}.{name} failed: {str(e)}")
+                report.append(entry)
+                continue
+
+            entry['seconds'] = round(time.perf_counter() - started, 3)
+            logger.info(f"Index {collection_name}.{name} {entry['status']} in {entry['seconds']}s")
+            report.append(entry)
+
+    return report
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.getenv('DB_NAME', 'mf360_database')
+
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        report = await ensure_indexes(client[db_name])
+    finally:
+        client.close()
+
+    for entry in report:
+        timing = f" ({entry['seconds']}s)" if 'seconds' in entry else ''
+        error = f": {entry['error']}" if 'error' in entry else ''
+        print(f"{entry['collection']}.{entry['index']}: {entry['status']}{timing}{error}")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
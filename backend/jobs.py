@@ -0,0 +1,250 @@
+"""Background bulk-analysis jobs checkpointed to the `jobs` collection
+
+A job walks the investors matching its filter in investor_id order, one batch
+at a time: analysis runs in the process pool, summaries are requested in
+batched LLM calls, results are upserted into `ai_analyses`, then the job
+document records the last investor_id done. Each running job holds a lease
+that is renewed with every checkpoint; a job whose worker died is claimed
+again once the lease lapses and continues after its checkpoint.
+"""
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from pymongo import ReturnDocument, UpdateOne
+from ai.fingerprint import analysis_record, current_analyses
+
+logger = logging.getLogger(__name__)
+
+# The jobs collection also records seed runs, which this runner must never claim
+JOB_TYPE = 'analysis'
+ACTIVE_STATUSES = ['queued', 'running']
+# Most recent per-investor errors kept on the job document
+MAX_ERRORS = 50
+
+class JobRunner:
+    """Runs analysis jobs as tasks on this worker's event loop"""
+
+    def __init__(self, db, build_query: Callable[..., Dict],
+                 analyze_many: Callable[[List[Dict]], Awaitable[List[Union[Dict, Exception]]]],
+                 summarize_many: Callable[[List[Dict]], Awaitable[List[Dict]]],
+                 max_age: timedelta = timedelta(hours=24), batch_size: int = 100, lease_seconds: int = 120):
+        self.db = db
+        self.build_query = build_query
+        self.analyze_many = analyze_many
+        self.summarize_many = summarize_many
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def enqueue(self, params: Dict, only_changed: bool = False) -> Dict:
+        """Record a new job over the investors matching params and start it
+
+        With only_changed, investors whose stored analysis is still current are
+        counted as skipped instead of being recomputed.
+        """
+        now = datetime.now(timezone.utc)
+        job = {
+            '_id': str(uuid.uuid4()),
+            'type': JOB_TYPE,
+            'status': 'queued',
+            'filter': params,
+            'only_changed': only_changed,
+            'total': await self.db.investors.count_documents(self.build_query(**params)),
+            'processed': 0,
+            'succeeded': 0,
+            'skipped': 0,
+            'failed': 0,
+            'errors': [],
+            'last_investor_id': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        await self.db.jobs.insert_one(job)
+        self._start(job['_id'])
+        return self.view(job)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        job = await self.db.jobs.find_one({'_id': job_id, 'type': JOB_TYPE})
+        return self.view(job) if job else None
+
+    async def resume_interrupted(self) -> int:
+        """Start every queued or running job whose lease has lapsed"""
+        now = datetime.now(timezone.utc)
+        jobs = await self.db.jobs.find(
+            {'type': JOB_TYPE, 'status': {'$in': ACTIVE_STATUSES}, '$or': [
+                {'lease_until': {'$exists': False}},
+                {'lease_until': {'$lt': now}}
+            ]},
+            {'_id': 1}
+        ).to_list(None)
+        for job in jobs:
+            self._start(job['_id'])
+        return len(jobs)
+
+    async def shutdown(self):
+        """Stop local jobs and release their leases so a restart resumes them at once"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        await self.db.jobs.update_many(
+            {'owner': self.owner, 'status': 'running'},
+            {'$unset': {'lease_until': ''}}
+        )
+
+    @staticmethod
+    def view(job: Dict) -> Dict:
+        """Job document as returned by the API, with throughput and ETA"""
+        now = datetime.now(timezone.utc)
+        data = {k: v for k, v in job.items() if k not in ('_id', 'owner', 'lease_until', 'processed_at_resume')}
+        data['job_id'] = job['_id']
+
+        throughput = None
+        eta_seconds = None
+        resumed_at = job.get('resumed_at')
+        if resumed_at is not None:
+            end = job.get('finished_at') or now
+            if resumed_at.tzinfo is None:
+                resumed_at = resumed_at.replace(tzinfo=timezone.utc)
+            if end.tzinfo is None:
+                end = end.replace(tzinfo=timezone.utc)
+            # Rate since this worker picked the job up, so downtime does not skew it
+            done = job.get('processed', 0) - job.get('processed_at_resume', 0)
+            elapsed = (end - resumed_at).total_seconds()
+            if done > 0 and elapsed > 0:
+                throughput = round(done / elapsed, 2)
+                if job['status'] == 'running':
+                    eta_seconds = round(max(job.get('total', 0) - job.get('processed', 0), 0) / throughput)
+
+        data['throughput_per_sec'] = throughput
+        data['eta_seconds'] = eta_seconds
+        return data
+
+    def _start(self, job_id: str):
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _claim(self, job_id: str) -> Optional[Dict]:
+        """Take the job's lease; None if another worker holds it or it has finished"""
+        now = datetime.now(timezone.utc)
+        return await self.db.jobs.find_one_and_update(
+            {'_id': job_id, 'type': JOB_TYPE, 'status': {'$in': ACTIVE_STATUSES}, '$or': [
+                {'lease_until': {'$exists': False}},
+                {'lease_until': {'$lt': now}}
+            ]},
+            [{'$set': {
+                'status': 'running',
+                'owner': self.owner,
+                'lease_until': now + self.lease,
+                'started_at': {'$ifNull': ['$started_at', now]},
+                'resumed_at': now,
+                'processed_at_resume': '$processed',
+                'updated_at': now
+            }}],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self, job_id: str):
+        job = await self._claim(job_id)
+        if not job:
+            return
+
+        try:
+            query = self.build_query(**job['filter'])
+            last_id = job.get('last_investor_id')
+            while True:
+                page = query if last_id is None else {'$and': [query, {'investor_id': {'$gt': last_id}}]}
+                investors = await self.db.investors.find(page, {'_id': 0}) \
+                    .sort('investor_id', 1).to_list(self.batch_size)
+                if not investors:
+                    break
+
+                skipped, errors = await self._process_batch(investors, job.get('only_changed', False))
+                last_id = investors[-1]['investor_id']
+                if not await self._checkpoint(job_id, last_id, len(investors), skipped, errors):
+                    logger.warning(f"Job {job_id} lease lost; another worker continues it")
+                    return
+
+            await self._finish(job_id, 'completed')
+            logger.info(f"Job {job_id} completed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            await self._finish(job_id, 'failed', error=str(e))
+
+    async def _process_batch(self, investors: List[Dict], only_changed: bool) -> Tuple[int, List[Dict]]:
+        """Analyze and summarize one batch; returns the skipped count and per-investor errors"""
+        skipped = 0
+        if only_changed:
+            current = await current_analyses(self.db, investors, self.max_age)
+            skipped = len(current)
+            investors = [investor for investor in investors if investor['investor_id'] not in current]
+
+        errors = []
+        analyzed = []
+        # The analysis pool puts an exception in place of any investor whose analysis raised
+        for investor, analysis in zip(investors, await self.analyze_many(investors)):
+            if isinstance(analysis, Exception):
+                errors.append({'investor_id': investor['investor_id'], 'error': str(analysis)})
+            else:
+                analyzed.append((investor, analysis))
+        investors = [investor for investor, _ in analyzed]
+        analyses = [analysis for _, analysis in analyzed]
+
+        try:
+            summaries = await self.summarize_many(analyses)
+        except Exception as e:
+            summaries = [e] * len(analyses)
+
+        now = datetime.now(timezone.utc)
+        writes = []
+        for investor, analysis, summary in zip(investors, analyses, summaries):
+            if isinstance(summary, Exception) or summary.get('error'):
+                message = str(summary) if isinstance(summary, Exception) else summary['summary']
+                errors.append({'investor_id': investor['investor_id'], 'error': message})
+                continue
+            writes.append(UpdateOne(
+                {'investor_id': investor['investor_id']},
+                {'$set': analysis_record(investor, analysis, summary, now)},
+                upsert=True
+            ))
+
+        if writes:
+            await self.db.ai_analyses.bulk_write(writes, ordered=False)
+        return skipped, errors
+
+    async def _checkpoint(self, job_id: str, last_id: str, count: int, skipped: int, errors: List[Dict]) -> bool:
+        """Record progress and renew the lease; False if this worker no longer owns the job"""
+        now = datetime.now(timezone.utc)
+        update = {
+            '$set': {'last_investor_id': last_id, 'lease_until': now + self.lease, 'updated_at': now},
+            '$inc': {
+                'processed': count,
+                'succeeded': count - skipped - len(errors),
+                'skipped': skipped,
+                'failed': len(errors)
+            }
+        }
+        if errors:
+            update['$push'] = {'errors': {'$each': errors, '$slice': -MAX_ERRORS}}
+
+        result = await self.db.jobs.update_one({'_id': job_id, 'owner': self.owner}, update)
+        return result.matched_count == 1
+
+    async def _finish(self, job_id: str, status: str, error: Optional[str] = None):
+        now = datetime.now(timezone.utc)
+        fields = {'status': status, 'finished_at': now, 'updated_at': now}
+        if error:
+            fields['error'] = error
+        await self.db.jobs.update_one(
+            {'_id': job_id, 'owner': self.owner},
+            {'$set': fields, '$unset': {'lease_until': ''}}
+        )
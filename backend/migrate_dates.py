@@ -0,0 +1,111 @@
+"""Convert ISO-string date fields to native BSON datetimes
+
+Conversion runs inside MongoDB with update pipelines, one batch of _ids at a
+time in _id order, so no document is parsed in Python and an interrupted run
+can simply be started again. Strings MongoDB cannot parse are left untouched.
+
+Usage:
+    python3 migrate_dates.py [--batch-size 1000]
+"""
+import os
+import asyncio
+import argparse
+import logging
+from typing import Dict, List, Tuple
+
+from dates import FOLIO_DATE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Date fields per collection: top-level fields, and fields inside each portfolios[] folio
+DATE_FIELDS = {
+    'investors': {'fields': ['onboarding_date', 'goal_timeline'],
+                  'folio_fields': FOLIO_DATE_FIELDS},
+    'transactions': {'fields': ['txn_date']},
+    'users': {'fields': ['created_at']},
+    'ai_analyses': {'fields': ['created_at']},
+}
+
+def _convert(expr) -> Dict:
+    """Pipeline expression turning a string into a date, leaving other values as they are"""
+    return {'$cond': [
+        {'$eq': [{'$type': expr}, 'string']},
+        {'$convert': {'input': expr, 'to': 'date', 'onError': expr}},
+        expr
+    ]}
+
+def _conversion(spec: Dict) -> Tuple[Dict, List[Dict]]:
+    """Filter selecting documents with string dates, and the pipeline converting them"""
+    fields = spec.get('fields', [])
+    folio_fields = spec.get('folio_fields', [])
+
+    clauses = [{field: {'$type': 'string'}} for field in fields]
+    clauses += [{'portfolios': {'$elemMatch': {field: {'$type': 'string'}}}} for field in folio_fields]
+
+    stage = {field: _convert(f'${field}') for field in fields}
+    if folio_fields:
+        stage['portfolios'] = {'$cond': [
+            {'$isArray': '$portfolios'},
+            {'$map': {
+                'input': '$portfolios',
+                'as': 'p',
+                'in': {'$mergeObjects': [
+                    '$$p', {field: _convert(f'$$p.{field}') for field in folio_fields}
+                ]}
+            }},
+            '$portfolios'
+        ]}
+
+    return {'$or': clauses}, [{'$set': stage}]
+
+async def migrate_collection(collection, spec: Dict, batch_size: int = 1000) -> int:
+    """Convert one collection batch by batch; returns documents touched"""
+    selector, pipeline = _conversion(spec)
+    touched = 0
+    last_id = None
+
+    while True:
+        query = selector if last_id is None else {'$and': [selector, {'_id': {'$gt': last_id}}]}
+        batch = await collection.find(query, {'_id': 1}).sort('_id', 1).to_list(batch_size)
+        if not batch:
+            break
+
+        ids = [doc['_id'] for doc in batch]
+        await collection.update_many({'_id': {'$in': ids}}, pipeline)
+        touched += len(ids)
+        last_id = ids[-1]
+        logger.info(f"Converted dates on {touched} {collection.name} documents")
+
+    return touched
+
+async def migrate_dates(db, batch_size: int = 1000) -> Dict[str, int]:
+    """Convert every declared date field; safe to rerun"""
+    return {
+        name: await migrate_collection(db[name], spec, batch_size)
+        for name, spec in DATE_FIELDS.items()
+    }
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000, help='Documents per batch')
+    args = parser.parse_args()
+
+    load_dotenv()
+    mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.getenv('DB_NAME', 'mf360_database')
+
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        stats = await migrate_dates(client[db_name], args.batch_size)
+    finally:
+        client.close()
+
+    for name, touched in stats.items():
+        print(f"{name}: converted {touched} documents")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
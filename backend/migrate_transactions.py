@@ -0,0 +1,73 @@
+"""Move embedded folio transactions into the transactions collection
+
+Investors are processed in batches: their transactions are copied into
+`transactions` (tagged with investor_id), then removed from the investor
+document. Reruns skip work already done, so an interrupted migration can
+simply be started again.
+
+Usage:
+    python3 migrate_transactions.py [--batch-size 200]
+"""
+import os
+import asyncio
+import argparse
+import logging
+from typing import Dict
+
+from transactions import split_transactions, insert_transactions
+
+logger = logging.getLogger(__name__)
+
+async def migrate_transactions(db, batch_size: int = 200) -> Dict:
+    """Split transactions out of every investor document; returns counters"""
+    stats = {'investors': 0, 'transactions': 0}
+
+    while True:
+        investors = await db.investors.find(
+            {'portfolios.transactions': {'$exists': True}},
+            {'_id': 1, 'investor_id': 1, 'portfolios.folio_id': 1, 'portfolios.transactions': 1}
+        ).to_list(batch_size)
+        if not investors:
+            break
+
+        docs = [txn for investor in investors for txn in split_transactions(investor)]
+        await insert_transactions(db, docs)
+        # Only strip the embedded copies once they are safely stored
+        await db.investors.update_many(
+            {'_id': {'$in': [investor['_id'] for investor in investors]}},
+            {'$unset': {'portfolios.$[].transactions': ''}}
+        )
+
+        stats['investors'] += len(investors)
+        stats['transactions'] += len(docs)
+        logger.info(f"Migrated {stats['transactions']} transactions from {stats['investors']} investors")
+
+    return stats
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from indexes import ensure_indexes
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=200, help='Investors per batch')
+    args = parser.parse_args()
+
+    load_dotenv()
+    mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.getenv('DB_NAME', 'mf360_database')
+
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        db = client[db_name]
+        # txn_id must be unique before copying so reruns cannot duplicate rows
+        await ensure_indexes(db)
+        stats = await migrate_transactions(db, args.batch_size)
+    finally:
+        client.close()
+
+    print(f"Moved {stats['transactions']} transactions out of {stats['investors']} investors")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
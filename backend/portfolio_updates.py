@@ -0,0 +1,96 @@
+"""Update builders for single round-trip investor and folio patches
+
+Folio-level changes that move totals are expressed as update pipelines so the
+derived ``total_aum``/``total_invested``/``gain_loss_pct`` fields are
+recomputed by MongoDB inside the same atomic write.
+"""
+from typing import Dict, List
+
+# Folio fields a PATCH may change; folio_id is immutable and transactions live in their own collection
+FOLIO_FIELDS = [
+    'scheme_name', 'scheme_code', 'isin', 'category', 'amc_name', 'amc_code',
+    'nav', 'units', 'invested_amount', 'current_value', 'gain_loss_pct',
+    'sip_flag', 'sip_freq', 'last_sip_payment_date', 'next_due_date'
+]
+
+# Investor totals derived from the folios, recomputed after every folio change
+RECOMPUTE_TOTALS = [
+    {'$set': {
+        'total_invested': {'$sum': '$portfolios.invested_amount'},
+        'total_aum': {'$sum': '$portfolios.current_value'}
+    }},
+    {'$set': {
+        'gain_loss_pct': {'$cond': [
+            {'$gt': ['$total_invested', 0]},
+            {'$round': [{'$multiply': [
+                {'$divide': [{'$subtract': ['$total_aum', '$total_invested']}, '$total_invested']},
+                100
+            ]}, 2]},
+            0
+        ]}
+    }}
+]
+
+def literal_set(fields: Dict) -> Dict:
+    """$set stage for plain values; $literal stops strings like '$x' being read as paths"""
+    return {'$set': {k: {'$literal': v} for k, v in fields.items()}}
+
+def _map_folio(folio_id: str, expr: Dict) -> Dict:
+    """$set stage rewriting only the folio with folio_id; `expr` sees it as $$f"""
+    return {'$set': {'portfolios': {'$map': {
+        'input': '$portfolios',
+        'as': 'f',
+        'in': {'$cond': [{'$eq': ['$$f.folio_id', folio_id]}, expr, '$$f']}
+    }}}}
+
+def replace_portfolios_pipeline(update_data: Dict) -> List[Dict]:
+    """Whole-document update that also recomputes totals from the new folios"""
+    fields = {k: v for k, v in update_data.items()
+              if k not in ('total_aum', 'total_invested', 'gain_loss_pct')}
+    return [literal_set(fields)] + RECOMPUTE_TOTALS
+
+def update_folio_pipeline(folio_id: str, changes: Dict) -> List[Dict]:
+    """Patch one folio, derive its value and return, then recompute investor totals"""
+    pipeline = [_map_folio(folio_id, {'$mergeObjects': [
+        '$$f', {k: {'$literal': v} for k, v in changes.items()}
+    ]})]
+
+    if ('nav' in changes or 'units' in changes) and 'current_value' not in changes:
+        pipeline.append(_map_folio(folio_id, {'$mergeObjects': ['$$f', {
+            'current_value': {'$round': [{'$multiply': ['$$f.nav', '$$f.units']}, 2]}
+        }]}))
+
+    if 'gain_loss_pct' not in changes and any(k in changes for k in ('nav', 'units', 'current_value', 'invested_amount')):
+        pipeline.append(_map_folio(folio_id, {'$mergeObjects': ['$$f', {
+            'gain_loss_pct': {'$cond': [
+                {'$gt': ['$$f.invested_amount', 0]},
+                {'$round': [{'$multiply': [
+                    {'$divide': [{'$subtract': ['$$f.current_value', '$$f.invested_amount']}, '$$f.invested_amount']},
+                    100
+                ]}, 2]},
+                0
+            ]}
+        }]}))
+
+    return pipeline + RECOMPUTE_TOTALS
+
+def remove_folio_pipeline(folio_id: str) -> List[Dict]:
+    """Drop one folio and recompute investor totals"""
+    return [
+        {'$set': {'portfolios': {'$filter': {
+            'input': '$portfolios',
+            'as': 'f',
+            'cond': {'$ne': ['$$f.folio_id', folio_id]}
+        }}}}
+    ] + RECOMPUTE_TOTALS
+
+def folio_projection(folio_id: str) -> Dict:
+    """Return only the investor totals and the touched folio"""
+    return {
+        '_id': 0,
+        'investor_id': 1,
+        'total_aum': 1,
+        'total_invested': 1,
+        'gain_loss_pct': 1,
+        'portfolios': {'$elemMatch': {'folio_id': folio_id}}
+    }
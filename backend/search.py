@@ -0,0 +1,93 @@
+"""Index-backed prefix search over investor name, email and PAN
+
+Each investor document carries a lowercase ``search_tokens`` array. Queries
+become anchored, case-sensitive prefix regexes on that multikey field, which
+MongoDB answers with an index range scan instead of a collection scan.
+
+Usage (backfill documents written before search_tokens existed):
+    python3 search.py
+"""
+import os
+import re
+import asyncio
+import logging
+from typing import Dict, List
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ('name', 'email', 'pan')
+_SPLIT = re.compile(r'[\s._\-+@]+')
+
+def build_search_tokens(investor: Dict) -> List[str]:
+    """Lowercase tokens an investor can be found by, in first-seen order"""
+    tokens = []
+
+    def add(value):
+        if value and value not in tokens:
+            tokens.append(value)
+
+    name = (investor.get('name') or '').strip().lower()
+    add(name)
+    for part in _SPLIT.split(name):
+        add(part)
+
+    email = (investor.get('email') or '').strip().lower()
+    add(email)
+    local = email.split('@', 1)[0]
+    add(local)
+    for part in _SPLIT.split(local):
+        add(part)
+
+    add((investor.get('pan') or '').strip().lower())
+    return tokens
+
+def search_filter(q: str) -> Dict:
+    """Filter matching investors having a token that starts with every query term"""
+    terms = [t for t in q.strip().lower().split() if t]
+    if not terms:
+        return {}
+    clauses = [{'search_tokens': {'$regex': f'^{re.escape(term)}'}} for term in terms]
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+async def backfill_search_tokens(db, batch_size: int = 1000) -> int:
+    """Populate search_tokens on investors missing it; returns documents updated"""
+    cursor = db.investors.find(
+        {'search_tokens': {'$exists': False}},
+        {'_id': 1, 'name': 1, 'email': 1, 'pan': 1}
+    ).batch_size(batch_size)
+
+    updated = 0
+    ops = []
+    async for doc in cursor:
+        ops.append(UpdateOne({'_id': doc['_id']}, {'$set': {'search_tokens': build_search_tokens(doc)}}))
+        if len(ops) >= batch_size:
+            await db.investors.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await db.investors.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    if updated:
+        logger.info(f"Backfilled search tokens on {updated} investors")
+    return updated
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.getenv('DB_NAME', 'mf360_database')
+
+    client = AsyncIOMotorClient(mongo_url)
+    try:
+        updated = await backfill_search_tokens(client[db_name])
+    finally:
+        client.close()
+    print(f"Backfilled search tokens on {updated} investors")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
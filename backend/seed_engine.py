@@ -0,0 +1,328 @@
+"""Deterministic, vectorised seed data generation
+
+Investors are generated in chunks of `chunk_size`. Each chunk draws every
+field as a NumPy array from its own generator, seeded with (seed, chunk
+start), so a given --seed produces the same dataset whatever the chunk
+order or number of workers. Chunks run in a spawned process pool; every
+worker inserts its own chunk with unordered insert_many over its own
+connection, so BSON encoding and the inserts proceed in parallel and only
+counts travel back to the coordinator.
+
+Distributions follow the original 300-investor script, scaled to --count:
+10% new / 20% recent / 70% established investors, 15% forced losses, 70%
+with no redemptions.
+"""
+import os
+import time
+import secrets
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import MongoClient
+
+from search import build_search_tokens
+from counters import INVESTOR_SEQUENCE, format_investor_id, reset_sequence
+from indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+AMC_LIST = [
+    {'name': 'HDFC Mutual Fund', 'code': 'HDFC'},
+    {'name': 'ICICI Prudential', 'code': 'ICICI'},
+    {'name': 'SBI Mutual Fund', 'code': 'SBI'},
+    {'name': 'Axis Mutual Fund', 'code': 'AXIS'},
+    {'name': 'Kotak Mahindra', 'code': 'KOTAK'},
+    {'name': 'Nippon India', 'code': 'NIPPON'},
+    {'name': 'Aditya Birla Sun Life', 'code': 'ABSL'},
+    {'name': 'UTI Mutual Fund', 'code': 'UTI'},
+    {'name': 'DSP Mutual Fund', 'code': 'DSP'},
+    {'name': 'Franklin Templeton', 'code': 'FRANK'}
+]
+
+CATEGORY_LIST = ['Equity', 'Debt', 'Hybrid', 'ELSS', 'Liquid', 'Balanced']
+
+# Indian names for realistic data
+FIRST_NAMES = [
+    'Rajesh', 'Priya', 'Amit', 'Sneha', 'Vikram', 'Ananya', 'Arjun', 'Kavya',
+    'Rohan', 'Neha', 'Sanjay', 'Divya', 'Karan', 'Pooja', 'Aditya', 'Riya',
+    'Rahul', 'Meera', 'Nikhil', 'Shreya', 'Varun', 'Anjali', 'Harsh', 'Ishita',
+    'Sameer', 'Swati', 'Kunal', 'Tanvi', 'Manish', 'Nidhi', 'Deepak', 'Preeti',
+    'Gaurav', 'Ritika', 'Ashish', 'Sakshi', 'Prakash', 'Simran', 'Suresh', 'Kritika',
+    'Anil', 'Jyoti', 'Ramesh', 'Aarti', 'Manoj', 'Pallavi', 'Vivek', 'Shweta',
+    'Akash', 'Nisha', 'Ravi', 'Megha', 'Sunil', 'Tara', 'Naveen', 'Aditi',
+    'Vishal', 'Madhuri', 'Ajay', 'Ritu', 'Sandeep', 'Bhavna', 'Yogesh', 'Shilpa'
+]
+
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Patel', 'Kumar', 'Singh', 'Gupta', 'Reddy', 'Nair',
+    'Kapoor', 'Mehta', 'Shah', 'Joshi', 'Rao', 'Desai', 'Chopra', 'Malhotra',
+    'Agarwal', 'Bhatia', 'Khanna', 'Sethi', 'Bansal', 'Choudhary', 'Jain', 'Iyer',
+    'Kulkarni', 'Pandey', 'Mishra', 'Sinha', 'Saxena', 'Tiwari', 'Trivedi', 'Pillai'
+]
+
+RISK_PROFILES = ['Low', 'Moderate', 'High']
+INVESTOR_TYPES = ['Individual', 'Family']
+OTHER_TXN_TYPES = np.array(['Buy', 'Switch', 'Dividend'], dtype=object)
+
+# Transactions are spread over the last 24 months
+HISTORY_DAYS = 24 * 30
+# Day offsets covered by the date table: up to 90 days ahead, 1000 days back
+FUTURE_DAYS = 90
+PAST_DAYS = 1000
+NO_DATE = np.iinfo(np.int64).min
+
+def _date_table(now: datetime) -> List[datetime]:
+    """now - d days for every offset d a chunk can draw, indexed by d + FUTURE_DAYS"""
+    return [now - timedelta(days=d) for d in range(-FUTURE_DAYS, PAST_DAYS + 1)]
+
+def _segments(n: int, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Owner index, position within owner and first row of each owner for n owners of counts rows"""
+    first = np.cumsum(counts) - counts
+    owner = np.repeat(np.arange(n), counts)
+    return owner, np.arange(counts.sum()) - first[owner], first
+
+def generate_chunk(start: int, count: int, total: int, seed: int, now: datetime,
+                   max_txns: int = 30) -> Tuple[List[Dict], List[Dict]]:
+    """Investor and transaction documents for investors start+1 .. start+count of total"""
+    rng = np.random.default_rng([seed, start])
+    dates = _date_table(now)
+    n = count
+    position = np.arange(start + 1, start + count + 1)
+
+    # Investor-level fields
+    first_idx = rng.integers(0, len(FIRST_NAMES), n)
+    last_idx = rng.integers(0, len(LAST_NAMES), n)
+    onboarding_days = np.select(
+        [position <= total * 0.1, position <= total * 0.3],
+        [rng.integers(1, 31, n), rng.integers(31, 91, n)],
+        rng.integers(91, 1001, n)
+    )
+    mobile = rng.integers(10000000, 100000000, n)
+    risk_idx = rng.integers(0, len(RISK_PROFILES), n)
+    type_idx = rng.integers(0, len(INVESTOR_TYPES), n)
+    force_negative = position <= total * 0.15
+    max_redemptions = np.where(position < total * 0.7, 0, rng.integers(3, 9, n))
+
+    # Folio-level fields, 3-8 per investor
+    num_folios = rng.integers(3, 9, n)
+    owner, folio_no, _ = _segments(n, num_folios)
+    f = len(owner)
+    amc_idx = rng.integers(0, len(AMC_LIST), f)
+    cat_idx = rng.integers(0, len(CATEGORY_LIST), f)
+    invested = rng.integers(20000, 300001, f)
+    gain_loss = np.where(
+        force_negative[owner],
+        rng.uniform(-15, -5, f),
+        np.where(rng.random(f) < 0.8, rng.uniform(0, 20, f), rng.uniform(-4, 0, f))
+    ).round(2)
+    current_value = (invested * (1 + gain_loss / 100)).round(2)
+    nav = rng.uniform(10, 250, f).round(2)
+    units = (current_value / nav).round(4)
+    scheme_no = rng.integers(100, 1000, f)
+    code_no = rng.integers(100, 1000, f)
+    isin_no = rng.integers(100000, 1000000, f)
+
+    # SIPs: 60% of folios; of those 60% active, 20% paused, 20% stopped
+    has_sip = rng.random(f) > 0.4
+    monthly = rng.random(f) < 0.5
+    state = rng.random(f)
+    active = has_sip & (state < 0.6)
+    paused = has_sip & (state >= 0.6) & (state < 0.8)
+    stopped = has_sip & (state >= 0.8)
+    days_since_last = np.select(
+        [active & monthly, active, paused & monthly, paused, stopped],
+        [rng.integers(1, 31, f), rng.integers(1, 86, f), rng.integers(40, 151, f),
+         rng.integers(110, 171, f), rng.integers(200, 501, f)],
+        NO_DATE
+    )
+    # Negative offsets are due dates ahead of now; 60% of paused SIPs are overdue
+    next_due_days = np.select(
+        [active, paused & (rng.random(f) < 0.4), paused],
+        [-rng.integers(1, 31, f), -rng.integers(1, 91, f), rng.integers(1, 31, f)],
+        NO_DATE
+    )
+
+    total_invested = np.bincount(owner, invested, n).astype(np.int64)
+    total_aum = np.bincount(owner, current_value, n)
+    investor_gain = np.where(
+        total_invested > 0,
+        (total_aum - total_invested) / np.maximum(total_invested, 1) * 100,
+        0
+    ).round(2)
+
+    investors = []
+    folio_ids = []
+    folio_investors = []
+    folios = zip(
+        owner.tolist(), folio_no.tolist(), amc_idx.tolist(), cat_idx.tolist(), scheme_no.tolist(),
+        code_no.tolist(), isin_no.tolist(), nav.tolist(), units.tolist(), invested.tolist(),
+        current_value.tolist(), gain_loss.tolist(), has_sip.tolist(), monthly.tolist(),
+        days_since_last.tolist(), next_due_days.tolist()
+    )
+    for k in range(n):
+        i = int(position[k])
+        investor_id = format_investor_id(i)
+        first_name = FIRST_NAMES[first_idx[k]]
+        last_name = LAST_NAMES[last_idx[k]]
+        investors.append({
+            'investor_id': investor_id,
+            'name': f"{first_name} {last_name}",
+            'pan': f'PAN{str(i).zfill(5)}X',
+            'email': f'{first_name.lower()}.{last_name.lower()}{i}@example.com',
+            'mobile': f'98{mobile[k]}',
+            'onboarding_date': dates[int(onboarding_days[k]) + FUTURE_DAYS],
+            'risk_profile': RISK_PROFILES[risk_idx[k]],
+            'investor_type': INVESTOR_TYPES[type_idx[k]],
+            'portfolios': [],
+            'total_invested': int(total_invested[k]),
+            'total_aum': float(total_aum[k]),
+            'gain_loss_pct': float(investor_gain[k])
+        })
+
+    for (k, no, a, c, scheme, code, isin, nav_f, units_f, inv, value, gl, sip, is_monthly,
+         since, due) in folios:
+        investor = investors[k]
+        amc = AMC_LIST[a]
+        folio_id = f"{investor['investor_id']}-F{no + 1}"
+        folio_ids.append(folio_id)
+        folio_investors.append(investor['investor_id'])
+        investor['portfolios'].append({
+            'folio_id': folio_id,
+            'amc_name': amc['name'],
+            'amc_code': amc['code'],
+            'scheme_name': f"{amc['name']} {CATEGORY_LIST[c]} Fund {scheme}",
+            'scheme_code': f"{amc['code']}-{code}",
+            'isin': f"ISIN{isin}",
+            'category': CATEGORY_LIST[c],
+            'nav': nav_f,
+            'units': units_f,
+            'invested_amount': inv,
+            'current_value': value,
+            'gain_loss_pct': gl,
+            'sip_flag': sip,
+            'sip_freq': ('Monthly' if is_monthly else 'Quarterly') if sip else None,
+            'last_sip_payment_date': dates[since + FUTURE_DAYS] if since != NO_DATE else None,
+            'next_due_date': dates[due + FUTURE_DAYS] if due != NO_DATE else None
+        })
+
+    for investor in investors:
+        investor['search_tokens'] = build_search_tokens(investor)
+
+    transactions = []
+    if max_txns > 0:
+        txn_count = rng.integers(min(20, max_txns), max_txns + 1, f)
+        txn_folio, txn_no, txn_first = _segments(f, txn_count)
+        t = len(txn_folio)
+        days_offset = (txn_no / txn_count[txn_folio] * HISTORY_DAYS).astype(np.int64)
+
+        # 60% of a SIP folio's transactions are SIPs; sells are capped per folio
+        is_sip = has_sip[txn_folio] & (rng.random(t) < 0.6)
+        sell_candidate = ~is_sip & (rng.random(t) < 0.15)
+        running = np.cumsum(sell_candidate)
+        before_folio = running[txn_first] - sell_candidate[txn_first]
+        is_sell = sell_candidate & (running - before_folio[txn_folio] <= max_redemptions[owner][txn_folio])
+        txn_type = np.where(is_sip, 'SIP', np.where(is_sell, 'Sell', OTHER_TXN_TYPES[rng.integers(0, 3, t)]))
+
+        txn_nav = rng.uniform(10, 250, t).round(2)
+        amount = rng.integers(1000, 50001, t)
+        txn_units = (amount / txn_nav).round(4)
+
+        for folio, no, kind, offset, nav_t, amt, u in zip(
+            txn_folio.tolist(), txn_no.tolist(), txn_type.tolist(), days_offset.tolist(),
+            txn_nav.tolist(), amount.tolist(), txn_units.tolist()
+        ):
+            folio_id = folio_ids[folio]
+            transactions.append({
+                'txn_id': f"{folio_id}-T{str(no + 1).zfill(3)}",
+                'investor_id': folio_investors[folio],
+                'folio_id': folio_id,
+                'txn_type': kind,
+                'txn_date': dates[HISTORY_DAYS - offset + FUTURE_DAYS],
+                'txn_amount': amt,
+                'nav_at_txn': nav_t,
+                'units': u
+            })
+
+    return investors, transactions
+
+_worker_client: Optional[MongoClient] = None
+
+def _worker_db(mongo_url: str, db_name: str):
+    """One synchronous client per worker process, reused across its chunks"""
+    global _worker_client
+    if _worker_client is None:
+        _worker_client = MongoClient(mongo_url, tz_aware=True)
+    return _worker_client[db_name]
+
+def _seed_chunk(target: Tuple[str, str], start: int, count: int, total: int, seed: int,
+                now: datetime, max_txns: int) -> Tuple[int, int]:
+    """Generate and insert one chunk in a worker; returns investor and transaction counts"""
+    investors, transactions = generate_chunk(start, count, total, seed, now, max_txns)
+    db = _worker_db(*target)
+    # insert_many splits into server-sized batches; unordered lets the server apply them in parallel
+    db.investors.insert_many(investors, ordered=False)
+    if transactions:
+        db.transactions.insert_many(transactions, ordered=False)
+    return len(investors), len(transactions)
+
+async def run_seed(db, target: Tuple[str, str], count: int, seed: Optional[int] = None,
+                   chunk_size: int = 5000, workers: Optional[int] = None, max_txns: int = 30,
+                   progress: Optional[Callable[[int, int], Awaitable]] = None) -> Dict:
+    """Replace investors and transactions with `count` generated investors
+
+    db is the coordinator's Motor database; target is the (mongo_url,
+    db_name) pair workers connect to. workers=0 runs chunks on threads in
+    this process. progress(investors, transactions) is awaited after each
+    chunk.
+    """
+    seed = secrets.randbits(32) if seed is None else seed
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+
+    # Dropping is far faster than deleting millions of documents; indexes are recreated empty
+    await db.investors.drop()
+    await db.transactions.drop()
+    await ensure_indexes(db)
+
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    loop = asyncio.get_running_loop()
+    investors_done = 0
+    transactions_done = 0
+    try:
+        futures = [
+            loop.run_in_executor(
+                executor, _seed_chunk, target, start, min(chunk_size, count - start), count, seed, now, max_txns
+            )
+            for start in range(0, count, chunk_size)
+        ]
+        for future in asyncio.as_completed(futures):
+            investors, transactions = await future
+            investors_done += investors
+            transactions_done += transactions
+            if progress is not None:
+                await progress(investors_done, transactions_done)
+    finally:
+        if executor is not None:
+            # Waiting for the workers to exit can take seconds; keep the event loop free meanwhile
+            await loop.run_in_executor(None, functools.partial(executor.shutdown, wait=True, cancel_futures=True))
+
+    # Continue API-created IDs after the seeded ones
+    await reset_sequence(db, INVESTOR_SEQUENCE, count)
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Seeded {investors_done} investors and {transactions_done} transactions in {seconds:.1f}s (seed {seed})")
+    return {
+        'investors': investors_done,
+        'transactions': transactions_done,
+        'seed': seed,
+        'seconds': round(seconds, 2)
+    }
@@ -1,27 +1,64 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uuid
+import json
+import base64
+import asyncio
 from datetime import datetime, timezone, timedelta
-import bcrypt
-from ai.analysis import run_all_analysis
-from ai.chatgpt import get_ai_summary
-import subprocess
+from ai.analysis import ALGORITHMS, resolve_algorithms
+from ai.pool import AnalysisPool, pool_size_from_env
+from ai.fingerprint import analysis_fingerprint, analysis_record, is_current, current_analyses
+from ai.chatgpt import (
+    get_ai_summary, get_ai_summaries, stream_ai_summary, template_summary, summary_cache, summary_flight
+)
+from ai.singleflight import MongoLock
+from ai.llm_client import get_llm_client
+from dashboard import (
+    summary_pipeline, format_summary, sip_analytics_pipeline,
+    high_potential_pipeline, sip_inflow_pipeline, sips_due_pipeline, format_analytics
+)
+from indexes import ensure_indexes
+from auth import (
+    hash_password, verify_password, issue_token, jwt_secret, require_user, require_stream_user, shutdown_hash_pool
+)
+from counters import allocate_investor_ids, sync_investor_sequence
+from portfolio_updates import (
+    FOLIO_FIELDS, replace_portfolios_pipeline, update_folio_pipeline,
+    remove_folio_pipeline, folio_projection
+)
+from snapshots import Snapshot
+from jobs import JobRunner
+from seed_engine import run_seed
+from transactions import detach_transactions, insert_transactions, new_txn_id
+from search import SEARCH_FIELDS, build_search_tokens, search_filter, backfill_search_tokens
+from dates import FOLIO_DATE_FIELDS, parse_date, coerce_folio_dates
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Dates are stored as BSON datetimes; read them back as aware UTC values
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
+# Access tokens are signed with a secret every worker must share; refuse to start without it
+jwt_secret()
+
+# Number of documents Motor pulls per round trip when streaming
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+
 # Create the main app without a prefix
 app = FastAPI(title="MF360 API", version="1.0.0")
 
@@ -60,10 +97,24 @@ class InvestorListItem(BaseModel):
 class AIAnalysisRequest(BaseModel):
     investor_id: str
 
+class AnalysisJobRequest(BaseModel):
+    q: Optional[str] = None
+    min_aum: Optional[float] = None
+    max_aum: Optional[float] = None
+    risk: Optional[str] = None
+    only_changed: bool = False
+
+class SeedRequest(BaseModel):
+    count: int = Field(300, ge=1, le=5_000_000)
+    seed: Optional[int] = None
+    chunk_size: int = Field(5000, ge=100, le=100_000)
+    max_txns: int = Field(30, ge=0, le=100)
+
 class RunSeedResponse(BaseModel):
     success: bool
     message: str
     count: Optional[int] = None
+    data: Optional[Dict] = None
 
 # ==================== Auth Routes ====================
 
@@ -75,15 +126,15 @@ async def signup(user_data: UserSignup):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Hash password
-    hashed_pw = bcrypt.hashpw(user_data.password.encode('utf-8'), bcrypt.gensalt())
+    # Hash password off the event loop
+    hashed_pw = await hash_password(user_data.password)
     
     user = {
         'id': str(uuid.uuid4()),
         'email': user_data.email,
         'name': user_data.name,
-        'password': hashed_pw.decode('utf-8'),
-        'created_at': datetime.now(timezone.utc).isoformat()
+        'password': hashed_pw,
+        'created_at': datetime.now(timezone.utc)
     }
     
     await db.users.insert_one(user)
@@ -106,7 +157,7 @@ async def login(login_data: UserLogin):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Verify password
-    if not bcrypt.checkpw(login_data.password.encode('utf-8'), user['password'].encode('utf-8')):
+    if not await verify_password(login_data.password, user['password']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     return {
@@ -115,69 +166,171 @@ async def login(login_data: UserLogin):
             'id': user['id'],
             'email': user['email'],
             'name': user['name'],
-            'token': f"token_{user['id']}"  # Simple token for MVP
+            'token': issue_token(user)
         }
     }
 
 # ==================== Investor Routes ====================
 
-@api_router.get("/investors")
-async def get_investors(
-    q: Optional[str] = Query(None, description="Search query"),
-    minAum: Optional[float] = Query(None, description="Minimum AUM"),
-    maxAum: Optional[float] = Query(None, description="Maximum AUM"),
-    risk: Optional[str] = Query(None, description="Risk profile"),
-    include_portfolios: Optional[bool] = Query(False, description="Include portfolio details")
-):
-    """Get list of investors with optional filters"""
+# Full investor document minus storage-only fields
+DETAIL_PROJECTION = {'_id': 0, 'search_tokens': 0}
+
+LIST_PROJECTION = {
+    '_id': 0,
+    'investor_id': 1,
+    'name': 1,
+    'pan': 1,
+    'email': 1,
+    'mobile': 1,
+    'total_aum': 1,
+    'total_invested': 1,
+    'gain_loss_pct': 1,
+    'risk_profile': 1,
+    'onboarding_date': 1
+}
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+SORT_KEYS = {
+    # sort name -> (primary field, direction); investor_id is always the tie-breaker
+    'investor_id': ('investor_id', 1),
+    'aum_desc': ('total_aum', -1),
+    'aum_asc': ('total_aum', 1),
+}
+
+def build_investor_query(q: Optional[str] = None, min_aum: Optional[float] = None,
+                         max_aum: Optional[float] = None, risk: Optional[str] = None) -> dict:
+    """Build the MongoDB filter shared by the investor list and bulk jobs"""
     query = {}
     
     if q:
-        query['$or'] = [
-            {'name': {'$regex': q, '$options': 'i'}},
-            {'email': {'$regex': q, '$options': 'i'}},
-            {'pan': {'$regex': q, '$options': 'i'}}
-        ]
+        query.update(search_filter(q))
     
-    if minAum is not None:
+    if min_aum is not None:
         query['total_aum'] = query.get('total_aum', {})
-        query['total_aum']['$gte'] = minAum
+        query['total_aum']['$gte'] = min_aum
     
-    if maxAum is not None:
+    if max_aum is not None:
         query['total_aum'] = query.get('total_aum', {})
-        query['total_aum']['$lte'] = maxAum
+        query['total_aum']['$lte'] = max_aum
     
     if risk:
         query['risk_profile'] = risk
     
+    return query
+
+def encode_position(position: list) -> str:
+    """Opaque, URL-safe form of a keyset position"""
+    raw = json.dumps(jsonable_encoder(position), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_position(cursor: str) -> list:
+    """Inverse of encode_position"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+def encode_cursor(doc: dict, sort: str) -> str:
+    """Encode the keyset position of the last document of a page"""
+    field, _ = SORT_KEYS[sort]
+    position = [doc.get('investor_id')]
+    if field != 'investor_id':
+        position.insert(0, doc.get(field))
+    return encode_position(position)
+
+def decode_cursor(cursor: str, sort: str) -> dict:
+    """Turn an opaque cursor into a filter that resumes strictly after it"""
+    field, direction = SORT_KEYS[sort]
+    position = decode_position(cursor)
+    
+    if field == 'investor_id':
+        if len(position) != 1:
+            raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+        return {'investor_id': {'$gt': position[0]}}
+    
+    if len(position) != 2:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+    value, last_id = position
+    op = '$lt' if direction < 0 else '$gt'
+    return {'$or': [
+        {field: {op: value}},
+        {field: value, 'investor_id': {'$gt': last_id}}
+    ]}
+
+@api_router.get("/investors", dependencies=[Depends(require_user)])
+async def get_investors(
+    q: Optional[str] = Query(None, description="Search query"),
+    minAum: Optional[float] = Query(None, description="Minimum AUM"),
+    maxAum: Optional[float] = Query(None, description="Maximum AUM"),
+    risk: Optional[str] = Query(None, description="Risk profile"),
+    include_portfolios: Optional[bool] = Query(False, description="Include portfolio details"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    sort: str = Query('investor_id', description="Sort order: investor_id, aum_desc or aum_asc"),
+    stream: Optional[bool] = Query(False, description="Stream matching investors as NDJSON")
+):
+    """Get investors with optional filters, keyset pagination and NDJSON streaming"""
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort: {sort}")
+    
+    query = build_investor_query(q, minAum, maxAum, risk)
+    if after:
+        query = {'$and': [query, decode_cursor(after, sort)]}
+    
     # Projection based on include_portfolios parameter
     if include_portfolios:
-        projection = {'_id': 0}  # Include everything except _id
+        projection = DETAIL_PROJECTION  # Include everything except internal fields
     else:
-        projection = {
-            '_id': 0,
-            'investor_id': 1,
-            'name': 1,
-            'pan': 1,
-            'email': 1,
-            'mobile': 1,
-            'total_aum': 1,
-            'total_invested': 1,
-            'gain_loss_pct': 1,
-            'risk_profile': 1,
-            'onboarding_date': 1
-        }
+        projection = LIST_PROJECTION
+    
+    field, direction = SORT_KEYS[sort]
+    sort_spec = [('investor_id', 1)]
+    if field != 'investor_id':
+        sort_spec.insert(0, (field, direction))
     
-    investors = await db.investors.find(query, projection).to_list(1000)
+    if stream:
+        # Stream straight from the Motor cursor so memory stays flat regardless of book size
+        cursor = db.investors.find(query, projection).sort(sort_spec).batch_size(STREAM_BATCH_SIZE)
+        if limit:
+            cursor = cursor.limit(limit)
+        
+        async def ndjson_lines():
+            async for doc in cursor:
+                yield json.dumps(jsonable_encoder(doc)) + '\n'
+        
+        return StreamingResponse(ndjson_lines(), media_type='application/x-ndjson')
+    
+    page_size = limit or DEFAULT_PAGE_SIZE
+    # Fetch one extra document to know whether another page exists
+    investors = await db.investors.find(query, projection).sort(sort_spec).to_list(page_size + 1)
     
+    next_cursor = None
+    if len(investors) > page_size:
+        investors = investors[:page_size]
+        next_cursor = encode_cursor(investors[-1], sort)
+    
+    return {'success': True, 'data': investors, 'count': len(investors), 'next_cursor': next_cursor}
+
+@api_router.get("/investors/search", dependencies=[Depends(require_user)])
+async def search_investors(
+    q: str = Query(..., min_length=1, description="Name, email or PAN prefix"),
+    limit: int = Query(10, ge=1, le=50, description="Max matches")
+):
+    """Typeahead lookup served from the search_tokens index"""
+    investors = await db.investors.find(search_filter(q), LIST_PROJECTION).to_list(limit)
     return {'success': True, 'data': investors, 'count': len(investors)}
 
-@api_router.get("/investors/{investor_id}")
+@api_router.get("/investors/{investor_id}", dependencies=[Depends(require_user)])
 async def get_investor_detail(investor_id: str):
     """Get detailed investor information"""
     investor = await db.investors.find_one(
         {'investor_id': investor_id},
-        {'_id': 0}
+        DETAIL_PROJECTION
     )
     
     if not investor:
@@ -185,32 +338,115 @@ async def get_investor_detail(investor_id: str):
     
     return {'success': True, 'data': investor}
 
-@api_router.post("/investors")
+@api_router.get("/investors/{investor_id}/transactions", dependencies=[Depends(require_user)])
+async def get_investor_transactions(
+    investor_id: str,
+    folio_id: Optional[str] = Query(None, description="Only this folio's transactions"),
+    from_date: Optional[str] = Query(None, description="Only transactions on or after this date"),
+    to_date: Optional[str] = Query(None, description="Only transactions on or before this date"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page")
+):
+    """Get an investor's transactions, newest first, one page at a time"""
+    query = {'investor_id': investor_id}
+    if folio_id:
+        query['folio_id'] = folio_id
+    
+    # Date windows are range scans on the (investor_id, folio_id, txn_date) index
+    if from_date or to_date:
+        query['txn_date'] = {}
+        if from_date:
+            query['txn_date']['$gte'] = request_date(from_date, 'from_date')
+        if to_date:
+            query['txn_date']['$lte'] = request_date(to_date, 'to_date')
+    
+    if after:
+        position = decode_position(after)
+        if len(position) != 2:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        txn_date, txn_id = position
+        try:
+            txn_date = parse_date(txn_date)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query['$or'] = [
+            {'txn_date': {'$lt': txn_date}},
+            {'txn_date': txn_date, 'txn_id': {'$lt': txn_id}}
+        ]
+    
+    transactions = await db.transactions.find(query, {'_id': 0}) \
+        .sort([('txn_date', -1), ('txn_id', -1)]) \
+        .to_list(limit + 1)
+    
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        next_cursor = encode_position([last['txn_date'], last['txn_id']])
+    
+    return {'success': True, 'data': transactions, 'count': len(transactions), 'next_cursor': next_cursor}
+
+def request_date(value, field: str) -> Optional[datetime]:
+    """parse_date for request input, rejecting malformed values with a 400"""
+    try:
+        return parse_date(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=f"Invalid {field}")
+
+def coerce_portfolio_dates(portfolios: list) -> list:
+    """Parse folio and embedded transaction dates from request data"""
+    for folio in portfolios:
+        try:
+            coerce_folio_dates(folio)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail=f"Invalid date in {', '.join(FOLIO_DATE_FIELDS)}")
+        for txn in folio.get('transactions') or []:
+            if 'txn_date' in txn:
+                txn['txn_date'] = request_date(txn['txn_date'], 'txn_date')
+    return portfolios
+
+def coerce_investor_dates(investor_data: dict) -> dict:
+    """Parse every date of a new investor, so bad input is rejected before an ID is allocated"""
+    investor_data['onboarding_date'] = request_date(investor_data.get('onboarding_date'), 'onboarding_date')
+    coerce_portfolio_dates(investor_data.get('portfolios', []))
+    return investor_data
+
+def build_investor_document(investor_id: str, investor_data: dict) -> dict:
+    """Build a new investor document from request data whose dates are already parsed"""
+    investor = {
+        'investor_id': investor_id,
+        'name': investor_data.get('name'),
+        'pan': investor_data.get('pan'),
+        'email': investor_data.get('email'),
+        'mobile': investor_data.get('mobile'),
+        'onboarding_date': investor_data.get('onboarding_date') or datetime.now(timezone.utc),
+        'risk_profile': investor_data.get('risk_profile', 'Moderate'),
+        'investor_type': investor_data.get('investor_type', 'Individual'),
+        'portfolios': investor_data.get('portfolios', []),
+        'total_invested': investor_data.get('total_invested', 0),
+        'total_aum': investor_data.get('total_aum', 0),
+        'gain_loss_pct': investor_data.get('gain_loss_pct', 0)
+    }
+    investor['search_tokens'] = build_search_tokens(investor)
+    return investor
+
+@api_router.post("/investors", dependencies=[Depends(require_user)])
 async def create_investor(investor_data: dict):
     """Create a new investor"""
+    coerce_investor_dates(investor_data)
+    
     try:
-        # Generate new investor ID
-        count = await db.investors.count_documents({})
-        new_investor_id = f"INV{str(count + 1).zfill(4)}"
+        # Allocate the next investor ID atomically from the counters collection
+        new_investor_id = (await allocate_investor_ids(db))[0]
         
         # Prepare investor document
-        investor = {
-            'investor_id': new_investor_id,
-            'name': investor_data.get('name'),
-            'pan': investor_data.get('pan'),
-            'email': investor_data.get('email'),
-            'mobile': investor_data.get('mobile'),
-            'onboarding_date': investor_data.get('onboarding_date', datetime.now(timezone.utc).isoformat()),
-            'risk_profile': investor_data.get('risk_profile', 'Moderate'),
-            'investor_type': investor_data.get('investor_type', 'Individual'),
-            'portfolios': investor_data.get('portfolios', []),
-            'total_invested': investor_data.get('total_invested', 0),
-            'total_aum': investor_data.get('total_aum', 0),
-            'gain_loss_pct': investor_data.get('gain_loss_pct', 0)
-        }
+        investor = build_investor_document(new_investor_id, investor_data)
+        transactions = detach_transactions(investor)
         
         # Insert into database
         await db.investors.insert_one(investor)
+        await insert_transactions(db, transactions)
+        await dashboard_snapshot.invalidate()
         
         return {
             'success': True,
@@ -221,15 +457,41 @@ async def create_investor(investor_data: dict):
         logging.error(f"Error creating investor: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error creating investor: {str(e)}")
 
-@api_router.put("/investors/{investor_id}")
-async def update_investor(investor_id: str, investor_data: dict):
-    """Update an existing investor"""
+@api_router.post("/investors/bulk", dependencies=[Depends(require_user)])
+async def create_investors_bulk(investors_data: List[dict]):
+    """Create many investors, reserving their IDs in a single round trip"""
+    if not investors_data:
+        raise HTTPException(status_code=400, detail="No investors to create")
+    
+    for data in investors_data:
+        coerce_investor_dates(data)
+    
     try:
-        # Check if investor exists
-        existing = await db.investors.find_one({'investor_id': investor_id}, {'_id': 0})
-        if not existing:
-            raise HTTPException(status_code=404, detail="Investor not found")
+        investor_ids = await allocate_investor_ids(db, len(investors_data))
+        investors = [
+            build_investor_document(investor_id, data)
+            for investor_id, data in zip(investor_ids, investors_data)
+        ]
+        transactions = [txn for investor in investors for txn in detach_transactions(investor)]
         
+        await db.investors.insert_many(investors, ordered=False)
+        await insert_transactions(db, transactions)
+        await dashboard_snapshot.invalidate()
+        
+        return {
+            'success': True,
+            'message': f'{len(investors)} investors created successfully',
+            'data': {'investor_ids': investor_ids},
+            'count': len(investors)
+        }
+    except Exception as e:
+        logging.error(f"Error creating investors: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error creating investors: {str(e)}")
+
+@api_router.put("/investors/{investor_id}", dependencies=[Depends(require_user)])
+async def update_investor(investor_id: str, investor_data: dict):
+    """Update an existing investor in a single round trip"""
+    try:
         # Prepare update data (only update provided fields)
         update_data = {}
         allowed_fields = ['name', 'pan', 'email', 'mobile', 'risk_profile', 'investor_type', 
@@ -242,14 +504,42 @@ async def update_investor(investor_id: str, investor_data: dict):
         if not update_data:
             raise HTTPException(status_code=400, detail="No valid fields to update")
         
-        # Update investor
-        await db.investors.update_one(
+        changed_search_fields = [field for field in SEARCH_FIELDS if field in update_data]
+        if changed_search_fields:
+            current = {}
+            if len(changed_search_fields) < len(SEARCH_FIELDS):
+                # Tokens cover all search fields, so fetch just the ones not being replaced
+                current = await db.investors.find_one(
+                    {'investor_id': investor_id},
+                    {'_id': 0, **{field: 1 for field in SEARCH_FIELDS}}
+                ) or {}
+            update_data['search_tokens'] = build_search_tokens({**current, **update_data})
+        
+        # Totals are derived from the folios whenever the folios change
+        transactions = []
+        if 'portfolios' in update_data:
+            coerce_portfolio_dates(update_data['portfolios'])
+            transactions = detach_transactions({'investor_id': investor_id, 'portfolios': update_data['portfolios']})
+            update = replace_portfolios_pipeline(update_data)
+        else:
+            update = {'$set': update_data}
+        
+        updated_investor = await db.investors.find_one_and_update(
             {'investor_id': investor_id},
-            {'$set': update_data}
+            update,
+            projection=DETAIL_PROJECTION,
+            return_document=ReturnDocument.AFTER
         )
         
-        # Get updated investor
-        updated_investor = await db.investors.find_one({'investor_id': investor_id}, {'_id': 0})
+        if not updated_investor:
+            raise HTTPException(status_code=404, detail="Investor not found")
+        
+        if 'portfolios' in update_data:
+            # Drop history of folios that were removed and store any newly embedded rows
+            folio_ids = [folio.get('folio_id') for folio in update_data['portfolios']]
+            await db.transactions.delete_many({'investor_id': investor_id, 'folio_id': {'$nin': folio_ids}})
+            await insert_transactions(db, transactions)
+        await dashboard_snapshot.invalidate()
         
         return {
             'success': True,
@@ -262,7 +552,94 @@ async def update_investor(investor_id: str, investor_data: dict):
         logging.error(f"Error updating investor: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error updating investor: {str(e)}")
 
-@api_router.delete("/investors/{investor_id}")
+@api_router.patch("/investors/{investor_id}/portfolios/{folio_id}", dependencies=[Depends(require_user)])
+async def update_folio(investor_id: str, folio_id: str, folio_data: dict):
+    """Update fields of a single folio (e.g. NAV/units) and recompute totals"""
+    changes = {k: v for k, v in folio_data.items() if k in FOLIO_FIELDS}
+    if not changes:
+        raise HTTPException(status_code=400, detail="No valid folio fields to update")
+    
+    try:
+        coerce_folio_dates(changes)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=f"Invalid date in {', '.join(FOLIO_DATE_FIELDS)}")
+    
+    try:
+        updated = await db.investors.find_one_and_update(
+            {'investor_id': investor_id, 'portfolios.folio_id': folio_id},
+            update_folio_pipeline(folio_id, changes),
+            projection=folio_projection(folio_id),
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception as e:
+        logging.error(f"Error updating folio: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error updating folio: {str(e)}")
+    
+    if not updated:
+        raise HTTPException(status_code=404, detail="Investor or folio not found")
+    
+    await dashboard_snapshot.invalidate()
+    
+    return {'success': True, 'message': 'Folio updated successfully', 'data': updated}
+
+@api_router.delete("/investors/{investor_id}/portfolios/{folio_id}", dependencies=[Depends(require_user)])
+async def remove_folio(investor_id: str, folio_id: str):
+    """Remove a folio and recompute totals"""
+    try:
+        updated = await db.investors.find_one_and_update(
+            {'investor_id': investor_id, 'portfolios.folio_id': folio_id},
+            remove_folio_pipeline(folio_id),
+            projection={'_id': 0, 'investor_id': 1, 'total_aum': 1, 'total_invested': 1, 'gain_loss_pct': 1},
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception as e:
+        logging.error(f"Error removing folio: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error removing folio: {str(e)}")
+    
+    if not updated:
+        raise HTTPException(status_code=404, detail="Investor or folio not found")
+    
+    await db.transactions.delete_many({'investor_id': investor_id, 'folio_id': folio_id})
+    await dashboard_snapshot.invalidate()
+    
+    return {'success': True, 'message': 'Folio removed successfully', 'data': updated}
+
+@api_router.post("/investors/{investor_id}/portfolios/{folio_id}/transactions", dependencies=[Depends(require_user)])
+async def add_transaction(investor_id: str, folio_id: str, txn_data: dict):
+    """Record a transaction against a folio without touching the investor document"""
+    folio_exists = await db.investors.find_one(
+        {'investor_id': investor_id, 'portfolios.folio_id': folio_id},
+        {'_id': 1}
+    )
+    if not folio_exists:
+        raise HTTPException(status_code=404, detail="Investor or folio not found")
+    
+    txn_date = request_date(txn_data.get('txn_date'), 'txn_date') or datetime.now(timezone.utc)
+    
+    txn = {
+        'txn_id': txn_data.get('txn_id') or new_txn_id(folio_id),
+        'investor_id': investor_id,
+        'folio_id': folio_id,
+        'txn_type': txn_data.get('txn_type'),
+        'txn_date': txn_date,
+        'txn_amount': txn_data.get('txn_amount', 0),
+        'nav_at_txn': txn_data.get('nav_at_txn'),
+        'units': txn_data.get('units')
+    }
+    
+    try:
+        await db.transactions.insert_one(dict(txn))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Transaction already exists")
+    except Exception as e:
+        logging.error(f"Error adding transaction: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error adding transaction: {str(e)}")
+    
+    await dashboard_snapshot.invalidate()
+    
+    return {'success': True, 'message': 'Transaction added successfully', 'data': txn}
+
+@api_router.delete("/investors/{investor_id}", dependencies=[Depends(require_user)])
 async def delete_investor(investor_id: str):
     """Delete an investor"""
     try:
@@ -277,8 +654,10 @@ async def delete_investor(investor_id: str):
         if result.deleted_count == 0:
             raise HTTPException(status_code=500, detail="Failed to delete investor")
         
-        # Also delete associated AI analyses
+        # Also delete associated transactions and AI analyses
+        await db.transactions.delete_many({'investor_id': investor_id})
         await db.ai_analyses.delete_many({'investor_id': investor_id})
+        await dashboard_snapshot.invalidate()
         
         return {
             'success': True,
@@ -293,9 +672,83 @@ async def delete_investor(investor_id: str):
 
 # ==================== AI Routes ====================
 
-@api_router.post("/ai/run/{investor_id}")
-async def run_ai_analysis(investor_id: str):
-    """Run AI analysis for a single investor"""
+analysis_pool = AnalysisPool(
+    pool_size_from_env(),
+    chunk_size=int(os.environ.get('ANALYSIS_CHUNK_SIZE', 100))
+)
+
+# LLM responses are shared between workers through the llm_cache collection. Both
+# tiers are built here, after .env is loaded, so they expire on the same TTL.
+summary_cache.configure(db.llm_cache)
+summary_flight.lock = MongoLock(db.llm_locks)
+
+# Stored analyses of unchanged investors are served for this long before a rerun
+ANALYSIS_MAX_AGE = timedelta(hours=float(os.environ.get('ANALYSIS_MAX_AGE_HOURS', 24)))
+
+# Default latency budget for /ai/run summaries; unset means wait for the LLM
+AI_SUMMARY_BUDGET_MS = int(os.environ['AI_SUMMARY_BUDGET_MS']) if os.environ.get('AI_SUMMARY_BUDGET_MS') else None
+
+# LLM summaries still running after their request returned a provisional one
+pending_summaries = set()
+
+async def replace_provisional_summary(summary_task: asyncio.Task, investor_id: str, fingerprint: str):
+    """Swap the stored template summary for the LLM one once it arrives"""
+    try:
+        ai_summary = await summary_task
+    except Exception as e:
+        ai_summary = {'error': True, 'summary': str(e)}
+    if ai_summary.get('error'):
+        logging.warning(f"Background summary for {investor_id} failed; provisional summary kept: {ai_summary['summary']}")
+        return
+    # Only replace the record this summary belongs to, and never a newer real summary
+    await db.ai_analyses.update_one(
+        {'investor_id': investor_id, 'fingerprint': fingerprint, 'ai_summary.provisional': True},
+        {'$set': {'ai_summary': ai_summary}}
+    )
+
+async def summary_within_budget(analysis_result: dict, budget_seconds: float):
+    """LLM summary if it arrives within the budget, else a provisional template summary
+    
+    Returns the summary and, when the LLM call is still running, its task.
+    A failed LLM summary is also replaced by the template.
+    """
+    summary_task = asyncio.ensure_future(get_ai_summary(analysis_result))
+    done, _ = await asyncio.wait({summary_task}, timeout=max(budget_seconds, 0))
+    if not done:
+        return template_summary(analysis_result), summary_task
+    ai_summary = summary_task.result()
+    if ai_summary.get('error'):
+        return template_summary(analysis_result), None
+    return ai_summary, None
+
+def parse_algorithms(algorithms: Optional[str]) -> Optional[List[str]]:
+    """Comma-separated algorithm keys from a query parameter, expanded with their dependencies"""
+    if not algorithms:
+        return None
+    try:
+        return resolve_algorithms([key.strip() for key in algorithms.split(',') if key.strip()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.post("/ai/run/{investor_id}", dependencies=[Depends(require_user)])
+async def run_ai_analysis(
+    investor_id: str,
+    force: bool = Query(False, description="Recompute even if the investor is unchanged"),
+    algorithms: Optional[str] = Query(None, description="Comma-separated algorithm keys; all when omitted"),
+    budget_ms: Optional[int] = Query(None, ge=1, description="Latency budget; a provisional summary is returned when the LLM is slower")
+):
+    """Run AI analysis for a single investor
+    
+    With `algorithms`, only those (and their dependencies) run; the partial
+    result is returned without an LLM summary and is not stored.
+    
+    With a latency budget (`budget_ms`, or AI_SUMMARY_BUDGET_MS), a summary
+    that is late or fails is replaced by a template marked provisional; a
+    late LLM summary replaces it in ai_analyses when it arrives.
+    """
+    started = asyncio.get_running_loop().time()
+    budget_ms = budget_ms or AI_SUMMARY_BUDGET_MS
+    keys = parse_algorithms(algorithms)
     investor = await db.investors.find_one(
         {'investor_id': investor_id},
         {'_id': 0}
@@ -304,46 +757,209 @@ async def run_ai_analysis(investor_id: str):
     if not investor:
         raise HTTPException(status_code=404, detail="Investor not found")
     
-    # Run all 20 AI algorithms
-    analysis_result = run_all_analysis(investor)
+    if not force:
+        stored = await db.ai_analyses.find_one({'investor_id': investor_id}, {'_id': 0})
+        if is_current(stored, analysis_fingerprint(investor), ANALYSIS_MAX_AGE):
+            analysis_result = stored['analysis_result']
+            if keys:
+                analysis_result = {
+                    k: v for k, v in analysis_result.items()
+                    if k in ('investor_id', 'name') or k in keys
+                }
+            return {
+                'success': True,
+                'data': {
+                    'analysis': analysis_result,
+                    'summary': stored['ai_summary'],
+                    'reused': True,
+                    'provisional': False,
+                    'timings_ms': {}
+                }
+            }
+    
+    # Run the AI algorithms in the analysis pool, off the event loop
+    analysis_result, timings = await analysis_pool.analyze(investor, keys)
+    timings_ms = {key: round(ms, 3) for key, ms in timings.items()}
+    
+    if keys:
+        return {
+            'success': True,
+            'data': {
+                'analysis': analysis_result,
+                'summary': None,
+                'reused': False,
+                'provisional': False,
+                'timings_ms': timings_ms
+            }
+        }
     
     # Get ChatGPT summary
-    ai_summary = await get_ai_summary(analysis_result)
+    summary_task = None
+    if budget_ms:
+        elapsed = asyncio.get_running_loop().time() - started
+        ai_summary, summary_task = await summary_within_budget(analysis_result, budget_ms / 1000 - elapsed)
+    else:
+        ai_summary = await get_ai_summary(analysis_result)
     
-    # Store analysis result
-    analysis_doc = {
-        'investor_id': investor_id,
-        'analysis_result': analysis_result,
-        'ai_summary': ai_summary,
-        'created_at': datetime.now(timezone.utc).isoformat()
+    # Store analysis result with the fingerprint of the inputs it was computed from;
+    # a failed summary is returned but not stored, so the next run retries it.
+    # Provisional summaries are stored but never reused as current.
+    if not ai_summary.get('error'):
+        record = analysis_record(investor, analysis_result, ai_summary, datetime.now(timezone.utc))
+        await db.ai_analyses.update_one(
+            {'investor_id': investor_id},
+            {'$set': record},
+            upsert=True
+        )
+        if summary_task is not None:
+            follow_up = asyncio.create_task(
+                replace_provisional_summary(summary_task, investor_id, record['fingerprint'])
+            )
+            pending_summaries.add(follow_up)
+            follow_up.add_done_callback(pending_summaries.discard)
+    
+    return {
+        'success': True,
+        'data': {
+            'analysis': analysis_result,
+            'summary': ai_summary,
+            'reused': False,
+            'provisional': bool(ai_summary.get('provisional')),
+            'timings_ms': timings_ms
+        }
     }
+
+def sse_event(event: str, data) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@api_router.get("/ai/stream/{investor_id}", dependencies=[Depends(require_stream_user)])
+async def stream_ai_analysis(
+    investor_id: str,
+    force: bool = Query(False, description="Recompute even if the investor is unchanged")
+):
+    """Run AI analysis for a single investor, streamed as Server-Sent Events
     
-    await db.ai_analyses.update_one(
+    Emits `analysis` as soon as the algorithms finish, `token` events while
+    the summary is generated, then `done` once the result is stored. `error`
+    carries the failed summary, or a `detail` message if the analysis itself
+    failed; nothing is stored then.
+    """
+    investor = await db.investors.find_one(
         {'investor_id': investor_id},
-        {'$set': analysis_doc},
-        upsert=True
+        {'_id': 0}
     )
     
+    if not investor:
+        raise HTTPException(status_code=404, detail="Investor not found")
+    
+    async def events():
+        try:
+            if not force:
+                stored = await db.ai_analyses.find_one({'investor_id': investor_id}, {'_id': 0})
+                if is_current(stored, analysis_fingerprint(investor), ANALYSIS_MAX_AGE):
+                    yield sse_event('analysis', {'analysis': stored['analysis_result'], 'reused': True, 'timings_ms': {}})
+                    yield sse_event('done', {'summary': stored['ai_summary'], 'stored': True})
+                    return
+            
+            analysis_result, timings = await analysis_pool.analyze(investor)
+            yield sse_event('analysis', {
+                'analysis': analysis_result,
+                'reused': False,
+                'timings_ms': {key: round(ms, 3) for key, ms in timings.items()}
+            })
+            
+            ai_summary = None
+            async for event in stream_ai_summary(analysis_result):
+                if 'token' in event:
+                    yield sse_event('token', {'text': event['token']})
+                else:
+                    ai_summary = event['summary']
+            
+            if ai_summary.get('error'):
+                yield sse_event('error', {'summary': ai_summary})
+                return
+            
+            await db.ai_analyses.update_one(
+                {'investor_id': investor_id},
+                {'$set': analysis_record(investor, analysis_result, ai_summary, datetime.now(timezone.utc))},
+                upsert=True
+            )
+            yield sse_event('done', {'summary': ai_summary, 'stored': True})
+        except Exception as e:
+            # A dropped connection looks like a network error to EventSource; say what failed
+            logging.error(f"Error streaming AI analysis for {investor_id}: {str(e)}")
+            yield sse_event('error', {'detail': f"Error running AI analysis: {str(e)}"})
+    
+    # Ask proxies not to buffer, or the events arrive all at once
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api_router.get("/ai/algorithms", dependencies=[Depends(require_user)])
+async def get_ai_algorithms():
+    """List the registered algorithms and where analysis time has gone in this process"""
     return {
         'success': True,
         'data': {
-            'analysis': analysis_result,
-            'summary': ai_summary
+            'algorithms': [
+                {'key': a.key, 'name': a.name, 'depends': list(a.depends)}
+                for a in ALGORITHMS
+            ],
+            'runs': analysis_pool.stats.runs,
+            'timings': analysis_pool.stats.report()
         }
     }
 
-@api_router.post("/ai/run-bulk")
+@api_router.post("/ai/run-bulk", dependencies=[Depends(require_user)])
 async def run_bulk_analysis(
-    limit: Optional[int] = Query(10, description="Max investors to analyze")
+    limit: Optional[int] = Query(10, description="Max investors to analyze"),
+    only_changed: bool = Query(False, description="Skip investors whose stored analysis is current")
 ):
     """Run AI analysis for multiple investors (with rate limiting)"""
     investors = await db.investors.find({}, {'_id': 0}).to_list(limit)
     
     results = []
-    for investor in investors:
+    if only_changed:
+        current = await current_analyses(db, investors, ANALYSIS_MAX_AGE)
+        results = [
+            {
+                'investor_id': investor_id,
+                'status': 'unchanged',
+                'analysis': stored['analysis_result'],
+                'summary': stored['ai_summary']
+            }
+            for investor_id, stored in current.items()
+        ]
+        investors = [investor for investor in investors if investor['investor_id'] not in current]
+    
+    analyzed = []
+    for investor, analysis_result in zip(investors, await analysis_pool.analyze_many(investors)):
+        if isinstance(analysis_result, Exception):
+            results.append({
+                'investor_id': investor['investor_id'],
+                'status': 'error',
+                'error': str(analysis_result)
+            })
+        else:
+            analyzed.append((investor, analysis_result))
+    investors = [investor for investor, _ in analyzed]
+    analyses = [analysis_result for _, analysis_result in analyzed]
+    
+    # One batched LLM request per group of investors instead of one per investor
+    summaries = await get_ai_summaries(analyses)
+    for investor, analysis_result, ai_summary in zip(investors, analyses, summaries):
         try:
-            analysis_result = run_all_analysis(investor)
-            ai_summary = await get_ai_summary(analysis_result)
+            if ai_summary.get('error'):
+                results.append({
+                    'investor_id': investor['investor_id'],
+                    'status': 'error',
+                    'analysis': analysis_result,
+                    'error': ai_summary['summary']
+                })
+                continue
             
             results.append({
                 'investor_id': investor['investor_id'],
@@ -355,12 +971,7 @@ async def run_bulk_analysis(
             # Store result
             await db.ai_analyses.update_one(
                 {'investor_id': investor['investor_id']},
-                {'$set': {
-                    'investor_id': investor['investor_id'],
-                    'analysis_result': analysis_result,
-                    'ai_summary': ai_summary,
-                    'created_at': datetime.now(timezone.utc).isoformat()
-                }},
+                {'$set': analysis_record(investor, analysis_result, ai_summary, datetime.now(timezone.utc))},
                 upsert=True
             )
         except Exception as e:
@@ -372,7 +983,56 @@ async def run_bulk_analysis(
     
     return {'success': True, 'data': results, 'count': len(results)}
 
-@api_router.get("/ai/summary/{investor_id}")
+analysis_jobs = JobRunner(
+    db,
+    build_investor_query,
+    analysis_pool.analyze_many,
+    get_ai_summaries,
+    max_age=ANALYSIS_MAX_AGE,
+    batch_size=int(os.environ.get('AI_JOB_BATCH_SIZE', 100))
+)
+
+@api_router.post("/ai/jobs", status_code=202, dependencies=[Depends(require_user)])
+async def create_analysis_job(job_request: AnalysisJobRequest):
+    """Queue analysis of every investor matching the filter as a background job"""
+    try:
+        params = job_request.model_dump()
+        only_changed = params.pop('only_changed')
+        job = await analysis_jobs.enqueue(params, only_changed=only_changed)
+        return {'success': True, 'message': 'Analysis job queued', 'data': job}
+    except Exception as e:
+        logging.error(f"Error queueing analysis job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error queueing analysis job: {str(e)}")
+
+@api_router.get("/ai/jobs/{job_id}", dependencies=[Depends(require_user)])
+async def get_analysis_job(job_id: str):
+    """Get progress, throughput and ETA of an analysis job"""
+    job = await analysis_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {'success': True, 'data': job}
+
+@api_router.get("/ai/cache/stats", dependencies=[Depends(require_user)])
+async def get_ai_cache_stats():
+    """Hit/miss/eviction counters of the LLM response cache and request coalescing in this worker"""
+    return {'success': True, 'data': {**summary_cache.stats(), 'single_flight': summary_flight.stats()}}
+
+@api_router.post("/ai/cache/purge", dependencies=[Depends(require_user)])
+async def purge_ai_cache():
+    """Drop expired LLM cache entries from both tiers"""
+    try:
+        purged = await summary_cache.purge_expired()
+        return {'success': True, 'data': purged}
+    except Exception as e:
+        logging.error(f"Error purging AI cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error purging AI cache: {str(e)}")
+
+@api_router.get("/ai/llm/stats", dependencies=[Depends(require_user)])
+async def get_llm_stats():
+    """Call, retry and throttling counters and circuit state of this worker's LLM client"""
+    return {'success': True, 'data': get_llm_client().stats()}
+
+@api_router.get("/ai/summary/{investor_id}", dependencies=[Depends(require_user)])
 async def get_ai_summary_cached(investor_id: str):
     """Get cached AI summary for investor"""
     analysis = await db.ai_analyses.find_one(
@@ -385,206 +1045,82 @@ async def get_ai_summary_cached(investor_id: str):
     
     return {'success': True, 'data': analysis}
 
+# ==================== SIP Routes ====================
+
+@api_router.get("/sips/due", dependencies=[Depends(require_user)])
+async def get_sips_due(
+    days: int = Query(7, ge=0, le=366, description="Look-ahead window in days"),
+    limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE, description="Maximum folios returned")
+):
+    """Get SIP instalments falling due within the next `days` days, soonest first"""
+    try:
+        now = datetime.now(timezone.utc)
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        sips = await db.investors.aggregate(
+            sips_due_pipeline(start, start + timedelta(days=days + 1), limit)
+        ).to_list(limit)
+        return {'success': True, 'data': sips, 'count': len(sips)}
+    except Exception as e:
+        logging.error(f"Error fetching due SIPs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error fetching due SIPs: {str(e)}")
+
 # ==================== Dashboard Analytics Routes ====================
 
-@api_router.get("/dashboard/analytics")
-async def get_dashboard_analytics():
-    """Get comprehensive dashboard analytics including SIP insights and investor segmentation"""
+@api_router.get("/dashboard/summary", dependencies=[Depends(require_user)])
+async def get_dashboard_summary(
+    top: int = Query(5, ge=1, le=50, description="Number of top investors by AUM")
+):
+    """Get book-wide dashboard totals and breakdowns computed server-side"""
     try:
-        # Fetch all investors with portfolios
-        investors = await db.investors.find({}, {'_id': 0}).to_list(None)
-        
-        if not investors or len(investors) == 0:
-            return {
-                'success': True,
-                'data': {
-                    'needsSeeding': True
-                }
-            }
-        
         now = datetime.now(timezone.utc)
+        facets = await db.investors.aggregate(summary_pipeline(now, top)).to_list(1)
         
-        # Initialize analytics data
-        analytics = {
-            'sip_status': {
-                'active': 0,
-                'paused': 0,
-                'stopped': 0
-            },
-            'monthly_sip_inflow': [],
-            'average_sip_ticket_size': 0,
-            'top_sip_investors': [],
-            'upcoming_sip_expiry': [],
-            'profit_loss_split': {
-                'profit': 0,
-                'loss': 0
-            },
-            'high_potential_investors': []
-        }
-        
-        # Collect all SIP data and transaction data
-        sip_portfolios = []
-        sip_transactions_by_month = {}
-        investor_sip_totals = {}
-        
-        for investor in investors:
-            investor_sip_value = 0
-            investor_redemptions = 0
-            
-            # Calculate profit/loss split
-            if investor.get('gain_loss_pct', 0) >= 0:
-                analytics['profit_loss_split']['profit'] += 1
-            else:
-                analytics['profit_loss_split']['loss'] += 1
-            
-            if not investor.get('portfolios'):
-                continue
-                
-            for portfolio in investor['portfolios']:
-                if portfolio.get('sip_flag'):
-                    sip_portfolios.append({
-                        'investor_id': investor['investor_id'],
-                        'investor_name': investor['name'],
-                        'portfolio': portfolio,
-                        'investor_onboarding': investor.get('onboarding_date')
-                    })
-                    investor_sip_value += portfolio.get('current_value', 0)
-                    
-                    # Determine SIP status
-                    last_sip_date_str = portfolio.get('last_sip_payment_date')
-                    sip_freq = portfolio.get('sip_freq', 'Monthly')
-                    
-                    if last_sip_date_str:
-                        try:
-                            last_sip_date = datetime.fromisoformat(last_sip_date_str.replace('Z', '+00:00'))
-                            days_since_last = (now - last_sip_date).days
-                            
-                            # Determine status based on frequency
-                            if sip_freq == 'Monthly':
-                                if days_since_last <= 35:
-                                    analytics['sip_status']['active'] += 1
-                                elif days_since_last <= 180:
-                                    analytics['sip_status']['paused'] += 1
-                                else:
-                                    analytics['sip_status']['stopped'] += 1
-                            else:  # Quarterly
-                                if days_since_last <= 100:
-                                    analytics['sip_status']['active'] += 1
-                                elif days_since_last <= 180:
-                                    analytics['sip_status']['paused'] += 1
-                                else:
-                                    analytics['sip_status']['stopped'] += 1
-                        except:
-                            analytics['sip_status']['stopped'] += 1
-                    else:
-                        analytics['sip_status']['stopped'] += 1
-                    
-                    # Check for upcoming expiry (within 3 months)
-                    next_due_str = portfolio.get('next_due_date')
-                    if next_due_str:
-                        try:
-                            next_due = datetime.fromisoformat(next_due_str.replace('Z', '+00:00'))
-                            days_until_due = (next_due - now).days
-                            
-                            if 0 <= days_until_due <= 90:
-                                analytics['upcoming_sip_expiry'].append({
-                                    'investor_id': investor['investor_id'],
-                                    'investor_name': investor['name'],
-                                    'scheme_name': portfolio.get('scheme_name'),
-                                    'next_due_date': next_due_str,
-                                    'days_until_due': days_until_due,
-                                    'sip_amount': portfolio.get('invested_amount', 0)
-                                })
-                        except:
-                            pass
-                
-                # Count transactions for high-potential logic and SIP inflow
-                if portfolio.get('transactions'):
-                    for txn in portfolio['transactions']:
-                        if txn.get('txn_type') == 'Sell':
-                            investor_redemptions += 1
-                        
-                        # Track SIP transactions by month
-                        if txn.get('txn_type') == 'SIP':
-                            try:
-                                txn_date = datetime.fromisoformat(txn['txn_date'].replace('Z', '+00:00'))
-                                month_key = txn_date.strftime('%Y-%m')
-                                sip_transactions_by_month[month_key] = sip_transactions_by_month.get(month_key, 0) + txn.get('txn_amount', 0)
-                            except:
-                                pass
-            
-            # Store investor SIP totals
-            if investor_sip_value > 0:
-                investor_sip_totals[investor['investor_id']] = {
-                    'investor_id': investor['investor_id'],
-                    'name': investor['name'],
-                    'total_sip_value': investor_sip_value,
-                    'redemptions': investor_redemptions,
-                    'onboarding_date': investor.get('onboarding_date'),
-                    'gain_loss_pct': investor.get('gain_loss_pct', 0)
-                }
-        
-        # Calculate average SIP ticket size
-        if sip_portfolios:
-            total_sip_value = sum(p['portfolio'].get('current_value', 0) for p in sip_portfolios)
-            analytics['average_sip_ticket_size'] = round(total_sip_value / len(sip_portfolios), 2)
-        
-        # Top 10 SIP investors
-        top_sip = sorted(investor_sip_totals.values(), key=lambda x: x['total_sip_value'], reverse=True)[:10]
-        analytics['top_sip_investors'] = [
-            {
-                'investor_id': inv['investor_id'],
-                'name': inv['name'],
-                'total_sip_value': round(inv['total_sip_value'], 2)
-            }
-            for inv in top_sip
-        ]
-        
-        # Monthly SIP inflow for last 12 months
-        monthly_inflow = []
-        for i in range(11, -1, -1):
-            month_date = now - timedelta(days=i * 30)
-            month_key = month_date.strftime('%Y-%m')
-            inflow = sip_transactions_by_month.get(month_key, 0)
-            monthly_inflow.append({
-                'month': month_date.strftime('%b %Y'),
-                'inflow': round(inflow, 2)
-            })
-        analytics['monthly_sip_inflow'] = monthly_inflow
-        
-        # High-potential investors (long-term, minimal redemptions, positive returns)
-        six_months_ago = now - timedelta(days=180)
-        for inv_data in investor_sip_totals.values():
-            try:
-                onboarding = datetime.fromisoformat(inv_data['onboarding_date'].replace('Z', '+00:00'))
-                if (onboarding < six_months_ago and 
-                    inv_data['redemptions'] <= 2 and 
-                    inv_data['gain_loss_pct'] > 0):
-                    analytics['high_potential_investors'].append({
-                        'investor_id': inv_data['investor_id'],
-                        'name': inv_data['name'],
-                        'total_sip_value': round(inv_data['total_sip_value'], 2),
-                        'gain_loss_pct': inv_data['gain_loss_pct'],
-                        'redemptions': inv_data['redemptions']
-                    })
-            except:
-                pass
-        
-        # Sort high-potential by gain_loss_pct
-        analytics['high_potential_investors'] = sorted(
-            analytics['high_potential_investors'], 
-            key=lambda x: x['gain_loss_pct'], 
-            reverse=True
-        )[:10]
-        
-        # Sort upcoming expiry by days
-        analytics['upcoming_sip_expiry'] = sorted(
-            analytics['upcoming_sip_expiry'],
-            key=lambda x: x['days_until_due']
-        )[:10]
-        
-        return {'success': True, 'data': analytics}
+        if not facets or not facets[0]['totals']:
+            return {'success': True, 'data': {'needsSeeding': True}}
         
+        summary = format_summary(facets[0])
+        summary['needsSeeding'] = False
+        return {'success': True, 'data': summary}
+    except Exception as e:
+        logging.error(f"Error calculating dashboard summary: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error calculating summary: {str(e)}"
+        )
+
+async def compute_dashboard_analytics() -> dict:
+    """Run the analytics pipelines; only aggregates cross the wire"""
+    now = datetime.now(timezone.utc)
+    
+    sip_facets = await db.investors.aggregate(sip_analytics_pipeline(now)).to_list(1)
+    if not sip_facets or not sip_facets[0]['profit_loss']:
+        return {'needsSeeding': True}
+    
+    high_potential = await db.investors.aggregate(high_potential_pipeline(now)).to_list(10)
+    inflow_rows = await db.transactions.aggregate(sip_inflow_pipeline(now)).to_list(None)
+    
+    return format_analytics(now, sip_facets[0], high_potential, inflow_rows)
+
+dashboard_snapshot = Snapshot(
+    db.dashboard_snapshots,
+    'dashboard_analytics',
+    compute_dashboard_analytics,
+    ttl_seconds=int(os.environ.get('DASHBOARD_SNAPSHOT_TTL_SECONDS', 300))
+)
+
+@api_router.get("/dashboard/analytics", dependencies=[Depends(require_user)])
+async def get_dashboard_analytics(
+    refresh: Optional[bool] = Query(False, description="Recompute instead of serving the snapshot")
+):
+    """Get comprehensive dashboard analytics including SIP insights and investor segmentation"""
+    try:
+        snapshot = await dashboard_snapshot.get(force_refresh=refresh)
+        return {
+            'success': True,
+            'data': snapshot['data'],
+            'computed_at': snapshot['computed_at'],
+            'stale': snapshot['stale']
+        }
     except Exception as e:
         logging.error(f"Error calculating dashboard analytics: {str(e)}")
         raise HTTPException(
@@ -594,44 +1130,117 @@ async def get_dashboard_analytics():
 
 # ==================== Seed Routes ====================
 
-@api_router.post("/seed/run", response_model=RunSeedResponse)
-async def run_seed():
-    """Run seeding script to generate 300 investors"""
+# Seed generator processes; 0 generates on threads inside this worker
+SEED_WORKERS = int(os.environ['SEED_WORKERS']) if os.environ.get('SEED_WORKERS') else None
+# A running seed job that has not reported progress for this long is presumed dead
+SEED_STALE_AFTER = timedelta(minutes=10)
+SEED_LOCK_KEY = 'seed'
+
+# One seed run at a time across workers; the run renews the lock with every progress update
+seed_lock = MongoLock(db.seed_locks, ttl_seconds=int(SEED_STALE_AFTER.total_seconds()))
+seed_tasks = set()
+
+async def run_seed_job(job_id: str, params: Dict, lock_token: str):
+    """Background seeding that records progress on its `jobs` document"""
+    async def progress(investors: int, transactions: int):
+        await seed_lock.renew(SEED_LOCK_KEY, lock_token)
+        await db.jobs.update_one(
+            {'_id': job_id},
+            {'$set': {'processed': investors, 'transactions': transactions, 'updated_at': datetime.now(timezone.utc)}}
+        )
+    
     try:
-        result = subprocess.run(
-            ['python3', str(ROOT_DIR / 'seed_data.py')],
-            capture_output=True,
-            text=True,
-            timeout=60
+        result = await run_seed(
+            db, (mongo_url, os.environ['DB_NAME']), params['count'],
+            seed=params['seed'], chunk_size=params['chunk_size'], workers=SEED_WORKERS,
+            max_txns=params['max_txns'], progress=progress
         )
-        
-        if result.returncode == 0:
-            count = await db.investors.count_documents({})
-            return RunSeedResponse(
-                success=True,
-                message='Seeding completed successfully',
-                count=count
-            )
-        else:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Seeding failed: {result.stderr}"
-            )
+        await dashboard_snapshot.invalidate()
+        now = datetime.now(timezone.utc)
+        await db.jobs.update_one(
+            {'_id': job_id},
+            {'$set': {'status': 'completed', 'result': result, 'finished_at': now, 'updated_at': now}}
+        )
+    except asyncio.CancelledError:
+        now = datetime.now(timezone.utc)
+        await db.jobs.update_one(
+            {'_id': job_id},
+            {'$set': {'status': 'failed', 'error': 'Interrupted by shutdown', 'finished_at': now, 'updated_at': now}}
+        )
+        raise
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error running seed script: {str(e)}"
+        logging.error(f"Seeding failed: {str(e)}")
+        now = datetime.now(timezone.utc)
+        await db.jobs.update_one(
+            {'_id': job_id},
+            {'$set': {'status': 'failed', 'error': str(e), 'finished_at': now, 'updated_at': now}}
+        )
+    finally:
+        await seed_lock.release(SEED_LOCK_KEY, lock_token)
+
+@api_router.post("/seed/run", response_model=RunSeedResponse, status_code=202, dependencies=[Depends(require_user)])
+async def run_seed_data(seed_request: Optional[SeedRequest] = None):
+    """Start seeding in the background; poll /seed/jobs/{job_id} for progress"""
+    params = (seed_request or SeedRequest()).model_dump()
+    
+    # Taking the lock is atomic, so two concurrent requests cannot both drop the collections
+    lock_token = await seed_lock.acquire(SEED_LOCK_KEY)
+    if lock_token is None:
+        running = await db.jobs.find_one({'type': 'seed', 'status': 'running'}, sort=[('created_at', -1)])
+        detail = f"Seeding already in progress (job {running['_id']})" if running else "Seeding already in progress"
+        raise HTTPException(status_code=409, detail=detail)
+    
+    try:
+        now = datetime.now(timezone.utc)
+        job = {
+            '_id': str(uuid.uuid4()),
+            'type': 'seed',
+            'status': 'running',
+            'params': params,
+            'total': params['count'],
+            'processed': 0,
+            'transactions': 0,
+            'created_at': now,
+            'resumed_at': now,
+            'updated_at': now
+        }
+        await db.jobs.insert_one(job)
+        
+        task = asyncio.create_task(run_seed_job(job['_id'], params, lock_token))
+        seed_tasks.add(task)
+        task.add_done_callback(seed_tasks.discard)
+        
+        return RunSeedResponse(
+            success=True,
+            message='Seeding started',
+            count=params['count'],
+            data=JobRunner.view(job)
         )
+    except Exception as e:
+        await seed_lock.release(SEED_LOCK_KEY, lock_token)
+        logging.error(f"Error starting seed job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error starting seed job: {str(e)}")
+
+@api_router.get("/seed/jobs/{job_id}", dependencies=[Depends(require_user)])
+async def get_seed_job(job_id: str):
+    """Get progress, throughput and ETA of a seed run"""
+    job = await db.jobs.find_one({'_id': job_id, 'type': 'seed'})
+    if not job:
+        raise HTTPException(status_code=404, detail="Seed job not found")
+    return {'success': True, 'data': JobRunner.view(job)}
 
-@api_router.get("/seed/status")
+@api_router.get("/seed/status", dependencies=[Depends(require_user)])
 async def get_seed_status():
-    """Check if database is seeded"""
-    count = await db.investors.count_documents({})
+    """Check if database is seeded, with the latest seed run"""
+    # Collection metadata count: no scan, even with millions of investors
+    count = await db.investors.estimated_document_count()
+    last_run = await db.jobs.find_one({'type': 'seed'}, sort=[('created_at', -1)])
     return {
         'success': True,
         'data': {
             'seeded': count > 0,
-            'investor_count': count
+            'investor_count': count,
+            'last_run': JobRunner.view(last_run) if last_run else None
         }
     }
 
@@ -663,6 +1272,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def bootstrap_indexes():
+    if os.environ.get('AUTO_CREATE_INDEXES', 'true').lower() != 'true':
+        return
+    await ensure_indexes(db)
+    await backfill_search_tokens(db)
+
+@app.on_event("startup")
+async def bootstrap_investor_sequence():
+    # Runs even when indexes are managed out of band, or new IDs would restart at INV0001
+    await sync_investor_sequence(db)
+
+@app.on_event("startup")
+async def start_analysis_pool():
+    await analysis_pool.start()
+    # Pick up jobs interrupted by a restart or a dead worker
+    resumed = await analysis_jobs.resume_interrupted()
+    if resumed:
+        logger.info(f"Resumed {resumed} analysis jobs")
+
+@app.on_event("shutdown")
+async def shutdown_pending_summaries():
+    # Their provisional summaries stay stored and are recomputed on the next run
+    for task in pending_summaries:
+        task.cancel()
+    await asyncio.gather(*pending_summaries, return_exceptions=True)
+
+@app.on_event("shutdown")
+async def shutdown_analysis_jobs():
+    await analysis_jobs.shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_analysis_pool():
+    analysis_pool.shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_seed_tasks():
+    for task in seed_tasks:
+        task.cancel()
+    await asyncio.gather(*seed_tasks, return_exceptions=True)
+
+@app.on_event("shutdown")
+async def shutdown_auth():
+    shutdown_hash_pool()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file
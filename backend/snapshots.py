@@ -0,0 +1,120 @@
+"""Materialized snapshots of expensive read models with write-driven invalidation
+
+A snapshot document in `dashboard_snapshots` holds the last computed payload,
+the time it was computed and two counters: `version` is bumped by every write
+that affects the payload, `computed_version` records which version the payload
+reflects. A snapshot is stale when those differ or its TTL has passed; stale
+snapshots are served immediately while one refresh runs in the background.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+class Snapshot:
+    """One materialized payload shared by every viewer and worker"""
+
+    def __init__(self, collection, key: str, compute: Callable[[], Awaitable[Dict]],
+                 ttl_seconds: int = 300, lease_seconds: int = 60):
+        self.collection = collection
+        self.key = key
+        self.compute = compute
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lease = timedelta(seconds=lease_seconds)
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def get(self, force_refresh: bool = False) -> Dict:
+        """Return {'data', 'computed_at', 'stale'}, recomputing only when unavoidable"""
+        doc = await self.collection.find_one({'_id': self.key})
+
+        if force_refresh or not doc or 'data' not in doc:
+            doc = await self._refresh(wait=True)
+            return self._view(doc, stale=False)
+
+        stale = self._is_stale(doc)
+        if stale:
+            await self._refresh(wait=False)
+        return self._view(doc, stale=stale)
+
+    async def invalidate(self):
+        """Mark the snapshot out of date; the next read triggers a refresh"""
+        await self.collection.update_one({'_id': self.key}, {'$inc': {'version': 1}}, upsert=True)
+
+    def _is_stale(self, doc: Dict) -> bool:
+        if doc.get('version', 0) != doc.get('computed_version'):
+            return True
+        computed_at = doc['computed_at']
+        if computed_at.tzinfo is None:
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - computed_at > self.ttl
+
+    @staticmethod
+    def _view(doc: Dict, stale: bool) -> Dict:
+        computed_at = doc['computed_at']
+        if computed_at.tzinfo is None:
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        return {'data': doc['data'], 'computed_at': computed_at.isoformat(), 'stale': stale}
+
+    async def _refresh(self, wait: bool) -> Optional[Dict]:
+        """Single-flight recompute: concurrent callers in this process share one task"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._recompute(blocking=wait))
+        if not wait:
+            return None
+        # Shield so a cancelled viewer request does not cancel the shared refresh
+        result = await asyncio.shield(self._inflight)
+        if result is None:
+            # The shared task was a background refresh that yielded to another worker
+            self._inflight = asyncio.create_task(self._recompute(blocking=True))
+            result = await asyncio.shield(self._inflight)
+        return result
+
+    async def _acquire_lease(self) -> bool:
+        """Cross-worker lease so only one process recomputes a stale snapshot"""
+        now = datetime.now(timezone.utc)
+        try:
+            result = await self.collection.update_one(
+                {'_id': self.key, '$or': [
+                    {'refreshing_until': {'$exists': False}},
+                    {'refreshing_until': {'$lt': now}}
+                ]},
+                {'$set': {'refreshing_until': now + self.lease}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The document exists and another worker holds a live lease
+            return False
+        return result.modified_count == 1 or result.upserted_id is not None
+
+    async def _recompute(self, blocking: bool) -> Optional[Dict]:
+        leased = refreshed = False
+        try:
+            leased = await self._acquire_lease()
+            if not leased and not blocking:
+                return None
+
+            before = await self.collection.find_one({'_id': self.key}, {'version': 1}) or {}
+            version = before.get('version', 0)
+            data = await self.compute()
+            computed_at = datetime.now(timezone.utc)
+
+            await self.collection.update_one(
+                {'_id': self.key},
+                {'$set': {'data': data, 'computed_at': computed_at, 'computed_version': version},
+                 '$unset': {'refreshing_until': ''}},
+                upsert=True
+            )
+            refreshed = True
+            return {'data': data, 'computed_at': computed_at}
+        except Exception as e:
+            logger.error(f"Snapshot {self.key} refresh failed: {str(e)}")
+            if blocking:
+                raise
+            return None
+        finally:
+            if leased and not refreshed:
+                # Give up the lease at once so the next stale read retries instead of waiting it out
+                await self.collection.update_one({'_id': self.key}, {'$unset': {'refreshing_until': ''}})
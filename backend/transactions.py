@@ -0,0 +1,42 @@
+"""Transactions stored in their own collection, split off investor folios"""
+import uuid
+from typing import Dict, List
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY = 11000
+
+def new_txn_id(folio_id: str) -> str:
+    """ID for a transaction that arrived without one"""
+    return f"{folio_id}-T{uuid.uuid4().hex[:8].upper()}"
+
+def split_transactions(investor: Dict) -> List[Dict]:
+    """Flatten an investor's embedded transactions into standalone documents"""
+    docs = []
+    for folio in investor.get('portfolios') or []:
+        for txn in folio.get('transactions') or []:
+            folio_id = txn.get('folio_id') or folio.get('folio_id')
+            docs.append({
+                **txn,
+                'txn_id': txn.get('txn_id') or new_txn_id(folio_id),
+                'investor_id': investor['investor_id'],
+                'folio_id': folio_id
+            })
+    return docs
+
+def detach_transactions(investor: Dict) -> List[Dict]:
+    """Strip embedded transactions off an investor's folios and return them"""
+    docs = split_transactions(investor)
+    for folio in investor.get('portfolios') or []:
+        folio.pop('transactions', None)
+    return docs
+
+async def insert_transactions(db, docs: List[Dict]):
+    """Unordered insert that tolerates transactions copied by an earlier run"""
+    if not docs:
+        return
+    try:
+        await db.transactions.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(err.get('code') != DUPLICATE_KEY for err in errors):
+            raise
@@ -15,6 +15,18 @@ export const API = `${BACKEND_URL}/api`;
 // Set axios default
 axios.defaults.baseURL = API;
 
+const setAuthToken = (token) => {
+  if (token) {
+    axios.defaults.headers.common['Authorization'] = `Bearer ${token}`;
+  } else {
+    delete axios.defaults.headers.common['Authorization'];
+  }
+};
+
+// Restore the token before any page mounts and fires its first request
+const storedUser = localStorage.getItem('mf360_user');
+setAuthToken(storedUser ? JSON.parse(storedUser).token : null);
+
 function App() {
   const [isAuthenticated, setIsAuthenticated] = useState(false);
   const [user, setUser] = useState(null);
@@ -28,15 +40,29 @@ function App() {
       setIsAuthenticated(true);
     }
     setLoading(false);
+
+    // An expired or invalid token ends the session
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      (error) => {
+        if (error.response?.status === 401 && !error.config?.url?.startsWith('/auth/')) {
+          handleLogout();
+        }
+        return Promise.reject(error);
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
   }, []);
 
   const handleLogin = (userData) => {
+    setAuthToken(userData.token);
     setUser(userData);
     setIsAuthenticated(true);
     localStorage.setItem('mf360_user', JSON.stringify(userData));
   };
 
   const handleLogout = () => {
+    setAuthToken(null);
     setUser(null);
     setIsAuthenticated(false);
     localStorage.removeItem('mf360_user');
@@ -1,32 +1,55 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect } from 'react';
+import axios from 'axios';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { Button } from '@/components/ui/button';
 import { Search, ArrowUpDown, Download, Calendar } from 'lucide-react';
 
-const TransactionsTable = ({ portfolios }) => {
+const TransactionsTable = ({ investorId, portfolios }) => {
+  const [transactions, setTransactions] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
   const [typeFilter, setTypeFilter] = useState('all');
   const [sortConfig, setSortConfig] = useState({ key: 'txn_date', direction: 'desc' });
   const [currentPage, setCurrentPage] = useState(1);
   const itemsPerPage = 20;
 
-  // Flatten all transactions from all portfolios
+  // Transactions are stored separately from the investor; page through them by cursor
+  useEffect(() => {
+    let cancelled = false;
+    const loadTransactions = async () => {
+      const txns = [];
+      let after = null;
+      try {
+        do {
+          const response = await axios.get(`/investors/${investorId}/transactions`, {
+            params: { limit: 500, after }
+          });
+          txns.push(...response.data.data);
+          after = response.data.next_cursor;
+        } while (after && !cancelled);
+        if (!cancelled) setTransactions(txns);
+      } catch (error) {
+        console.error('Error loading transactions:', error);
+      }
+    };
+    loadTransactions();
+    return () => { cancelled = true; };
+  }, [investorId]);
+
+  // Attach scheme details from the matching folio to each transaction
   const allTransactions = useMemo(() => {
-    const txns = [];
+    const folios = {};
     portfolios.forEach(portfolio => {
-      portfolio.transactions?.forEach(txn => {
-        txns.push({
-          ...txn,
-          scheme_name: portfolio.scheme_name,
-          amc_name: portfolio.amc_name,
-          category: portfolio.category
-        });
-      });
+      folios[portfolio.folio_id] = portfolio;
     });
-    return txns;
-  }, [portfolios]);
+    return transactions.map(txn => ({
+      ...txn,
+      scheme_name: folios[txn.folio_id]?.scheme_name,
+      amc_name: folios[txn.folio_id]?.amc_name,
+      category: folios[txn.folio_id]?.category
+    }));
+  }, [transactions, portfolios]);
 
   // Filter and sort transactions
   const filteredAndSortedTransactions = useMemo(() => {
@@ -116,25 +116,50 @@ const AIInsights = ({ user, onLogout }) => {
     });
   };
 
-  const runAnalysis = async () => {
+  const runAnalysis = () => {
     if (!selectedInvestor) {
       toast.error('Please select an investor first');
       return;
     }
 
     setLoading(true);
-    try {
-      toast.info('Running comprehensive AI analysis...');
-      const response = await axios.post(`/ai/run/${selectedInvestor}`);
-      if (response.data.success) {
-        setAnalysis(response.data.data);
-        toast.success('AI analysis completed!');
-      }
-    } catch (error) {
-      toast.error('Failed to run AI analysis');
-    } finally {
+    toast.info('Running comprehensive AI analysis...');
+
+    // Algorithm results arrive first; the summary streams in after them.
+    // EventSource cannot send headers, so the token goes in the query string.
+    const token = encodeURIComponent(user?.token || '');
+    const source = new EventSource(`${axios.defaults.baseURL}/ai/stream/${selectedInvestor}?access_token=${token}`);
+    const readEvent = (event) => JSON.parse(event.data);
+
+    source.addEventListener('analysis', (event) => {
+      const { analysis } = readEvent(event);
+      setAnalysis({ analysis, summary: { summary: '' } });
       setLoading(false);
-    }
+    });
+    source.addEventListener('token', (event) => {
+      const { text } = readEvent(event);
+      setAnalysis((current) => current && {
+        ...current,
+        summary: { summary: (current.summary?.summary || '') + text }
+      });
+    });
+    source.addEventListener('done', (event) => {
+      const { summary } = readEvent(event);
+      setAnalysis((current) => current && { ...current, summary });
+      source.close();
+      toast.success('AI analysis completed!');
+    });
+    source.addEventListener('error', (event) => {
+      source.close();
+      setLoading(false);
+      const { summary, detail } = event.data ? readEvent(event) : {};
+      if (summary) {
+        setAnalysis((current) => current && { ...current, summary });
+        toast.error('AI summary unavailable');
+      } else {
+        toast.error(detail || 'Failed to run AI analysis');
+      }
+    });
   };
 
   const formatCurrency = (value) => {
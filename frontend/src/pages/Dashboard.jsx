@@ -30,26 +30,9 @@ const Dashboard = ({ user, onLogout }) => {
         return;
       }
 
-      // Load investors with portfolios for comprehensive stats
-      console.log('Fetching investors with portfolios...');
-      const response = await axios.get('/investors?include_portfolios=true');
-      console.log('Response received:', response.data);
-      
-      const investors = response.data.data;
-      console.log('Investors count:', investors?.length);
-      
-      if (!investors || investors.length === 0) {
-        console.error('No investors data received');
-        setStats({ needsSeeding: true });
-        setLoading(false);
-        return;
-      }
-
-      // Calculate comprehensive analytics
-      console.log('Calculating analytics...');
-      const analytics = calculateComprehensiveAnalytics(investors);
-      console.log('Analytics calculated:', analytics);
-      setStats(analytics);
+      // Totals and breakdowns are computed server-side so the payload stays small
+      const response = await axios.get('/dashboard/summary');
+      setStats(response.data.data);
     } catch (error) {
       console.error('Error loading dashboard:', error);
       console.error('Error details:', error.message, error.response);
@@ -61,189 +44,25 @@ const Dashboard = ({ user, onLogout }) => {
     }
   };
 
-  const calculateComprehensiveAnalytics = (investors) => {
-    try {
-      console.log('Starting analytics calculation for', investors?.length, 'investors');
-      
-      const totalInvestors = investors.length;
-      const totalAUM = investors.reduce((sum, inv) => sum + (inv.total_aum || 0), 0);
-      const totalInvested = investors.reduce((sum, inv) => sum + (inv.total_invested || 0), 0);
-      const avgGain = totalInvestors > 0 ? investors.reduce((sum, inv) => sum + (inv.gain_loss_pct || 0), 0) / totalInvestors : 0;
-      
-      console.log('Basic stats:', { totalInvestors, totalAUM, totalInvested, avgGain });
-
-    // Investor Segmentation
-    const now = new Date();
-    const thirtyDaysAgo = new Date(now.getTime() - 30 * 24 * 60 * 60 * 1000);
-
-    const newInvestors = investors.filter(inv => {
-      try {
-        const onboardingDate = new Date(inv.onboarding_date);
-        return onboardingDate >= thirtyDaysAgo;
-      } catch {
-        return false;
-      }
-    });
-
-    const activeInvestors = investors.filter(inv => inv.gain_loss_pct >= 0);
-    const inactiveInvestors = investors.filter(inv => inv.gain_loss_pct < -5);
-
-    // AUM by Asset Class (from portfolios)
-    const assetClassData = {};
-    let totalPortfolios = 0;
-    investors.forEach(inv => {
-      if (inv.portfolios && Array.isArray(inv.portfolios)) {
-        inv.portfolios.forEach(portfolio => {
-          totalPortfolios++;
-          const category = portfolio.category || 'Other';
-          const value = parseFloat(portfolio.current_value) || 0;
-          assetClassData[category] = (assetClassData[category] || 0) + value;
-        });
-      }
-    });
-
-    const aumByAssetClass = Object.entries(assetClassData)
-      .map(([name, value]) => ({ name, value: parseFloat(value.toFixed(2)) }))
-      .sort((a, b) => b.value - a.value)
-      .filter(item => item.value > 0);
-    
-    console.log('Asset Class Data:', assetClassData);
-    console.log('AUM By Asset Class Array:', aumByAssetClass);
-
-    // AMC Weightage
-    const amcData = {};
-    investors.forEach(inv => {
-      if (inv.portfolios && Array.isArray(inv.portfolios)) {
-        inv.portfolios.forEach(portfolio => {
-          const amc = portfolio.amc_name || 'Other';
-          const value = parseFloat(portfolio.current_value) || 0;
-          amcData[amc] = (amcData[amc] || 0) + value;
-        });
-      }
-    });
-
-    const amcWeightage = Object.entries(amcData)
-      .map(([name, value]) => ({ 
-        name, 
-        value: parseFloat(value.toFixed(2)), 
-        percentage: parseFloat(((value / totalAUM) * 100).toFixed(2))
-      }))
-      .sort((a, b) => b.value - a.value)
-      .slice(0, 10)
-      .filter(item => item.value > 0);
-    
-    console.log('AMC Data:', amcData);
-    console.log('AMC Weightage Array:', amcWeightage);
-
-    // SIP Statistics
-    let totalSIPs = 0;
-    let sipValue = 0;
-    investors.forEach(inv => {
-      if (inv.portfolios && Array.isArray(inv.portfolios)) {
-        inv.portfolios.forEach(portfolio => {
-          if (portfolio.sip_flag) {
-            totalSIPs++;
-            sipValue += parseFloat(portfolio.current_value) || 0;
-          }
-        });
-      }
-    });
-    
-    console.log('Total SIPs:', totalSIPs, 'SIP Value:', sipValue);
-    console.log('New Investors:', newInvestors.length);
-
-    // Performance Distribution
-    const performanceBuckets = {
-      'Negative': 0,
-      '0-5%': 0,
-      '5-10%': 0,
-      '10-15%': 0,
-      '15%+': 0
-    };
-
-    investors.forEach(inv => {
-      if (inv.gain_loss_pct < 0) performanceBuckets['Negative']++;
-      else if (inv.gain_loss_pct < 5) performanceBuckets['0-5%']++;
-      else if (inv.gain_loss_pct < 10) performanceBuckets['5-10%']++;
-      else if (inv.gain_loss_pct < 15) performanceBuckets['10-15%']++;
-      else performanceBuckets['15%+']++;
-    });
-
-    const performanceDistribution = Object.entries(performanceBuckets).map(([name, value]) => ({ name, value }));
-
-    // AUM Distribution by Size
-    const aumBuckets = {
-      '<5L': 0,
-      '5-10L': 0,
-      '10-15L': 0,
-      '15-20L': 0,
-      '20L+': 0
-    };
-
-    investors.forEach(inv => {
-      const aum = inv.total_aum / 100000;
-      if (aum < 5) aumBuckets['<5L']++;
-      else if (aum < 10) aumBuckets['5-10L']++;
-      else if (aum < 15) aumBuckets['10-15L']++;
-      else if (aum < 20) aumBuckets['15-20L']++;
-      else aumBuckets['20L+']++;
-    });
-
-    const aumDistribution = Object.entries(aumBuckets).map(([name, value]) => ({ name, value }));
-
-    // Top Investors by AUM
-    const topInvestors = [...investors]
-      .sort((a, b) => b.total_aum - a.total_aum)
-      .slice(0, 5)
-      .map(inv => ({
-        name: inv.name,
-        aum: inv.total_aum,
-        gain: inv.gain_loss_pct
-      }));
-
-    // Risk Profile Distribution
-    const riskDist = investors.reduce((acc, inv) => {
-      acc[inv.risk_profile] = (acc[inv.risk_profile] || 0) + 1;
-      return acc;
-    }, {});
-
-    const riskDistribution = Object.entries(riskDist).map(([name, value]) => ({ name, value }));
-
-      const result = {
-        totalInvestors,
-        totalAUM,
-        totalInvested,
-        avgGain,
-        newInvestors: newInvestors.length,
-        activeInvestors: activeInvestors.length,
-        inactiveInvestors: inactiveInvestors.length,
-        aumByAssetClass,
-        amcWeightage,
-        totalSIPs,
-        sipValue,
-        performanceDistribution,
-        aumDistribution,
-        topInvestors,
-        riskDistribution,
-        needsSeeding: false
-      };
-      
-      console.log('Final analytics result:', result);
-      return result;
-    } catch (error) {
-      console.error('Error in calculateComprehensiveAnalytics:', error);
-      throw error;
-    }
-  };
-
   const handleSeedData = async () => {
     setSeeding(true);
     try {
       toast.info('Seeding database with 300 investors... This may take a minute.');
       const response = await axios.post('/seed/run');
-      if (response.data.success) {
-        toast.success(`Successfully seeded ${response.data.count} investors!`);
+      const jobId = response.data.data.job_id;
+
+      // Seeding runs in the background; poll the job until it finishes
+      let job = response.data.data;
+      while (job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = (await axios.get(`/seed/jobs/${jobId}`)).data.data;
+      }
+
+      if (job.status === 'completed') {
+        toast.success(`Successfully seeded ${job.processed} investors!`);
         loadDashboardData();
+      } else {
+        toast.error(`Failed to seed database: ${job.error || job.status}`);
       }
     } catch (error) {
       toast.error('Failed to seed database');
@@ -277,7 +277,7 @@ const InvestorDetail = ({ user, onLogout }) => {
             </TabsContent>
 
             <TabsContent value="transactions">
-              <TransactionsTable portfolios={investor.portfolios || []} />
+              <TransactionsTable investorId={investor.investor_id} portfolios={investor.portfolios || []} />
             </TabsContent>
           </Tabs>
         </main>
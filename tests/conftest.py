@@ -0,0 +1,94 @@
+"""Shared fixtures: the backend app wired to an in-memory MongoDB"""
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'mf360_test')
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+os.environ.setdefault('ANALYSIS_POOL_SIZE', '0')
+os.environ.setdefault('LLM_PROVIDER', 'stub')
+
+from ai.cache import LRUCache
+from ai.llm_client import LLMClient, StubProvider
+
+def run(coro):
+    """Run a coroutine to completion on a fresh event loop"""
+    return asyncio.run(coro)
+
+@pytest.fixture
+def db():
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    return mongomock_motor.AsyncMongoMockClient(tz_aware=True)['mf360_test']
+
+@pytest.fixture
+def server(db, monkeypatch):
+    """The server module with every collection it holds pointed at db"""
+    import server
+    monkeypatch.setattr(server, 'db', db)
+    monkeypatch.setattr(server.dashboard_snapshot, 'collection', db.dashboard_snapshots)
+    monkeypatch.setattr(server.analysis_jobs, 'db', db)
+    monkeypatch.setattr(server.summary_cache.shared, 'collection', db.llm_cache)
+    monkeypatch.setattr(server.summary_flight.lock, 'collection', db.llm_locks)
+    monkeypatch.setattr(server.seed_lock, 'collection', db.seed_locks)
+    monkeypatch.setattr(server.summary_cache, 'local', LRUCache())
+    return server
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Stub LLM client counting provider calls, in place of the worker's shared client"""
+    import ai.chatgpt
+    provider = StubProvider(latency_ms=50)
+    provider.calls = 0
+    complete = provider.complete
+
+    async def counted(*args, **kwargs):
+        provider.calls += 1
+        return await complete(*args, **kwargs)
+    provider.complete = counted
+
+    client = LLMClient(provider, model='stub-model', max_retries=0)
+    monkeypatch.setattr(ai.chatgpt, 'get_llm_client', lambda: client)
+    return provider
+
+@pytest.fixture
+def token(server):
+    return server.issue_token({'id': 'user-1', 'email': 'mfd@example.com', 'name': 'Test MFD'})
+
+@pytest.fixture
+def api(server, token):
+    """Send one request to the app: api(method, url, auth=True, **kwargs) -> response"""
+    def send(method: str, url: str, auth: bool = True, **kwargs):
+        if auth:
+            kwargs['headers'] = {'Authorization': f'Bearer {token}', **kwargs.get('headers', {})}
+
+        async def request():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return await client.request(method, url, **kwargs)
+        return run(request())
+    return send
+
+def make_investor(i: int, **fields) -> dict:
+    """Minimal investor document with sequential ID i"""
+    investor = {
+        'investor_id': f'INV{i:04d}',
+        'name': f'Investor {i}',
+        'pan': f'PAN{i:05d}X',
+        'email': f'investor{i}@example.com',
+        'mobile': '9800000000',
+        'total_aum': float(1000 * (i % 7)),
+        'total_invested': 1000.0,
+        'gain_loss_pct': 0.0,
+        'risk_profile': 'Moderate',
+        'portfolios': []
+    }
+    investor.update(fields)
+    return investor
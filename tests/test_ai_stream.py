@@ -0,0 +1,81 @@
+"""Server-Sent Events from GET /api/ai/stream/{investor_id}"""
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from tests.conftest import make_investor, run
+
+@pytest.fixture
+def investor(db):
+    folios = [{
+        'folio_id': f'F{n}',
+        'scheme_name': f'Scheme {n}',
+        'amc_name': 'HDFC Mutual Fund',
+        'category': 'Equity',
+        'current_value': 25000.0,
+        'gain_loss_pct': -4.0 if n else 12.0
+    } for n in range(3)]
+    doc = make_investor(1, total_aum=75000.0, portfolios=folios)
+    run(db.investors.insert_one(dict(doc)))
+    return doc
+
+def parse_events(body: str) -> list:
+    """(event, data) pairs of an SSE body"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+def stream(server, token: str, count: int = 1) -> list:
+    """Events of count concurrent streams of INV0001"""
+    async def one(client):
+        response = await client.get(f'/api/ai/stream/INV0001?force=true&access_token={token}')
+        return parse_events(response.text)
+
+    async def all_streams():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await asyncio.gather(*[one(client) for _ in range(count)])
+    return run(all_streams())
+
+def test_stream_emits_analysis_tokens_and_done(server, token, llm, investor, db):
+    events = stream(server, token)[0]
+
+    names = [name for name, _ in events]
+    assert names[0] == 'analysis' and names[-1] == 'done'
+    assert 'token' in names
+    text = ''.join(data['text'] for name, data in events if name == 'token')
+    assert events[-1][1]['summary'] == {'summary': text}
+    assert run(db.ai_analyses.count_documents({'investor_id': 'INV0001'})) == 1
+
+def test_concurrent_streams_share_one_llm_call(server, token, llm, investor):
+    results = stream(server, token, count=3)
+
+    assert llm.calls == 1
+    summaries = [events[-1][1]['summary'] for events in results]
+    assert all(events[-1][0] == 'done' for events in results)
+    assert summaries[0] == summaries[1] == summaries[2]
+
+def test_analysis_failure_becomes_an_error_event(server, token, llm, investor, monkeypatch):
+    async def broken(investor, algorithms=None):
+        raise RuntimeError('worker crashed')
+    monkeypatch.setattr(server.analysis_pool, 'analyze', broken)
+
+    events = stream(server, token)[0]
+
+    assert events == [('error', {'detail': 'Error running AI analysis: worker crashed'})]
+
+def test_summary_failure_is_reported_and_not_stored(server, token, llm, investor, db, monkeypatch):
+    async def failing(*args, **kwargs):
+        yield 'Partial'
+        raise RuntimeError('provider exploded')
+    monkeypatch.setattr(llm, 'stream', failing)
+
+    events = stream(server, token)[0]
+
+    assert [name for name, _ in events] == ['analysis', 'token', 'error']
+    assert events[-1][1]['summary']['error'] is True
+    assert run(db.ai_analyses.count_documents({})) == 0
@@ -0,0 +1,104 @@
+"""Batch analysis entry points and the analysis process pool"""
+import os
+import signal
+import random
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from ai.analysis import run_all_analysis, run_all_analysis_batch
+from ai.pool import AnalysisPool
+from tests.conftest import make_investor, run
+
+NOW = datetime.now(timezone.utc)
+
+def folio(n: int, **fields) -> dict:
+    doc = {
+        'folio_id': f'F{n}',
+        'scheme_name': f'Scheme {n}',
+        'amc_name': ['HDFC Mutual Fund', 'SBI Mutual Fund'][n % 2],
+        'category': ['Equity', 'Debt', 'ELSS', 'Close Ended', 'Hybrid'][n % 5],
+        'current_value': 10000.0 + n,
+        'gain_loss_pct': [-6.5, 3.0, 18.0][n % 3],
+        'sip_flag': n % 2 == 0,
+        'last_sip_payment_date': NOW - timedelta(days=20 * n)
+    }
+    doc.update(fields)
+    return doc
+
+@pytest.fixture
+def investors():
+    """Investors covering the shapes stored data takes, including malformed values"""
+    mixed = [
+        make_investor(i, total_aum=50000.0, portfolios=[folio(n) for n in range(i % 6 + 1)])
+        for i in range(1, 9)
+    ]
+    mixed += [
+        make_investor(20, portfolios=[]),
+        {k: v for k, v in make_investor(21).items() if k not in ('portfolios', 'total_aum')},
+        make_investor(22, total_aum='n/a', risk_profile='High', portfolios=[
+            folio(1, current_value='n/a', gain_loss_pct=None),
+            folio(2, last_sip_payment_date='garbage', next_due_date=NOW - timedelta(days=40)),
+            folio(4, last_sip_payment_date=None, next_due_date='2020-01-01T00:00:00Z'),
+            folio(6, last_sip_payment_date=(NOW - timedelta(days=45)).isoformat(), category=None)
+        ]),
+        make_investor(23, goal_timeline=(NOW + timedelta(days=700)).isoformat(),
+                      portfolios=[folio(n, amc_name='HDFC Mutual Fund') for n in range(4)]),
+    ]
+    return mixed
+
+def test_batch_matches_per_investor_runs(investors):
+    # aum_forecast draws from random; the same seed gives both paths the same draws
+    random.seed(7)
+    batch = run_all_analysis_batch(investors)
+    random.seed(7)
+    single = [run_all_analysis(investor) for investor in investors]
+
+    assert batch == single
+
+def test_batch_accumulates_timings(investors):
+    timings = {}
+    run_all_analysis_batch(investors[:3], ['performance'], timings)
+
+    assert set(timings) == {'context', 'performance'}
+
+def test_pool_chunks_match_the_batch(investors):
+    pool = AnalysisPool(0, chunk_size=3)
+    analyses = run(pool.analyze_many(investors))
+
+    # Chunks run concurrently on threads, so random draws interleave: leave aum_forecast out
+    strip = lambda analysis: {k: v for k, v in analysis.items() if k != 'aum_forecast'}
+    assert [strip(a) for a in analyses] == [strip(a) for a in run_all_analysis_batch(investors)]
+    assert pool.stats.runs == len(investors)
+
+def test_pool_replaces_workers_after_one_is_killed(investors):
+    async def scenario():
+        pool = AnalysisPool(1)
+        await pool.start()
+        try:
+            for pid in list(pool._executor._processes):
+                os.kill(pid, signal.SIGKILL)
+            first, _ = await pool.analyze(investors[0], ['performance'])
+            # The replacement pool keeps serving later calls
+            second, _ = await pool.analyze(investors[1], ['performance'])
+            return first, second, pool.replaced
+        finally:
+            pool.shutdown()
+
+    first, second, replaced = run(scenario())
+
+    assert first['performance'] == run_all_analysis(investors[0])['performance']
+    assert second['investor_id'] == investors[1]['investor_id']
+    assert replaced == 1
+
+def test_bad_investor_fails_alone(investors):
+    pool = AnalysisPool(0, chunk_size=4)
+    # A non-dict folio makes run_analysis raise, which used to fail its whole chunk
+    mixed = investors[:3] + [make_investor(30, portfolios=['not-a-folio'])] + investors[3:5]
+    analyses = run(pool.analyze_many(mixed))
+
+    assert isinstance(analyses[3], Exception)
+    ok = [a for i, a in enumerate(analyses) if i != 3]
+    assert [a['investor_id'] for a in ok] == [i['investor_id'] for i in mixed if i['investor_id'] != 'INV0030']
+    assert pool.stats.runs == 5
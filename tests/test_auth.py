@@ -0,0 +1,85 @@
+"""Access tokens and the guards on the API routes"""
+import re
+import time
+
+import jwt
+import pytest
+from fastapi.routing import APIRoute
+
+from tests.conftest import run
+
+def guarded_routes(server):
+    """(method, path) of every route behind require_user or require_stream_user"""
+    guards = {server.require_user, server.require_stream_user}
+    for route in server.app.routes:
+        if isinstance(route, APIRoute) and any(d.dependency in guards for d in route.dependencies):
+            path = re.sub(r'\{[^}]+\}', 'x', route.path)
+            for method in route.methods:
+                yield method, path
+
+# Everything else under /api needs a token
+PUBLIC_PATHS = {'/api/auth/signup', '/api/auth/login', '/api/', '/api/health'}
+
+def test_every_api_route_but_login_and_health_is_guarded(server):
+    guarded = {path for _, path in guarded_routes(server)}
+    api_paths = {
+        re.sub(r'\{[^}]+\}', 'x', route.path) for route in server.app.routes
+        if isinstance(route, APIRoute) and route.path.startswith('/api')
+    }
+    assert api_paths - guarded == PUBLIC_PATHS
+    assert {'/api/sips/due', '/api/dashboard/summary', '/api/dashboard/analytics', '/api/seed/run'} <= guarded
+
+def test_guarded_routes_reject_missing_token(server, api):
+    for method, path in guarded_routes(server):
+        response = api(method, path, auth=False)
+        assert response.status_code == 401, (method, path)
+        assert response.headers['www-authenticate'] == 'Bearer'
+
+@pytest.mark.parametrize('header', ['Bearer not-a-jwt', 'Bearer ' + jwt.encode({'sub': 'u', 'exp': 2**31}, 'other')])
+def test_bad_token_is_rejected(api, header):
+    response = api('GET', '/api/investors', auth=False, headers={'Authorization': header})
+    assert response.status_code == 401
+    assert response.json()['detail'] == 'Invalid token'
+
+def test_expired_token_is_rejected(api):
+    expired = jwt.encode({'sub': 'u', 'exp': int(time.time()) - 5}, 'test-secret', algorithm='HS256')
+    response = api('GET', '/api/investors', auth=False, headers={'Authorization': f'Bearer {expired}'})
+    assert response.status_code == 401
+    assert response.json()['detail'] == 'Token expired'
+
+def test_query_token_is_only_accepted_on_streams(api, token, db):
+    assert api('GET', f'/api/investors?access_token={token}', auth=False).status_code == 401
+    # Past the guard, an unknown investor is a 404
+    assert api('GET', f'/api/ai/stream/INV9999?access_token={token}', auth=False).status_code == 404
+
+def test_login_issues_a_working_token(api):
+    signup = api('POST', '/api/auth/signup', auth=False,
+                 json={'email': 'mfd@example.com', 'password': 'pw-123', 'name': 'MFD'})
+    assert signup.status_code == 200
+    assert api('POST', '/api/auth/login', auth=False,
+               json={'email': 'mfd@example.com', 'password': 'wrong'}).status_code == 401
+
+    login = api('POST', '/api/auth/login', auth=False, json={'email': 'mfd@example.com', 'password': 'pw-123'})
+    token = login.json()['data']['token']
+    claims = jwt.decode(token, 'test-secret', algorithms=['HS256'])
+    assert claims['sub'] == signup.json()['data']['id']
+
+    response = api('GET', '/api/investors', auth=False, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+
+def test_missing_secret_is_an_error(server, monkeypatch):
+    monkeypatch.delenv('JWT_SECRET')
+    with pytest.raises(RuntimeError):
+        server.jwt_secret()
+
+def test_hash_pool_size_is_read_on_first_use(monkeypatch):
+    import auth
+    auth.shutdown_hash_pool()
+    # Set after import, as load_dotenv does
+    monkeypatch.setenv('AUTH_HASH_WORKERS', '2')
+
+    hashed = run(auth.hash_password('pw-123'))
+
+    assert run(auth.verify_password('pw-123', hashed))
+    assert auth._hash_pool._max_workers == 2
+    auth.shutdown_hash_pool()
@@ -0,0 +1,38 @@
+"""Tiered LLM response cache"""
+from ai.cache import LRUCache, build_cache
+from tests.conftest import run
+
+def test_configure_reads_settings_at_call_time(db, monkeypatch):
+    cache = build_cache()
+    # As if .env were loaded after the module-level cache was built
+    monkeypatch.setenv('CACHE_TTL_SECONDS', '60')
+    monkeypatch.setenv('CACHE_MAX_ENTRIES', '5')
+
+    cache.configure(db.llm_cache)
+
+    assert cache.local.ttl == cache.shared.ttl == 60
+    assert cache.local.max_entries == 5
+
+def test_server_tiers_share_one_ttl():
+    import server
+    assert server.summary_cache.shared is not None
+    assert server.summary_cache.local.ttl == server.summary_cache.shared.ttl
+
+def test_shared_hits_are_promoted_to_the_local_tier(db):
+    cache = build_cache(db.llm_cache)
+    writer = build_cache(db.llm_cache)
+    run(writer.set('k', {'summary': 'shared'}))
+
+    assert run(cache.get('k')) == {'summary': 'shared'}
+    assert cache.local.get('k') == {'summary': 'shared'}
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats.evictions == 1
@@ -0,0 +1,34 @@
+"""Investor ID allocation from the counters collection"""
+from tests.conftest import make_investor, run
+
+def test_startup_syncs_sequence_without_index_bootstrap(server, db, monkeypatch):
+    # An existing database whose indexes are managed outside the app
+    monkeypatch.setenv('AUTO_CREATE_INDEXES', 'false')
+    synced = []
+
+    async def record(target):
+        synced.append(target)
+    monkeypatch.setattr(server, 'sync_investor_sequence', record)
+
+    for hook in server.app.router.on_startup:
+        if hook.__name__ != 'start_analysis_pool':
+            run(hook())
+
+    assert synced == [db]
+
+def test_new_investor_follows_the_synced_sequence(server, db, api):
+    run(db.investors.insert_many([make_investor(i) for i in (1, 2, 7)]))
+    run(db.counters.insert_one({'_id': 'investor_id', 'seq': 7}))
+
+    response = api('POST', '/api/investors', json={'name': 'New Investor', 'pan': 'PAN99999X'})
+
+    assert response.status_code == 200
+    assert response.json()['data']['investor_id'] == 'INV0008'
+
+def test_sync_keeps_an_existing_counter(server, db):
+    run(db.counters.insert_one({'_id': 'investor_id', 'seq': 40}))
+    run(db.investors.insert_one(make_investor(3)))
+
+    run(server.sync_investor_sequence(db))
+
+    assert run(server.allocate_investor_ids(db, 2)) == ['INV0041', 'INV0042']
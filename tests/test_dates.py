@@ -0,0 +1,80 @@
+"""Date coercion of request input"""
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from dates import parse_date
+from tests.conftest import make_investor, run
+
+def test_parse_date_returns_aware_utc():
+    assert parse_date('2024-03-01T10:00:00Z') == datetime(2024, 3, 1, 10, tzinfo=timezone.utc)
+    assert parse_date('2024-03-01') == datetime(2024, 3, 1, tzinfo=timezone.utc)
+    assert parse_date(datetime(2024, 3, 1)) == datetime(2024, 3, 1, tzinfo=timezone.utc)
+    offset = parse_date('2024-03-01T10:00:00+05:30')
+    assert offset.utcoffset() == timedelta(hours=5, minutes=30)
+
+@pytest.mark.parametrize('value', [None, ''])
+def test_parse_date_passes_empty_values(value):
+    assert parse_date(value) is None
+
+@pytest.mark.parametrize('value', ['not-a-date', '2024-13-01', '01/03/2024'])
+def test_parse_date_rejects_malformed_values(value):
+    with pytest.raises(ValueError):
+        parse_date(value)
+
+def test_bad_onboarding_date_is_rejected_before_allocating_an_id(api, db):
+    response = api('POST', '/api/investors', json={'name': 'A', 'onboarding_date': 'yesterday'})
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Invalid onboarding_date'
+    assert run(db.counters.find_one({'_id': 'investor_id'})) is None
+
+def test_bad_folio_date_rejects_the_whole_bulk_request(api, db):
+    response = api('POST', '/api/investors/bulk', json=[
+        {'name': 'A', 'onboarding_date': '2024-01-01'},
+        {'name': 'B', 'portfolios': [{'folio_id': 'F1', 'next_due_date': '2024-02-30'}]}
+    ])
+
+    assert response.status_code == 400
+    assert run(db.counters.find_one({'_id': 'investor_id'})) is None
+    assert run(db.investors.count_documents({})) == 0
+
+def test_new_investor_dates_are_stored_as_datetimes(api, db):
+    response = api('POST', '/api/investors', json={
+        'name': 'A',
+        'onboarding_date': '2024-01-05T00:00:00Z',
+        'portfolios': [{'folio_id': 'F1', 'transactions': [{'txn_id': 'T1', 'txn_date': '2024-01-06'}]}]
+    })
+    assert response.status_code == 200
+
+    investor = run(db.investors.find_one({'investor_id': response.json()['data']['investor_id']}))
+    txn = run(db.transactions.find_one({'txn_id': 'T1'}))
+    assert investor['onboarding_date'] == datetime(2024, 1, 5, tzinfo=timezone.utc)
+    assert txn['txn_date'] == datetime(2024, 1, 6, tzinfo=timezone.utc)
+
+def test_bad_transaction_date_in_update_is_a_client_error(api, db):
+    run(db.investors.insert_one(make_investor(1)))
+
+    response = api('PUT', '/api/investors/INV0001', json={
+        'portfolios': [{'folio_id': 'F1', 'transactions': [{'txn_id': 'T1', 'txn_date': 'soon'}]}]
+    })
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == 'Invalid txn_date'
+
+@pytest.mark.parametrize('param', ['from_date', 'to_date'])
+def test_bad_transaction_filter_date_is_a_client_error(api, db, param):
+    response = api('GET', f'/api/investors/INV0001/transactions?{param}=nope')
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == f'Invalid {param}'
+
+def test_transaction_filter_dates_bound_the_window(api, db):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    run(db.transactions.insert_many([
+        {'txn_id': f'T{n}', 'investor_id': 'INV0001', 'folio_id': 'F1', 'txn_date': start + timedelta(days=n)}
+        for n in range(10)
+    ]))
+
+    body = api('GET', '/api/investors/INV0001/transactions?from_date=2024-01-03&to_date=2024-01-05T00:00:00Z').json()
+
+    assert [txn['txn_id'] for txn in body['data']] == ['T4', 'T3', 'T2']
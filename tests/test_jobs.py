@@ -0,0 +1,114 @@
+"""Background analysis jobs and seed runs sharing the jobs collection"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import httpx
+import pytest
+
+from jobs import JobRunner
+from tests.conftest import make_investor, run
+
+async def analyze_many(investors):
+    return [{'investor_id': investor['investor_id'], 'performance': {}} for investor in investors]
+
+async def summarize_many(analyses):
+    return [{'summary': 'ok'} for _ in analyses]
+
+@pytest.fixture
+def runner(db):
+    return JobRunner(db, lambda **params: {}, analyze_many, summarize_many, batch_size=2)
+
+def job_doc(job_id: str, job_type: str, **fields) -> dict:
+    now = datetime.now(timezone.utc)
+    doc = {'_id': job_id, 'type': job_type, 'status': 'running', 'created_at': now, 'updated_at': now}
+    doc.update(fields)
+    return doc
+
+def test_resume_skips_running_seed_jobs(runner, db):
+    async def scenario():
+        await db.investors.insert_many([make_investor(i) for i in range(1, 6)])
+        await db.jobs.insert_many([
+            job_doc('seed-1', 'seed', total=1000, processed=10),
+            job_doc('analysis-1', 'analysis', status='queued', filter={}, total=5, processed=0,
+                    succeeded=0, skipped=0, failed=0, errors=[], last_investor_id=None)
+        ])
+        resumed = await runner.resume_interrupted()
+        await asyncio.gather(*runner._tasks.values())
+        return resumed
+
+    assert run(scenario()) == 1
+    seed = run(db.jobs.find_one({'_id': 'seed-1'}))
+    analysis = run(db.jobs.find_one({'_id': 'analysis-1'}))
+    assert seed['status'] == 'running' and 'owner' not in seed
+    assert analysis['status'] == 'completed'
+    assert analysis['processed'] == 5
+
+def test_claim_and_get_ignore_seed_jobs(runner, db):
+    run(db.jobs.insert_one(job_doc('seed-1', 'seed')))
+
+    assert run(runner._claim('seed-1')) is None
+    assert run(runner.get('seed-1')) is None
+
+def test_lapsed_analysis_lease_is_claimed(runner, db):
+    lapsed = datetime.now(timezone.utc) - timedelta(minutes=1)
+    run(db.jobs.insert_one(job_doc('analysis-1', 'analysis', owner='dead-worker', lease_until=lapsed)))
+
+    job = run(runner._claim('analysis-1'))
+
+    assert job['owner'] == runner.owner
+    assert job['lease_until'] > datetime.now(timezone.utc)
+
+def test_only_one_concurrent_seed_run_starts(server, db, token, monkeypatch):
+    release = None
+
+    async def fake_seed(db, target, count, **kwargs):
+        await release.wait()
+        return {'investors': count, 'transactions': 0, 'seed': 1, 'seconds': 0}
+    monkeypatch.setattr(server, 'run_seed', fake_seed)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        transport = httpx.ASGITransport(app=server.app)
+        headers = {'Authorization': f'Bearer {token}'}
+        async with httpx.AsyncClient(transport=transport, base_url='http://test', headers=headers) as client:
+            first, second = await asyncio.gather(*[
+                client.post('/api/seed/run', json={'count': 10}) for _ in range(2)
+            ])
+            release.set()
+            await asyncio.gather(*server.seed_tasks)
+            # The finished run released the lock
+            third = await client.post('/api/seed/run', json={'count': 10})
+            release.set()
+            await asyncio.gather(*server.seed_tasks)
+        return sorted([first.status_code, second.status_code]), third.status_code
+
+    assert run(scenario()) == ([202, 409], 202)
+    assert run(db.jobs.count_documents({'type': 'seed', 'status': 'completed'})) == 2
+
+def test_bulk_analysis_records_a_bad_investor_as_an_error(api, db, llm):
+    run(db.investors.insert_many([
+        make_investor(1),
+        make_investor(2, portfolios=['not-a-folio']),
+        make_investor(3)
+    ]))
+
+    body = api('POST', '/api/ai/run-bulk?limit=3').json()
+
+    status = {result['investor_id']: result['status'] for result in body['data']}
+    assert status == {'INV0001': 'success', 'INV0002': 'error', 'INV0003': 'success'}
+    assert run(db.ai_analyses.count_documents({})) == 2
+
+def test_failed_analysis_is_a_per_investor_error(db):
+    async def analyze_some(investors):
+        return [ValueError('bad folio') if investor['investor_id'] == 'INV0002' else
+                {'investor_id': investor['investor_id']} for investor in investors]
+
+    runner = JobRunner(db, lambda **params: {}, analyze_some, summarize_many, batch_size=2)
+    run(db.investors.insert_many([make_investor(i) for i in range(1, 4)]))
+
+    skipped, errors = run(runner._process_batch(run(db.investors.find({}, {'_id': 0}).to_list(3)), False))
+
+    assert skipped == 0
+    assert errors == [{'investor_id': 'INV0002', 'error': 'bad folio'}]
+    assert run(db.ai_analyses.count_documents({})) == 2
@@ -0,0 +1,82 @@
+"""Keyset cursors on GET /api/investors and the transactions endpoint"""
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from tests.conftest import make_investor, run
+
+@pytest.fixture
+def investors(db):
+    docs = [make_investor(i) for i in range(1, 24)]
+    run(db.investors.insert_many([dict(doc) for doc in docs]))
+    return docs
+
+def walk(api, sort: str, limit: int):
+    """investor_ids of every page, following next_cursor to the end"""
+    seen = []
+    url = f'/api/investors?sort={sort}&limit={limit}'
+    while True:
+        body = api('GET', url).json()
+        seen += [investor['investor_id'] for investor in body['data']]
+        if body['next_cursor'] is None:
+            return seen
+        url = f"/api/investors?sort={sort}&limit={limit}&after={body['next_cursor']}"
+
+@pytest.mark.parametrize('sort', ['investor_id', 'aum_desc', 'aum_asc'])
+def test_cursor_round_trip(server, sort):
+    doc = {'investor_id': 'INV0042', 'total_aum': 1234.5}
+    cursor = server.encode_cursor(doc, sort)
+    condition = server.decode_cursor(cursor, sort)
+    if sort == 'investor_id':
+        assert condition == {'investor_id': {'$gt': 'INV0042'}}
+    else:
+        op = '$lt' if sort == 'aum_desc' else '$gt'
+        assert condition == {'$or': [
+            {'total_aum': {op: 1234.5}},
+            {'total_aum': 1234.5, 'investor_id': {'$gt': 'INV0042'}}
+        ]}
+
+@pytest.mark.parametrize('sort', ['investor_id', 'aum_desc', 'aum_asc'])
+def test_pages_cover_every_investor_once(api, investors, sort):
+    # Many investors share an AUM, so the investor_id tie-breaker decides page edges
+    seen = walk(api, sort, limit=5)
+    assert len(seen) == len(investors)
+    assert set(seen) == {investor['investor_id'] for investor in investors}
+
+    if sort == 'investor_id':
+        assert seen == sorted(seen)
+    else:
+        aum = {investor['investor_id']: investor['total_aum'] for investor in investors}
+        keys = [(aum[i] if sort == 'aum_asc' else -aum[i], i) for i in seen]
+        assert keys == sorted(keys)
+
+def test_cursor_from_another_sort_is_rejected(api, investors):
+    cursor = api('GET', '/api/investors?sort=aum_desc&limit=5').json()['next_cursor']
+    response = api('GET', f'/api/investors?sort=investor_id&limit=5&after={cursor}')
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('cursor', ['not-base64!', 'eyJhIjoxfQ'])
+def test_malformed_cursor_is_rejected(api, investors, cursor):
+    assert api('GET', f'/api/investors?after={cursor}').status_code == 400
+
+def test_transaction_pages_follow_date_then_id(api, db, investors):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # Pairs of transactions share a date so the txn_id tie-breaker is exercised
+    txns = [{
+        'txn_id': f'F1-T{n:03d}',
+        'investor_id': 'INV0001',
+        'folio_id': 'F1',
+        'txn_date': start + timedelta(days=n // 2),
+        'txn_amount': 100
+    } for n in range(11)]
+    run(db.transactions.insert_many([dict(txn) for txn in txns]))
+
+    seen = []
+    url = '/api/investors/INV0001/transactions?limit=3'
+    while True:
+        body = api('GET', url).json()
+        seen += [txn['txn_id'] for txn in body['data']]
+        if body['next_cursor'] is None:
+            break
+        url = f"/api/investors/INV0001/transactions?limit=3&after={body['next_cursor']}"
+
+    assert seen == [txn['txn_id'] for txn in sorted(txns, key=lambda t: (t['txn_date'], t['txn_id']), reverse=True)]
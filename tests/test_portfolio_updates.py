@@ -0,0 +1,143 @@
+"""Folio update pipelines, evaluated in Python since mongomock cannot run them"""
+import pytest
+
+from portfolio_updates import (
+    replace_portfolios_pipeline, update_folio_pipeline, remove_folio_pipeline, folio_projection
+)
+from tests.conftest import make_investor, run
+
+def resolve(path: str, value):
+    """Follow a dotted path, mapping over arrays as MongoDB does"""
+    for key in path.split('.') if path else []:
+        if isinstance(value, list):
+            value = [item.get(key) for item in value if isinstance(item, dict)]
+        else:
+            value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def evaluate(expr, doc: dict, variables: dict):
+    """The subset of aggregation expressions portfolio_updates builds"""
+    if isinstance(expr, str) and expr.startswith('$$'):
+        name, _, path = expr[2:].partition('.')
+        return resolve(path, variables[name])
+    if isinstance(expr, str) and expr.startswith('$'):
+        return resolve(expr[1:], doc)
+    if isinstance(expr, list):
+        return [evaluate(item, doc, variables) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+
+    op = next(iter(expr)) if len(expr) == 1 else ''
+    if not op.startswith('$'):
+        return {k: evaluate(v, doc, variables) for k, v in expr.items()}
+    arg = expr[op]
+    if op == '$literal':
+        return arg
+    if op in ('$map', '$filter'):
+        name = arg['as']
+        items = evaluate(arg['input'], doc, variables)
+        if op == '$map':
+            return [evaluate(arg['in'], doc, {**variables, name: item}) for item in items]
+        return [item for item in items if evaluate(arg['cond'], doc, {**variables, name: item})]
+    if op == '$cond':
+        # Only the chosen branch is evaluated, so a zero divisor in the other is harmless
+        condition, then, otherwise = arg
+        return evaluate(then if evaluate(condition, doc, variables) else otherwise, doc, variables)
+
+    args = evaluate(arg, doc, variables)
+    if op == '$sum':
+        return sum(v for v in args if isinstance(v, (int, float)))
+    if op == '$mergeObjects':
+        merged = {}
+        for part in args:
+            merged.update(part)
+        return merged
+    ops = {
+        '$eq': lambda a, b: a == b,
+        '$ne': lambda a, b: a != b,
+        '$gt': lambda a, b: a > b,
+        '$multiply': lambda a, b: a * b,
+        '$divide': lambda a, b: a / b,
+        '$subtract': lambda a, b: a - b,
+        '$round': lambda a, places: round(a, places)
+    }
+    return ops[op](*args)
+
+def apply(pipeline, doc: dict) -> dict:
+    """Run an update pipeline of $set stages over doc"""
+    for stage in pipeline:
+        assert list(stage) == ['$set']
+        doc = {**doc, **{k: evaluate(v, doc, {}) for k, v in stage['$set'].items()}}
+    return doc
+
+def folio(folio_id: str, nav: float, units: float, invested: float) -> dict:
+    return {
+        'folio_id': folio_id,
+        'scheme_name': f'Scheme {folio_id}',
+        'nav': nav,
+        'units': units,
+        'invested_amount': invested,
+        'current_value': round(nav * units, 2),
+        'gain_loss_pct': round((nav * units - invested) / invested * 100, 2)
+    }
+
+@pytest.fixture
+def investor():
+    return make_investor(1, portfolios=[folio('F1', 10.0, 100.0, 800.0), folio('F2', 20.0, 50.0, 1000.0)])
+
+def test_nav_change_derives_value_return_and_totals(investor):
+    updated = apply(update_folio_pipeline('F1', {'nav': 12.5}), investor)
+
+    changed, untouched = updated['portfolios']
+    assert changed['current_value'] == 1250.0
+    assert changed['gain_loss_pct'] == 56.25
+    assert untouched == investor['portfolios'][1]
+    assert updated['total_aum'] == 2250.0
+    assert updated['total_invested'] == 1800.0
+    assert updated['gain_loss_pct'] == 25.0
+
+def test_explicit_values_are_not_derived(investor):
+    pipeline = update_folio_pipeline('F1', {'nav': 12.5, 'current_value': 900.0, 'gain_loss_pct': 1.0})
+    changed = apply(pipeline, investor)['portfolios'][0]
+
+    # The patch itself plus the two totals stages; nothing derived in between
+    assert len(pipeline) == 3
+    assert (changed['current_value'], changed['gain_loss_pct']) == (900.0, 1.0)
+
+def test_dollar_strings_are_stored_literally(investor):
+    updated = apply(update_folio_pipeline('F2', {'scheme_name': '$portfolios'}), investor)
+
+    assert updated['portfolios'][1]['scheme_name'] == '$portfolios'
+    assert updated['total_aum'] == 2000.0
+
+def test_remove_last_folio_zeroes_totals():
+    investor = make_investor(1, portfolios=[folio('F1', 10.0, 100.0, 800.0)])
+    updated = apply(remove_folio_pipeline('F1'), investor)
+
+    assert updated['portfolios'] == []
+    assert (updated['total_aum'], updated['total_invested'], updated['gain_loss_pct']) == (0, 0, 0)
+
+def test_replace_ignores_client_totals(investor):
+    fields = {'portfolios': investor['portfolios'][:1], 'total_aum': 1e9, 'gain_loss_pct': 99.0, 'name': 'New'}
+    updated = apply(replace_portfolios_pipeline(fields), investor)
+
+    assert updated['name'] == 'New'
+    assert (updated['total_aum'], updated['total_invested'], updated['gain_loss_pct']) == (1000.0, 800.0, 25.0)
+
+def test_projection_returns_only_the_touched_folio():
+    assert folio_projection('F2')['portfolios'] == {'$elemMatch': {'folio_id': 'F2'}}
+
+@pytest.mark.parametrize('method,url', [
+    ('PATCH', '/api/investors/INV0001/portfolios/F9'),
+    ('DELETE', '/api/investors/INV0001/portfolios/F9'),
+    ('PATCH', '/api/investors/INV0009/portfolios/F1'),
+    ('DELETE', '/api/investors/INV0009/portfolios/F1')
+])
+def test_unknown_investor_or_folio_is_404(api, db, investor, method, url):
+    run(db.investors.insert_one(investor))
+    kwargs = {'json': {'nav': 11.0}} if method == 'PATCH' else {}
+
+    response = api(method, url, **kwargs)
+
+    assert response.status_code == 404
+    assert run(db.investors.find_one({'investor_id': 'INV0001'}))['portfolios'] == investor['portfolios']
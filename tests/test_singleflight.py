@@ -0,0 +1,70 @@
+"""Cross-worker single flight through the MongoDB lock"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from ai.singleflight import MongoLock, SingleFlight
+from tests.conftest import run
+
+def test_expired_lease_is_taken_over(db):
+    lock = MongoLock(db.llm_locks)
+    lapsed = datetime.now(timezone.utc) - timedelta(seconds=1)
+    run(db.llm_locks.insert_one({'_id': 'k', 'token': 'dead-worker', 'expires_at': lapsed}))
+
+    token = run(lock.acquire('k'))
+
+    assert token is not None
+    assert run(db.llm_locks.find_one({'_id': 'k'}))['token'] == token
+    # The old holder can neither renew nor release the lock it lost
+    assert run(lock.renew('k', 'dead-worker')) is False
+    run(lock.release('k', 'dead-worker'))
+    assert run(db.llm_locks.count_documents({'_id': 'k'})) == 1
+
+def test_live_lease_is_not_taken_over(db):
+    lock = MongoLock(db.llm_locks)
+
+    assert run(lock.acquire('k')) is not None
+    assert run(lock.acquire('k')) is None
+
+def test_peer_with_lapsed_lock_does_not_block(db):
+    flight = SingleFlight(MongoLock(db.llm_locks, ttl_seconds=60))
+    lapsed = datetime.now(timezone.utc) - timedelta(seconds=1)
+    run(db.llm_locks.insert_one({'_id': 'k', 'token': 'dead-worker', 'expires_at': lapsed}))
+
+    async def compute():
+        return 'fresh'
+
+    assert run(asyncio.wait_for(flight.do('k', compute), timeout=1)) == 'fresh'
+    assert flight.waited_on_peer == 0
+    assert run(db.llm_locks.count_documents({})) == 0
+
+def test_lease_is_renewed_while_the_leader_works(db):
+    ttl = 0.3
+
+    async def scenario():
+        leader = SingleFlight(MongoLock(db.llm_locks, ttl_seconds=ttl, poll_interval=0.02))
+        peer = SingleFlight(MongoLock(db.llm_locks, ttl_seconds=ttl, poll_interval=0.02))
+        calls = []
+
+        async def slow():
+            calls.append('leader')
+            # Outlasts the ttl several times over, like an LLM call with retries
+            await asyncio.sleep(ttl * 3)
+            return 'leader'
+
+        async def peer_compute():
+            calls.append('peer')
+            return 'peer'
+
+        async def recheck():
+            return 'leader' if calls else None
+
+        first = asyncio.ensure_future(leader.do('k', slow))
+        await asyncio.sleep(ttl * 2)
+        second = await peer.do('k', peer_compute, recheck=recheck)
+        return await first, second, calls, peer.waited_on_peer
+
+    first, second, calls, waited = run(scenario())
+
+    assert (first, second) == ('leader', 'leader')
+    assert calls == ['leader']
+    assert waited == 1
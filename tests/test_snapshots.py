@@ -0,0 +1,112 @@
+"""Dashboard snapshots: stale-while-refresh, invalidation and the refresh lease"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from snapshots import Snapshot
+from tests.conftest import make_investor, run
+
+class Source:
+    """compute() returning 1, 2, 3, ... or raising while failing is set"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    async def __call__(self):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError('aggregation failed')
+        return {'n': self.calls}
+
+@pytest.fixture
+def source():
+    return Source()
+
+@pytest.fixture
+def snapshot(db, source):
+    return Snapshot(db.dashboard_snapshots, 'dashboard', source, ttl_seconds=300)
+
+async def settle(snapshot):
+    """Let a background refresh finish"""
+    if snapshot._inflight is not None:
+        await asyncio.gather(snapshot._inflight, return_exceptions=True)
+
+def test_invalidated_snapshot_is_served_stale_then_refreshed(snapshot, source):
+    async def scenario():
+        first = await snapshot.get()
+        await snapshot.invalidate()
+        stale = await snapshot.get()
+        await settle(snapshot)
+        fresh = await snapshot.get()
+        return first, stale, fresh
+
+    first, stale, fresh = run(scenario())
+
+    assert (first['data'], first['stale']) == ({'n': 1}, False)
+    assert (stale['data'], stale['stale']) == ({'n': 1}, True)
+    assert (fresh['data'], fresh['stale']) == ({'n': 2}, False)
+    assert source.calls == 2
+
+def test_expired_ttl_is_stale(snapshot, db):
+    run(snapshot.get())
+    old = datetime.now(timezone.utc) - timedelta(seconds=301)
+    run(db.dashboard_snapshots.update_one({'_id': 'dashboard'}, {'$set': {'computed_at': old}}))
+
+    assert snapshot._is_stale(run(db.dashboard_snapshots.find_one({'_id': 'dashboard'})))
+
+def test_failed_background_refresh_releases_the_lease(snapshot, source, db):
+    async def scenario():
+        await snapshot.get()
+        await snapshot.invalidate()
+        source.failing = True
+        served = await snapshot.get()
+        await settle(snapshot)
+        after_failure = await db.dashboard_snapshots.find_one({'_id': 'dashboard'})
+        # The next stale read retries at once rather than after the 60 s lease
+        source.failing = False
+        await snapshot.get()
+        await settle(snapshot)
+        return served, after_failure, await snapshot.get()
+
+    served, after_failure, fresh = run(scenario())
+
+    assert served['data'] == {'n': 1} and served['stale'] is True
+    assert 'refreshing_until' not in after_failure
+    assert fresh['data'] == {'n': 3} and fresh['stale'] is False
+
+def test_failed_blocking_refresh_raises_and_releases_the_lease(snapshot, source, db):
+    source.failing = True
+
+    with pytest.raises(RuntimeError):
+        run(snapshot.get())
+
+    assert 'refreshing_until' not in run(db.dashboard_snapshots.find_one({'_id': 'dashboard'}))
+
+def test_live_lease_of_another_worker_skips_background_refresh(snapshot, source, db):
+    async def scenario():
+        await snapshot.get()
+        await snapshot.invalidate()
+        until = datetime.now(timezone.utc) + timedelta(seconds=60)
+        await db.dashboard_snapshots.update_one({'_id': 'dashboard'}, {'$set': {'refreshing_until': until}})
+        await snapshot.get()
+        await settle(snapshot)
+        return await db.dashboard_snapshots.find_one({'_id': 'dashboard'})
+
+    doc = run(scenario())
+
+    assert source.calls == 1
+    # The other worker's lease is left alone
+    assert 'refreshing_until' in doc
+
+def test_investor_writes_invalidate_the_dashboard(server, api, db):
+    key = server.dashboard_snapshot.key
+    run(db.investors.insert_one(make_investor(1)))
+    run(db.dashboard_snapshots.insert_one({'_id': key, 'version': 3, 'computed_version': 3}))
+
+    assert api('PUT', '/api/investors/INV0001', json={'name': 'Renamed'}).status_code == 200
+    assert api('DELETE', '/api/investors/INV0001').status_code == 200
+
+    doc = run(db.dashboard_snapshots.find_one({'_id': key}))
+    assert (doc['version'], doc['computed_version']) == (5, 3)
@@ -0,0 +1,115 @@
+"""Batched LLM summaries and their per-investor fallback"""
+import json
+import asyncio
+
+import httpx
+import pytest
+
+import ai.chatgpt as chatgpt
+from ai.chatgpt import _parse_batch_reply, get_ai_summaries, summary_cache_key
+from tests.conftest import make_investor, run
+
+def analysis(i: int) -> dict:
+    """Analysis result whose summary payload is unique to i"""
+    return {'investor_id': f'INV{i:04d}', 'performance': {'value': 1000.0 * i, 'gainLoss': 1.0}}
+
+def entry(investor_id: str, summary: str = 'Healthy.') -> dict:
+    return {'investor_id': investor_id, 'summary': summary, 'recommendations': ['Hold.', 'Top up SIPs.']}
+
+def rewrite_batches(llm, rewrite):
+    """Pass every batch reply through rewrite(entries) -> text; single prompts are left alone"""
+    complete = llm.complete
+
+    async def rewritten(prompt, *args, **kwargs):
+        text = await complete(prompt, *args, **kwargs)
+        return rewrite(json.loads(text)) if 'one per investor' in prompt else text
+    llm.complete = rewritten
+
+def test_parse_keeps_valid_expected_entries():
+    reply = 'Here you go:\n```json\n' + json.dumps([
+        entry('INV0001'),
+        entry('INV0002', summary='  '),
+        {'investor_id': 'INV0003', 'summary': 'Fine.', 'recommendations': 'not a list'},
+        entry('INV9999'),
+        'not an object'
+    ]) + '\n```'
+
+    parsed = _parse_batch_reply(reply, {'INV0001', 'INV0002', 'INV0003'})
+
+    assert list(parsed) == ['INV0001']
+    assert parsed['INV0001']['summary'] == 'Healthy.\n1) Hold.\n2) Top up SIPs.'
+
+@pytest.mark.parametrize('reply', ['', 'no json here', '[{"investor_id": ', '{"investor_id": "INV0001"}'])
+def test_parse_malformed_reply_is_empty(reply):
+    assert _parse_batch_reply(reply, {'INV0001'}) == {}
+
+def test_short_reply_falls_back_only_for_missing_investors(server, llm):
+    # The model answers for the first two investors only
+    rewrite_batches(llm, lambda entries: json.dumps(entries[:2]))
+    analyses = [analysis(i) for i in range(1, 5)]
+
+    summaries = run(get_ai_summaries(analyses, max_batch_size=10))
+
+    assert llm.calls == 1 + 2
+    assert [s.get('recommendations') is not None for s in summaries] == [True, True, False, False]
+    assert all(s['summary'] and not s.get('error') for s in summaries)
+
+def test_malformed_reply_falls_back_for_every_investor(server, llm):
+    rewrite_batches(llm, lambda entries: 'Sorry, I cannot help with that.')
+    analyses = [analysis(i) for i in range(1, 4)]
+
+    summaries = run(get_ai_summaries(analyses, max_batch_size=10))
+
+    assert llm.calls == 1 + 3
+    assert all(s['summary'].startswith('Stub summary') for s in summaries)
+
+def test_batch_answers_are_cached_for_single_lookups(server, llm):
+    analyses = [analysis(i) for i in range(1, 4)]
+    first = run(get_ai_summaries(analyses))
+    calls = llm.calls
+
+    again = run(chatgpt.get_ai_summary(analyses[1]))
+
+    assert llm.calls == calls
+    assert again == first[1]
+
+def test_batch_prompt_version_is_part_of_the_key(monkeypatch):
+    payload = chatgpt.summary_payload(analysis(1))
+    before = summary_cache_key(payload, 'stub-model')
+    monkeypatch.setattr(chatgpt, 'BATCH_PROMPT_VERSION', chatgpt.BATCH_PROMPT_VERSION + 1)
+
+    assert summary_cache_key(payload, 'stub-model') != before
+
+def run_within_budget(server, token: str, db):
+    """POST /ai/run with a budget the stub LLM misses; the response and the record before and after the follow-up"""
+    async def scenario():
+        await db.investors.insert_one(make_investor(1, total_aum=5000.0))
+        transport = httpx.ASGITransport(app=server.app)
+        headers = {'Authorization': f'Bearer {token}'}
+        async with httpx.AsyncClient(transport=transport, base_url='http://test', headers=headers) as client:
+            response = await client.post('/api/ai/run/INV0001?force=true&budget_ms=1')
+        before = await db.ai_analyses.find_one({'investor_id': 'INV0001'})
+        await asyncio.gather(*server.pending_summaries)
+        after = await db.ai_analyses.find_one({'investor_id': 'INV0001'})
+        return response.json()['data'], before, after
+    return run(scenario())
+
+def test_late_summary_replaces_the_provisional_one(server, token, llm, db):
+    data, before, after = run_within_budget(server, token, db)
+
+    assert data['provisional'] is True
+    assert before['ai_summary'] == data['summary']
+    assert after['fingerprint'] == before['fingerprint']
+    assert after['ai_summary']['summary'].startswith('Stub summary')
+    assert not after['ai_summary'].get('provisional')
+
+def test_failed_late_summary_keeps_the_provisional_one(server, token, llm, db, monkeypatch):
+    async def failing(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        raise chatgpt.LLMError('provider down')
+    monkeypatch.setattr(llm, 'complete', failing)
+
+    data, before, after = run_within_budget(server, token, db)
+
+    assert data['provisional'] is True
+    assert after['ai_summary'] == before['ai_summary'] == data['summary']